@@ -1,14 +1,90 @@
 import yt_dlp
+from yt_dlp.postprocessor import PostProcessor
+from yt_dlp.utils import locked_file
 import os
 import sys
+import json
+import queue
+import tempfile
+import threading
 import subprocess
 
+# ffmpeg processes transcoding at once (override with MEDIA_TOOL_TRANSCODERS, e.g. when
+# the GUI runs several downloads in parallel)
+TRANSCODE_WORKERS = int(os.environ.get('MEDIA_TOOL_TRANSCODERS', os.cpu_count() or 2))
+MP3_BITRATE = '320k'
+
+# Tracks already fetched, shared by the CLI and the GUI (which runs this script)
+ARCHIVE_FILE = os.environ.get('MEDIA_TOOL_ARCHIVE',
+                              os.path.join(os.path.dirname(os.path.abspath(__file__)), 'download_archive.txt'))
+
+class DownloadArchive:
+    """Append-only record of fetched tracks, one "<extractor> <id>" per line
+
+    Same line format as yt-dlp's --download-archive, and passed to yt-dlp as
+    its download_archive so playlist entries already recorded are skipped
+    before their pages are fetched. Several processes can use the file at
+    once: appends happen under an exclusive lock, and a lookup that misses
+    first reads whatever other processes appended since the last read.
+    """
+    def __init__(self, path=ARCHIVE_FILE):
+        self.path = path
+        self.ids = set()
+        self.offset = 0
+        self.lock = threading.Lock()
+        with self.lock:
+            self._refresh()
+
+    def _refresh(self):
+        try:
+            with locked_file(self.path, 'rb') as f:
+                f.seek(self.offset)
+                data = f.read()
+        except FileNotFoundError:
+            return
+        # Only consume complete lines
+        end = data.rfind(b'\n') + 1
+        self.offset += end
+        for line in data[:end].decode('utf-8', errors='replace').splitlines():
+            if line.strip():
+                self.ids.add(line.strip())
+
+    def __contains__(self, archive_id):
+        with self.lock:
+            if archive_id not in self.ids:
+                self._refresh()
+            return archive_id in self.ids
+
+    def __bool__(self):
+        # yt-dlp skips archive lookups for an empty archive - another process may fill it
+        return True
+
+    def add(self, archive_id):
+        # yt-dlp calls this once a download finishes; tracks are recorded after
+        # their MP3 conversion succeeds instead (see record)
+        pass
+
+    def record(self, archive_id):
+        with self.lock:
+            if archive_id in self.ids:
+                return
+            with locked_file(self.path, 'ab') as f:
+                f.write((archive_id + '\n').encode('utf-8'))
+            self.ids.add(archive_id)
+
 def is_spotify_url(url):
     """Check if URL is from Spotify"""
     return 'spotify.com' in url
 
-def download_spotify(url, output_path='downloads'):
-    """Download from Spotify using spotdl"""
+def spotify_track_id(url):
+    return url.rstrip('/').split('/')[-1].split('?')[0]
+
+def download_spotify(url, output_path='downloads', archive=None):
+    """Download from Spotify using spotdl
+
+    With an archive, the track list is fetched first (spotdl save) and only
+    tracks not recorded yet are downloaded.
+    """
     if not os.path.exists(output_path):
         os.makedirs(output_path)
 
@@ -20,15 +96,47 @@ def download_spotify(url, output_path='downloads'):
 
         # Use spotdl to download
         python_path = r"C:\Users\Thorton\AppData\Local\Programs\Python\Python312\python.exe"
-        result = subprocess.run(
-            [python_path, "-m", "spotdl", url, "--output", output_path, "--format", "mp3", "--bitrate", "320k", "--ffmpeg", ffmpeg_path],
-            capture_output=True,
-            text=True
-        )
 
-        print(result.stdout)
-        if result.stderr:
-            print(result.stderr)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            query = url
+            run_archive = os.path.join(temp_dir, 'downloaded.txt')
+
+            if archive is not None:
+                save_file = os.path.join(temp_dir, 'tracks.spotdl')
+                saved = subprocess.run([python_path, "-m", "spotdl", "save", url, "--save-file", save_file],
+                                       capture_output=True, text=True)
+                if saved.returncode == 0 and os.path.exists(save_file):
+                    with open(save_file, 'r', encoding='utf-8') as f:
+                        songs = json.load(f)
+                    new_songs = [song for song in songs if f"spotify {song['song_id']}" not in archive]
+                    print(f"{len(songs) - len(new_songs)} already downloaded, {len(new_songs)} new")
+                    if not new_songs:
+                        print("\nSpotify download complete!")
+                        return True
+
+                    query = os.path.join(temp_dir, 'new.spotdl')
+                    with open(query, 'w', encoding='utf-8') as f:
+                        json.dump(new_songs, f)
+                else:
+                    print("Could not read the track list - downloading everything")
+
+            result = subprocess.run(
+                [python_path, "-m", "spotdl", query, "--output", output_path, "--format", "mp3", "--bitrate", "320k", "--ffmpeg", ffmpeg_path,
+                 "--archive", run_archive],
+                capture_output=True,
+                text=True
+            )
+
+            print(result.stdout)
+            if result.stderr:
+                print(result.stderr)
+
+            # spotdl lists the tracks it actually downloaded in its own archive file
+            if archive is not None and os.path.exists(run_archive):
+                with open(run_archive, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        if line.strip():
+                            archive.record(f"spotify {spotify_track_id(line.strip())}")
 
         if result.returncode == 0:
             print("\nSpotify download complete!")
@@ -40,13 +148,122 @@ def download_spotify(url, output_path='downloads'):
         print(f"Error: {e}")
         return False
 
-def download_mp3(url, output_path='downloads'):
+def ffmpeg_metadata(info):
+    """ID3 tags for a track, mirroring what yt-dlp's FFmpegMetadata writes"""
+    tags = {
+        'title': info.get('track') or info.get('title'),
+        'artist': info.get('artist') or info.get('creator') or info.get('uploader'),
+        'album': info.get('album'),
+        'album_artist': info.get('album_artist'),
+        'track': info.get('track_number'),
+        'genre': info.get('genre'),
+        'comment': info.get('webpage_url'),
+    }
+    if info.get('release_year'):
+        tags['date'] = info['release_year']
+    elif info.get('upload_date'):
+        tags['date'] = info['upload_date'][:4]
+    return {key: str(value) for key, value in tags.items() if value}
+
+class TranscodePipeline:
+    """Second stage: a bounded queue of downloaded files drained by ffmpeg workers
+
+    Each worker thread drives one ffmpeg process, so transcodes run on separate
+    cores while yt-dlp keeps fetching. submit() blocks when the queue is full,
+    which keeps downloads from piling up untranscoded files on disk.
+    """
+    def __init__(self, ffmpeg, workers=TRANSCODE_WORKERS, queue_size=None, bitrate=MP3_BITRATE, archive=None):
+        self.ffmpeg = ffmpeg
+        self.bitrate = bitrate
+        self.archive = archive
+        self.jobs = queue.Queue(maxsize=queue_size or workers * 2)
+        self.lock = threading.Lock()
+        self.completed = []
+        self.failed = []
+        self.threads = [threading.Thread(target=self._worker, daemon=True) for _ in range(max(1, workers))]
+        for thread in self.threads:
+            thread.start()
+
+    def submit(self, source, metadata, archive_id=None):
+        self.jobs.put((source, metadata, archive_id))
+
+    def close(self):
+        """Wait for queued transcodes to finish. Returns True if all succeeded"""
+        for _ in self.threads:
+            self.jobs.put(None)
+        for thread in self.threads:
+            thread.join()
+        return not self.failed
+
+    def _worker(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            self._transcode(*job)
+
+    def _transcode(self, source, metadata, archive_id=None):
+        target = os.path.splitext(source)[0] + '.mp3'
+        temp = target + '.part'
+        command = [self.ffmpeg, '-hide_banner', '-loglevel', 'error', '-y', '-i', source,
+                   '-vn', '-codec:a', 'libmp3lame', '-b:a', self.bitrate]
+        for key, value in metadata.items():
+            command += ['-metadata', f'{key}={value}']
+        command += ['-f', 'mp3', temp]
+
+        try:
+            result = subprocess.run(command, capture_output=True, text=True,
+                                    creationflags=subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0)
+            if result.returncode != 0:
+                raise RuntimeError(result.stderr.strip() or f'ffmpeg exited with {result.returncode}')
+            os.replace(temp, target)
+            if os.path.abspath(source) != os.path.abspath(target):
+                os.remove(source)
+        except Exception as e:
+            if os.path.exists(temp):
+                os.remove(temp)
+            print(f"Error converting {os.path.basename(source)}: {e}")
+            with self.lock:
+                self.failed.append(source)
+            return
+
+        print(f"Converted to MP3: {os.path.basename(target)}")
+        if self.archive is not None and archive_id:
+            self.archive.record(archive_id)
+        with self.lock:
+            self.completed.append(target)
+
+class QueueForTranscode(PostProcessor):
+    """yt-dlp post-processor that hands each finished download to the pipeline"""
+    def __init__(self, pipeline):
+        super().__init__()
+        self.pipeline = pipeline
+
+    def run(self, info):
+        # Same id format yt-dlp uses for its archive
+        archive_id = f"{info['extractor_key'].lower()} {info['id']}" if info.get('extractor_key') else None
+        self.pipeline.submit(info['filepath'], ffmpeg_metadata(info), archive_id)
+        return [], info
+
+def find_ffmpeg(ffmpeg_dir):
+    """ffmpeg executable from the WinGet install, else whatever is on PATH"""
+    executable = 'ffmpeg.exe' if os.name == 'nt' else 'ffmpeg'
+    if ffmpeg_dir and os.path.exists(os.path.join(ffmpeg_dir, executable)):
+        return os.path.join(ffmpeg_dir, executable)
+    return 'ffmpeg'
+
+def download_mp3(url, output_path='downloads', archive=None):
     """
     Download YouTube video or playlist as MP3 at highest quality
 
+    Downloading and transcoding run as two stages: yt-dlp fetches the best
+    audio stream and queues each file, while a pool of ffmpeg processes
+    converts queued files to 320k MP3 in parallel.
+
     Args:
         url: YouTube video or playlist URL
         output_path: Directory to save the MP3 files
+        archive: Optional DownloadArchive - recorded tracks are skipped
     """
     if not os.path.exists(output_path):
         os.makedirs(output_path)
@@ -55,49 +272,49 @@ def download_mp3(url, output_path='downloads'):
 
     ydl_opts = {
         'format': 'bestaudio/best',
-        'postprocessors': [
-            {
-                'key': 'FFmpegExtractAudio',
-                'preferredcodec': 'mp3',
-                'preferredquality': '320',
-            },
-            {
-                'key': 'FFmpegMetadata',
-                'add_metadata': True,
-            },
-        ],
         'ffmpeg_location': ffmpeg_path if os.path.exists(ffmpeg_path) else None,
         'outtmpl': os.path.join(output_path, '%(title)s.%(ext)s'),
         'quiet': False,
         'no_warnings': False,
         'ignoreerrors': True,  # Continue on download errors in playlists
     }
+    if archive is not None:
+        ydl_opts['download_archive'] = archive
 
+    pipeline = TranscodePipeline(find_ffmpeg(ffmpeg_path), archive=archive)
     try:
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            ydl.add_post_processor(QueueForTranscode(pipeline), when='after_move')
             print(f"Processing: {url}\n")
             # Just download directly - yt-dlp will handle playlists automatically
             ydl.download([url])
-            print(f"\nDownload complete!")
-            return True
     except Exception as e:
         print(f"Error downloading: {e}")
+        pipeline.close()
         return False
 
+    print("\nWaiting for MP3 conversions to finish...")
+    success = pipeline.close()
+    print(f"\nDownload complete! {len(pipeline.completed)} converted, {len(pipeline.failed)} failed")
+    return success
+
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python downloader.py <URL>")
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    if not args:
+        print("Usage: python downloader.py <URL> [--no-archive]")
         print("\nExamples:")
         print("  YouTube video:     python downloader.py https://www.youtube.com/watch?v=dQw4w9WgXcQ")
         print("  YouTube playlist:  python downloader.py https://www.youtube.com/playlist?list=PLrAXtmErZgOeiKm4sgNOknGvNjby9efdf")
         print("  Spotify track:     python downloader.py https://open.spotify.com/track/...")
         print("  Spotify playlist:  python downloader.py https://open.spotify.com/playlist/...")
+        print("\n  --no-archive       Download again even if already in download_archive.txt")
         sys.exit(1)
 
-    url = sys.argv[1]
+    url = args[0]
+    archive = None if '--no-archive' in sys.argv else DownloadArchive()
 
     # Route to appropriate downloader based on URL
     if is_spotify_url(url):
-        download_spotify(url)
+        download_spotify(url, archive=archive)
     else:
-        download_mp3(url)
+        download_mp3(url, archive=archive)
@@ -7,16 +7,55 @@ import os
 import webbrowser
 import re
 
+DEFAULT_WORKERS = 3  # downloads running at once
+MAX_WORKERS = 8
+
+# yt-dlp progress lines - shown in the slot's progress bar instead of the log
+PROGRESS_RE = re.compile(r'^\[download\]\s+(\d+(?:\.\d+)?)%')
+
+class DownloadSlot:
+    """One progress row; runs one downloader.py process at a time"""
+    def __init__(self, parent, number):
+        self.number = number
+        self.url = None
+        self.process = None
+
+        self.frame = tk.Frame(parent, bg="#f0f0f0")
+        self.frame.pack(fill=tk.X, padx=5, pady=2)
+
+        tk.Label(self.frame, text=f"#{number}", width=3,
+                font=("Arial", 9, "bold"), bg="#f0f0f0").pack(side=tk.LEFT)
+
+        self.progress = ttk.Progressbar(self.frame, length=160, mode='determinate', maximum=100)
+        self.progress.pack(side=tk.LEFT, padx=5)
+
+        self.status_label = tk.Label(self.frame, text="Idle", font=("Arial", 9),
+                                     bg="#f0f0f0", fg="#555", anchor=tk.W)
+        self.status_label.pack(side=tk.LEFT, fill=tk.X, expand=True)
+
+    def set_status(self, text=None, percent=None):
+        if text is not None:
+            self.status_label.config(text=text[:80])
+        if percent is not None:
+            self.progress['value'] = percent
+
+    def destroy(self):
+        self.frame.destroy()
+
 class DownloaderGUI:
     def __init__(self, root):
         self.root = root
         self.root.title("YouTube & Spotify MP3 Downloader")
-        self.root.geometry("700x650")
+        self.root.geometry("700x750")
 
-        # URL queue
+        # URL queue (waiting URLs only - running ones live in self.slots)
         self.url_queue = []
-        self.download_thread = None
+        self.slots = []
         self.is_downloading = False
+        self.completed_count = 0
+        self.failed_count = 0
+        self.worker_count = tk.IntVar(value=DEFAULT_WORKERS)
+        self.skip_downloaded = tk.BooleanVar(value=True)
 
         # Create UI
         self.create_widgets()
@@ -88,6 +127,20 @@ class DownloaderGUI:
                                  bg="#9E9E9E", fg="white", state=tk.DISABLED)
         self.stop_btn.pack(side=tk.RIGHT, padx=5)
 
+        # Concurrency
+        workers_frame = tk.Frame(self.root)
+        workers_frame.pack(fill=tk.X, padx=20)
+
+        tk.Label(workers_frame, text="Parallel downloads:").pack(side=tk.LEFT)
+
+        self.workers_spinbox = tk.Spinbox(workers_frame, from_=1, to=MAX_WORKERS, width=4,
+                                          textvariable=self.worker_count, state="readonly")
+        self.workers_spinbox.pack(side=tk.LEFT, padx=5)
+
+        # Tracks already in download_archive.txt (shared with the CLI) are skipped
+        tk.Checkbutton(workers_frame, text="Skip already downloaded tracks",
+                       variable=self.skip_downloaded).pack(side=tk.LEFT, padx=15)
+
         # Progress Frame
         progress_frame = tk.Frame(self.root, bg="#f0f0f0", relief=tk.RIDGE, bd=2)
         progress_frame.pack(fill=tk.X, padx=20, pady=10)
@@ -96,9 +149,10 @@ class DownloaderGUI:
                                        font=("Arial", 11, "bold"), bg="#f0f0f0")
         self.progress_label.pack(pady=5)
 
-        self.current_song_label = tk.Label(progress_frame, text="",
-                                          font=("Arial", 9), bg="#f0f0f0", fg="#555")
-        self.current_song_label.pack(pady=2)
+        # One row per download slot
+        self.slots_frame = tk.Frame(progress_frame, bg="#f0f0f0")
+        self.slots_frame.pack(fill=tk.X, pady=2)
+        self.build_slots()
 
         # Status Frame
         status_label = tk.Label(self.root, text="Status:",
@@ -127,7 +181,7 @@ class DownloaderGUI:
     def add_url(self):
         url = self.url_entry.get().strip()
         if url:
-            if url in self.url_queue:
+            if url in self.url_queue or any(slot.url == url for slot in self.slots):
                 messagebox.showwarning("Duplicate", "This URL is already in the queue!")
                 return
 
@@ -136,9 +190,11 @@ class DownloaderGUI:
             self.url_entry.delete(0, tk.END)
             self.log(f"Added: {url}")
 
-            # Auto-start download if not already downloading
+            # Auto-start download if not already downloading, otherwise use a free slot
             if not self.is_downloading:
                 self.start_download()
+            else:
+                self.fill_slots()
         else:
             messagebox.showwarning("Empty URL", "Please enter a URL!")
 
@@ -173,11 +229,6 @@ class DownloaderGUI:
             messagebox.showinfo("Can't Move", "This item is already at the top!")
             return
 
-        # Don't allow moving if currently downloading
-        if self.is_downloading and index == 0:
-            messagebox.showwarning("Download in Progress", "Cannot move the item currently being downloaded!")
-            return
-
         # Swap in list
         self.url_queue[index], self.url_queue[index-1] = self.url_queue[index-1], self.url_queue[index]
 
@@ -199,11 +250,6 @@ class DownloaderGUI:
             messagebox.showinfo("Can't Move", "This item is already at the bottom!")
             return
 
-        # Don't allow moving if it's currently downloading
-        if self.is_downloading and index == 0:
-            messagebox.showwarning("Download in Progress", "Cannot move the item currently being downloaded!")
-            return
-
         # Swap in list
         self.url_queue[index], self.url_queue[index+1] = self.url_queue[index+1], self.url_queue[index]
 
@@ -218,6 +264,16 @@ class DownloaderGUI:
         self.status_text.insert(tk.END, f"{message}\n")
         self.status_text.see(tk.END)
 
+    def build_slots(self):
+        for slot in self.slots:
+            slot.destroy()
+        self.slots = [DownloadSlot(self.slots_frame, i + 1) for i in range(self.worker_count.get())]
+
+    def update_overall(self):
+        active = sum(1 for slot in self.slots if slot.url)
+        self.progress_label.config(text=f"Active: {active} | Queued: {len(self.url_queue)} | "
+                                        f"Completed: {self.completed_count} | Failed: {self.failed_count}")
+
     def start_download(self):
         if not self.url_queue:
             messagebox.showwarning("Empty Queue", "Add some URLs to the queue first!")
@@ -227,98 +283,135 @@ class DownloaderGUI:
             messagebox.showinfo("Already Downloading", "Download is already in progress!")
             return
 
+        if any(slot.url for slot in self.slots):
+            messagebox.showinfo("Stopping", "Wait for the stopped downloads to finish closing!")
+            return
+
         self.is_downloading = True
         self.download_btn.config(state=tk.DISABLED)
         self.stop_btn.config(state=tk.NORMAL)
+        self.workers_spinbox.config(state=tk.DISABLED)
 
-        # Start download thread
-        self.download_thread = threading.Thread(target=self.download_worker, daemon=True)
-        self.download_thread.start()
+        self.completed_count = 0
+        self.failed_count = 0
+        self.build_slots()
+        self.fill_slots()
 
     def stop_download(self):
         self.is_downloading = False
+        for slot in self.slots:
+            if slot.process and slot.process.poll() is None:
+                slot.process.terminate()
         self.log("\nDownload stopped by user!")
         self.download_btn.config(state=tk.NORMAL)
         self.stop_btn.config(state=tk.DISABLED)
 
-    def download_worker(self):
+    def fill_slots(self):
+        """Hand waiting URLs to free slots. Runs on the Tk thread, which owns url_queue"""
+        for slot in self.slots:
+            if not self.is_downloading or not self.url_queue:
+                break
+            if slot.url is None:
+                url = self.url_queue.pop(0)
+                self.queue_listbox.delete(0)
+                slot.url = url
+                slot.set_status(f"Starting: {url}", 0)
+                self.log(f"[#{slot.number}] Downloading: {url}")
+                threading.Thread(target=self.download_worker, args=(slot, url), daemon=True).start()
+
+        self.update_overall()
+
+        # Everything finished (or stopped and drained)
+        if not any(slot.url for slot in self.slots):
+            self.download_complete()
+
+    def slot_finished(self, slot, url, success):
+        slot.url = None
+        slot.process = None
+        if success:
+            self.completed_count += 1
+            self.log(f"[#{slot.number}] ✓ Completed: {url}")
+            slot.set_status("✓ Completed", 100)
+        else:
+            self.failed_count += 1
+            self.log(f"[#{slot.number}] ✗ Failed: {url}")
+            slot.set_status("✗ Failed")
+        self.fill_slots()
+
+    def download_worker(self, slot, url):
+        """Run one URL in its own downloader.py process, reporting to its slot row"""
         python_path = r"C:\Users\Thorton\AppData\Local\Programs\Python\Python312\python.exe"
         downloader_path = os.path.join(os.path.dirname(__file__), "downloader.py")
-
-        while self.url_queue and self.is_downloading:
-            url = self.url_queue[0]
-            self.log(f"\n{'='*60}")
-            self.log(f"Downloading: {url}")
-            self.log(f"{'='*60}")
-
-            # Reset progress
-            self.root.after(0, lambda: self.progress_label.config(text="Processing..."))
-            self.root.after(0, lambda: self.current_song_label.config(text=""))
-
-            try:
-                playlist_total = 0
-                current_item = 0
-
-                process = subprocess.Popen(
-                    [python_path, downloader_path, url],
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.STDOUT,
-                    text=True,
-                    bufsize=1,
-                    creationflags=subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0
-                )
-
-                for line in process.stdout:
-                    if not self.is_downloading:
-                        process.terminate()
-                        break
-
-                    self.log(line.rstrip())
-
-                    # Parse playlist info
-                    if "Downloading" in line and "items of" in line:
-                        match = re.search(r'Downloading (\d+) items of (\d+)', line)
-                        if match:
-                            playlist_total = int(match.group(2))
-
-                    # Parse current item
-                    if "Downloading item" in line and "of" in line:
-                        match = re.search(r'Downloading item (\d+) of (\d+)', line)
-                        if match:
-                            current_item = int(match.group(1))
-                            total = int(match.group(2))
-                            remaining = total - current_item
-                            progress_text = f"Downloading: Song {current_item} of {total} ({remaining} remaining)"
-                            self.root.after(0, lambda t=progress_text: self.progress_label.config(text=t))
-
-                    # Parse song title
-                    if "Successfully downloaded:" in line:
-                        song_title = line.split("Successfully downloaded:")[-1].strip()
-                        self.root.after(0, lambda s=song_title: self.current_song_label.config(text=f"Current: {s}"))
-
-                process.wait()
-
-                if process.returncode == 0:
-                    self.log(f"✓ Completed: {url}")
-                    self.root.after(0, lambda: self.progress_label.config(text="✓ Completed!"))
-                else:
-                    self.log(f"✗ Failed: {url}")
-                    self.root.after(0, lambda: self.progress_label.config(text="✗ Failed"))
-
-                # Remove from queue and listbox
-                self.url_queue.pop(0)
-                self.root.after(0, lambda: self.queue_listbox.delete(0))
-
-            except Exception as e:
-                self.log(f"Error: {e}")
-
-        # Done downloading
-        self.root.after(0, self.download_complete)
+        success = False
+
+        try:
+            item_text = ""
+
+            # Share the CPU between slots - each process runs its own ffmpeg transcoders
+            env = dict(os.environ)
+            env.setdefault('MEDIA_TOOL_TRANSCODERS', str(max(1, (os.cpu_count() or 2) // len(self.slots))))
+
+            command = [python_path, downloader_path, url]
+            if not self.skip_downloaded.get():
+                command.append("--no-archive")
+
+            process = subprocess.Popen(
+                command,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+                bufsize=1,
+                env=env,
+                creationflags=subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0
+            )
+            slot.process = process
+
+            for line in process.stdout:
+                if not self.is_downloading:
+                    process.terminate()
+                    break
+
+                line = line.rstrip()
+
+                # Per-file percentage goes to the progress bar, not the log
+                match = PROGRESS_RE.match(line)
+                if match:
+                    percent = float(match.group(1))
+                    self.root.after(0, slot.set_status, None, percent)
+                    continue
+
+                self.root.after(0, self.log, f"[#{slot.number}] {line}")
+
+                # Parse current item
+                match = re.search(r'Downloading item (\d+) of (\d+)', line)
+                if match:
+                    current_item = int(match.group(1))
+                    total = int(match.group(2))
+                    item_text = f"Song {current_item} of {total}"
+                    self.root.after(0, slot.set_status, item_text, 0)
+
+                # Parse song title
+                if "Destination:" in line:
+                    song_title = os.path.splitext(os.path.basename(line.split("Destination:")[-1].strip()))[0]
+                    self.root.after(0, slot.set_status, f"{item_text} {song_title}".strip())
+
+                if "Successfully downloaded:" in line:
+                    song_title = line.split("Successfully downloaded:")[-1].strip()
+                    self.root.after(0, slot.set_status, f"Current: {song_title}")
+
+            process.wait()
+            success = process.returncode == 0
+
+        except Exception as e:
+            self.root.after(0, self.log, f"[#{slot.number}] Error: {e}")
+
+        self.root.after(0, self.slot_finished, slot, url, success)
 
     def download_complete(self):
         self.is_downloading = False
         self.download_btn.config(state=tk.NORMAL)
         self.stop_btn.config(state=tk.DISABLED)
+        self.workers_spinbox.config(state="readonly")
         self.log("\n" + "="*60)
         self.log("All downloads complete!")
         self.log("="*60)
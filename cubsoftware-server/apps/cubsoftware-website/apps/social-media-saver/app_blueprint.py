@@ -1,12 +1,39 @@
-from flask import Blueprint, render_template, request, jsonify, send_file
+from flask import Blueprint, render_template, request, jsonify, send_file, Response, stream_with_context
+import mimetypes
 import os
+import sys
 import threading
 import time
 import uuid
+import re
+import copy
+import glob
 import json
-from datetime import datetime, timedelta
+import importlib.util
+
+import request_budget  # website root, next to main.py
 
 APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def load_local_module(name):
+    """Load a module from this folder by path (the app folder isn't a package)"""
+    module_name = f'social_media_saver_{name}'
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    spec = importlib.util.spec_from_file_location(module_name, os.path.join(APP_DIR, f'{name}.py'))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+job_queue = load_local_module('job_queue')
+
+# Loaded once - keeps yt-dlp and its pooled YoutubeDL instances warm between jobs
+downloader = load_local_module('downloader')
+media_cache = load_local_module('media_cache')
+job_events = load_local_module('job_events')
+job_lifecycle = load_local_module('job_lifecycle')
+job_store = load_local_module('job_store')
 WEBSITE_DATA_PATH = os.path.join(APP_DIR, '..', '..', 'data')
 DISABLED_FEATURES_FILE = os.path.join(WEBSITE_DATA_PATH, 'disabled_features.json')
 
@@ -42,9 +69,78 @@ def check_feature_status():
 DOWNLOAD_FOLDER = os.path.join(APP_DIR, 'downloads')
 os.makedirs(DOWNLOAD_FOLDER, exist_ok=True)
 
+# Finished downloads are kept here so popular links are served straight from disk
+CACHE_FOLDER = os.path.join(DOWNLOAD_FOLDER, 'cache')
+CACHE_MAX_BYTES = int(os.environ.get('SMS_CACHE_MAX_MB', 2048)) * 1024 * 1024
+CACHE_TTL = int(os.environ.get('SMS_CACHE_TTL', 6 * 3600))  # seconds
+cache = media_cache.MediaCache(CACHE_FOLDER, max_bytes=CACHE_MAX_BYTES, ttl=CACHE_TTL)
+
+# Jobs and counters survive restarts in SQLite; `downloads` is the in-memory working copy
+JOBS_DB = os.path.join(WEBSITE_DATA_PATH, 'social_media_jobs.db')
+MAX_ATTEMPTS = 3  # a job interrupted this many times is failed instead of re-queued
+store = job_store.JobStore(JOBS_DB)
+
 # Store download status
 downloads = {}
-total_downloads = 0  # Global stats counter
+total_downloads = store.get_stat('total_downloads')  # Global stats counter
+JOB_LOG_LINES = 50  # Each job keeps only its latest log lines
+
+# Wakes progress streams when a job changes
+events = job_events.JobEvents()
+
+# Finished jobs and their leftover files are removed on a deadline
+JOB_RETENTION = int(os.environ.get('SMS_JOB_RETENTION', 15 * 60))  # seconds a finished job stays queryable
+MAX_JOBS = int(os.environ.get('SMS_MAX_JOBS', 1000))  # oldest finished jobs go first past this
+STRAY_FILE_TTL = 30  # seconds before files left behind by failed jobs are deleted
+expiry = job_lifecycle.ExpiryScheduler()
+
+# Download worker pool - gunicorn only has 4 request threads, so yt-dlp runs on its own bounded pool
+MAX_CONCURRENT_DOWNLOADS = int(os.environ.get('SMS_DOWNLOAD_WORKERS', 3))
+MAX_QUEUED_DOWNLOADS = 50
+MAX_DOWNLOADS_PER_IP = 2  # running at once
+MAX_QUEUED_PER_IP = 5
+PLATFORM_CONCURRENCY = {
+    'instagram': 2,
+    'tiktok': 2,
+    'twitter': 2,
+    'facebook': 1
+}
+
+# Long-lived responses (progress events, live file streams) each hold a request thread. They
+# share a small cap here and the site-wide request_budget (also used by the PM2 dashboard
+# streams and probes). Clients fall back to polling when either is used up.
+STREAM_SLOTS = threading.BoundedSemaphore(int(os.environ.get('SMS_STREAM_SLOTS', 2)))
+
+# Progress events - /api/progress pushes job changes, at most this many messages per second
+PROGRESS_UPDATES_PER_SECOND = int(os.environ.get('SMS_PROGRESS_RATE', 4))
+PROGRESS_STREAM_HEARTBEAT = 15
+PROGRESS_STREAM_MAX_DURATION = 300
+
+# Live delivery - /api/download-file streams the .part file while yt-dlp is still writing it
+LIVE_STREAM_CHUNK = 256 * 1024
+LIVE_STREAM_POLL = 0.25  # seconds between checks for new data
+LIVE_STREAM_IDLE_TIMEOUT = 60  # give up if the file stops growing
+
+# Metadata-only probes - results are reused by the following download while the
+# extracted media URLs are still valid. Probes run on the request thread, so they're capped
+# and count against request_budget too.
+PROBE_TTL = int(os.environ.get('SMS_PROBE_TTL', 300))  # seconds
+PROBE_CACHE_SIZE = 500
+PROBE_SLOTS = threading.BoundedSemaphore(2)
+probe_cache = media_cache.TTLCache(PROBE_CACHE_SIZE, PROBE_TTL)
+
+MAX_HEIGHT_CHOICES = (240, 360, 480, 720, 1080, 1440, 2160)
+FORMAT_ID_PATTERN = re.compile(r'^[\w.+-]{1,64}$')
+
+def get_client_ip():
+    """Get the real client IP address"""
+    if request.headers.get('CF-Connecting-IP'):
+        return request.headers.get('CF-Connecting-IP')
+    if request.headers.get('X-Forwarded-For'):
+        return request.headers.get('X-Forwarded-For').split(',')[0].strip()
+    if request.headers.get('X-Real-IP'):
+        return request.headers.get('X-Real-IP')
+    return request.remote_addr
 
 @social_media_bp.route('/')
 def index():
@@ -65,6 +161,10 @@ def download():
     if not platform:
         return jsonify({'error': 'Unsupported platform. Please use Instagram, TikTok, Twitter/X, or Facebook URLs.'}), 400
 
+    format_spec, error = parse_format_choice(data)
+    if error:
+        return jsonify({'error': error}), 400
+
     # Generate unique download ID
     download_id = str(uuid.uuid4())
 
@@ -73,34 +173,189 @@ def download():
         'status': 'queued',
         'platform': platform,
         'url': url,
+        'format': format_spec,
         'progress': 0,
         'file': None,
         'error': None,
-        'logs': []
+        'logs': job_events.LogBuffer(JOB_LOG_LINES)
     }
+    client_ip = get_client_ip()
+    store.create(download_id, platform, url, format_spec, client_ip)
+
+    # Popular links are already on disk - no need to queue
+    blob = cache.get(url_cache_key(url, format_spec))
+    if blob:
+        complete_download(download_id, blob, 'Served from cache')
+        return jsonify({'download_id': download_id, 'platform': platform, 'queue_position': None})
+
+    # Hand the download to the worker pool
+    try:
+        scheduler.submit(download_id, client_ip, platform, url, platform, format_spec)
+    except job_queue.QueueFull as e:
+        del downloads[download_id]
+        store.delete(download_id)
+        response = jsonify({'error': str(e), 'retry_after': e.retry_after})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response
 
-    # Start download in background thread
-    thread = threading.Thread(target=process_download, args=(download_id, url, platform))
-    thread.daemon = True
-    thread.start()
+    return jsonify({
+        'download_id': download_id,
+        'platform': platform,
+        'queue_position': scheduler.position(download_id)
+    })
+
+@social_media_bp.route('/api/probe', methods=['POST'])
+def probe():
+    """Look up a link's title and available formats without downloading it"""
+    data = request.json or {}
+    url = data.get('url', '').strip()
 
-    return jsonify({'download_id': download_id, 'platform': platform})
+    if not url:
+        return jsonify({'error': 'Please provide a valid URL'}), 400
+
+    platform = detect_platform(url)
+    if not platform:
+        return jsonify({'error': 'Unsupported platform. Please use Instagram, TikTok, Twitter/X, or Facebook URLs.'}), 400
+
+    key = media_cache.canonicalize_url(url)
+    entry = probe_cache.get(key)
+    cached = entry is not None
+
+    if not cached:
+        if not request_budget.acquire(PROBE_SLOTS):
+            response = jsonify({'error': 'Server is busy, please try again shortly', 'retry_after': 5})
+            response.status_code = 503
+            response.headers['Retry-After'] = '5'
+            return response
+        try:
+            info = downloader.probe(url, platform)
+        except Exception as e:
+            return jsonify({'error': f'Could not read {platform} link: {e}'}), 400
+        finally:
+            request_budget.release(PROBE_SLOTS)
+
+        entry = {'info': info, 'summary': downloader.summarize_formats(info)}
+        probe_cache.put(key, entry)
+
+    return jsonify(dict(entry['summary'], platform=platform, cached=cached))
+
+def parse_format_choice(data):
+    """Format selector from a request's format_id / max_height. Returns (spec, error)"""
+    format_id = data.get('format_id')
+    max_height = data.get('max_height')
+
+    if format_id:
+        if not isinstance(format_id, str) or not FORMAT_ID_PATTERN.match(format_id):
+            return None, 'Invalid format'
+        return downloader.format_spec_for(format_id=format_id), None
+
+    if max_height:
+        try:
+            max_height = int(max_height)
+        except (TypeError, ValueError):
+            return None, 'Invalid max_height'
+        if max_height not in MAX_HEIGHT_CHOICES:
+            return None, f'max_height must be one of {", ".join(map(str, MAX_HEIGHT_CHOICES))}'
+        return downloader.format_spec_for(max_height=max_height), None
+
+    return downloader.format_spec_for(), None
 
 @social_media_bp.route('/api/status/<download_id>')
 def get_status(download_id):
     """Get download status"""
+    status = get_job(download_id)
+    if status is None:
+        return jsonify({'error': 'Download not found'}), 404
+
+    return jsonify(dict(status, logs=list(status['logs']), **job_state(download_id, status)))
+
+@social_media_bp.route('/api/progress/<download_id>')
+def progress_stream(download_id):
+    """Server-Sent Events stream pushing changes to a download job"""
     if download_id not in downloads:
         return jsonify({'error': 'Download not found'}), 404
 
-    return jsonify(downloads[download_id])
+    if not request_budget.acquire(STREAM_SLOTS):
+        # Client falls back to polling /api/status
+        return jsonify({'error': 'Too many live connections'}), 503
+
+    def generate():
+        try:
+            started = time.time()
+            last_sent = 0
+            version = -1
+            sent = {}
+            logs_seen = 0
+            yield 'retry: 1000\n\n'
+
+            while time.time() - started < PROGRESS_STREAM_MAX_DURATION:
+                job = downloads.get(download_id)
+                # Queue position moves without notifications, so re-check queued jobs every second
+                timeout = 1 if job and job['status'] == 'queued' else PROGRESS_STREAM_HEARTBEAT
+                current = events.wait(download_id, version, timeout)
+
+                # Coalesce bursts - anything that changes while we hold off goes out in one message
+                delay = last_sent + 1 / PROGRESS_UPDATES_PER_SECOND - time.time()
+                if delay > 0:
+                    time.sleep(delay)
+                    current = events.version(download_id)
+                version = current
+
+                job = downloads.get(download_id)
+                if job is None:
+                    yield 'event: gone\ndata: {}\n\n'
+                    return
+
+                # Only send fields that changed since the last message
+                state = dict(job_state(download_id, job), status=job['status'],
+                             progress=job['progress'], error=job['error'])
+                delta = {key: value for key, value in state.items() if sent.get(key, object()) != value}
+                sent.update(delta)
+                new_logs = job['logs'].since(logs_seen)
+                logs_seen = job['logs'].total
+                if new_logs:
+                    delta['logs'] = new_logs
+
+                if delta:
+                    last_sent = time.time()
+                    yield f'id: {version}\ndata: {json.dumps(delta)}\n\n'
+                elif time.time() - last_sent >= PROGRESS_STREAM_HEARTBEAT:
+                    last_sent = time.time()
+                    yield ': ping\n\n'
+
+                if job['status'] in ('completed', 'failed'):
+                    yield 'event: done\ndata: {}\n\n'
+                    return
+        finally:
+            request_budget.release(STREAM_SLOTS)
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # Disable nginx buffering
+    return response
+
+def job_state(download_id, job):
+    """Derived fields the page needs besides the raw job record"""
+    if job['status'] == 'queued':
+        return {'queue_position': scheduler.position(download_id)}
+    # Tells the page it can start fetching the file before the download finishes
+    return {
+        'streamable': job['status'] == 'downloading' and bool(job.get('partial_file')),
+        'streamed': job.get('streamed', False)
+    }
 
 @social_media_bp.route('/api/download-file/<download_id>')
 def download_file(download_id):
     """Download the completed file"""
-    if download_id not in downloads:
+    download_info = get_job(download_id)
+    if download_info is None:
         return jsonify({'error': 'Download not found'}), 404
 
-    download_info = downloads[download_id]
+    if download_info['status'] == 'downloading' and download_info.get('partial_file'):
+        response = stream_partial_file(download_id)
+        if response is not None:
+            return response
 
     if download_info['status'] != 'completed' or not download_info['file']:
         return jsonify({'error': 'File not ready'}), 400
@@ -110,13 +365,97 @@ def download_file(download_id):
     if not os.path.exists(file_path):
         return jsonify({'error': 'File not found'}), 404
 
-    return send_file(file_path, as_attachment=True)
+    # Cached files are named by content hash - keep giving users the per-download name.
+    # conditional=True answers Range requests; full responses go through wsgi.file_wrapper,
+    # which gunicorn serves with sendfile().
+    download_name = download_id + os.path.splitext(file_path)[1]
+    return send_file(file_path, as_attachment=True, download_name=download_name, conditional=True)
+
+def stream_partial_file(download_id):
+    """Stream a download's file while it's still being written, or None if that isn't possible"""
+    download_info = downloads[download_id]
+    if not request_budget.acquire(STREAM_SLOTS):
+        return None
+
+    partial_name = download_info['partial_file']
+    try:
+        # The open handle keeps working after yt-dlp renames the file and the cache moves it
+        f = open(os.path.join(DOWNLOAD_FOLDER, partial_name), 'rb')
+    except OSError:
+        # Already finished and renamed - the caller serves the completed file
+        request_budget.release(STREAM_SLOTS)
+        return None
+
+    # Tells the status poll not to trigger a second download on completion
+    download_info['streamed'] = True
+    events.notify(download_id)
+    state = {'finished': False}
+
+    def generate():
+        idle = 0
+        while True:
+            chunk = f.read(LIVE_STREAM_CHUNK)
+            if chunk:
+                idle = 0
+                yield chunk
+                continue
+
+            # At EOF - only finished once yt-dlp is done writing
+            status = download_info['status']
+            if status == 'completed':
+                chunk = f.read(LIVE_STREAM_CHUNK)
+                while chunk:
+                    yield chunk
+                    chunk = f.read(LIVE_STREAM_CHUNK)
+                state['finished'] = True
+                return
+            if status == 'failed' or idle >= LIVE_STREAM_IDLE_TIMEOUT:
+                # Drop the connection instead of ending the response cleanly,
+                # so the browser marks the download as failed
+                raise IOError(f'Live stream for {download_id} aborted ({status})')
+
+            time.sleep(LIVE_STREAM_POLL)
+            idle += LIVE_STREAM_POLL
+
+    def close():
+        # Runs even if the client went away before the body was started
+        if not state['finished']:
+            # Let the page fetch the completed file normally instead
+            download_info['streamed'] = False
+            events.notify(download_id)
+        f.close()
+        request_budget.release(STREAM_SLOTS)
+
+    final_name = partial_name[:-len('.part')] if partial_name.endswith('.part') else partial_name
+    ext = os.path.splitext(final_name)[1]
+    response = Response(generate(), mimetype=mimetypes.guess_type(final_name)[0] or 'application/octet-stream')
+    response.headers['Content-Disposition'] = f'attachment; filename="{download_id}{ext}"'
+    response.headers['Cache-Control'] = 'no-store'
+    response.headers['X-Accel-Buffering'] = 'no'
+    if download_info.get('total_bytes'):
+        # Exact size known up front - lets the browser show real progress
+        response.headers['Content-Length'] = str(download_info['total_bytes'])
+    response.call_on_close(close)
+    return response
 
 @social_media_bp.route('/api/stats')
 def get_stats():
     """Get global download stats"""
     return jsonify({
-        'total_downloads': total_downloads
+        'total_downloads': total_downloads,
+        'queue': scheduler.stats(),
+        'cache': cache.stats(),
+        'jobs': {
+            'count': len(downloads),
+            'max': MAX_JOBS,
+            'memory_bytes': job_table_bytes(),
+            'expiry': expiry.stats()
+        },
+        'disk': {
+            'work_bytes': work_folder_bytes(),
+            'cache_bytes': cache.stats()['bytes'],
+            'cache_max_bytes': CACHE_MAX_BYTES
+        }
     })
 
 def detect_platform(url):
@@ -134,56 +473,219 @@ def detect_platform(url):
 
     return None
 
-def process_download(download_id, url, platform):
+def job_from_row(row):
+    """Rebuild an in-memory job from its stored row"""
+    return {
+        'status': row['status'],
+        'platform': row['platform'],
+        'url': row['url'],
+        'format': row['format'],
+        'progress': 100 if row['status'] == 'completed' else 0,
+        'file': row['file'],
+        'error': row['error'],
+        'logs': job_events.LogBuffer(JOB_LOG_LINES)
+    }
+
+def get_job(download_id):
+    """In-memory job, falling back to the store (e.g. a job owned by another worker process)"""
+    job = downloads.get(download_id)
+    if job is None:
+        row = store.get(download_id)
+        if row:
+            job = job_from_row(row)
+    return job
+
+def url_cache_key(url, format_spec='best'):
+    """Cache key for a share link in a given format"""
+    return 'url:' + media_cache.canonicalize_url(url) + format_key_suffix(format_spec)
+
+def format_key_suffix(format_spec):
+    # Keeps keys for the default format unchanged
+    return '' if format_spec == 'best' else '|' + format_spec
+
+def complete_download(download_id, blob, message='Download completed!'):
+    """Mark a job finished, pointing at its file in the cache"""
+    global total_downloads
+    downloads[download_id]['status'] = 'completed'
+    downloads[download_id]['file'] = os.path.join('cache', blob)
+    downloads[download_id]['progress'] = 100
+    downloads[download_id]['logs'].append(message)
+    store.update(download_id, status='completed', file=downloads[download_id]['file'],
+                 media_id=downloads[download_id].get('media_id'), finished_at=time.time())
+    events.notify(download_id)
+    finish_job(download_id)
+
+    # Increment global stats
+    total_downloads = store.increment_stat('total_downloads')
+
+def process_download(download_id, url, platform, format_spec='best'):
     """Process the download in background"""
-    try:
-        downloads[download_id]['status'] = 'downloading'
-        downloads[download_id]['logs'].append(f'Starting {platform} download...')
+    url_key = url_cache_key(url, format_spec)
 
-        # Import downloader using importlib
-        import importlib.util
-        downloader_path = os.path.join(APP_DIR, 'downloader.py')
-        spec = importlib.util.spec_from_file_location("downloader", downloader_path)
-        downloader_module = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(downloader_module)
+    # Reuse a recent probe of this link instead of extracting it again
+    probed = probe_cache.get(media_cache.canonicalize_url(url))
+    info = copy.deepcopy(probed['info']) if probed else None
 
-        # Download the content
-        file_path = downloader_module.download_content(url, platform, DOWNLOAD_FOLDER, download_id, downloads)
+    def find_cached(media_id):
+        blob = cache.get('media:' + media_id + format_key_suffix(format_spec))
+        if blob:
+            # Different link to a video we already have
+            cache.add_key(url_key, blob)
+            return cache.path(blob)
+        return None
 
-        if file_path and os.path.exists(file_path):
-            downloads[download_id]['status'] = 'completed'
-            downloads[download_id]['file'] = os.path.basename(file_path)
-            downloads[download_id]['progress'] = 100
-            downloads[download_id]['logs'].append('Download completed!')
+    def fetch():
+        # Download the content
+        file_path = downloader.download_content(url, platform, DOWNLOAD_FOLDER, download_id, downloads,
+                                                find_cached=find_cached,
+                                                on_update=lambda: events.notify(download_id),
+                                                format_spec=format_spec, info=info)
 
-            # Increment global stats
-            global total_downloads
-            total_downloads += 1
-        else:
+        if not file_path or not os.path.exists(file_path):
             raise Exception('Download failed - no file created')
 
+        if os.path.dirname(os.path.abspath(file_path)) == os.path.abspath(CACHE_FOLDER):
+            return os.path.basename(file_path)
+
+        keys = [url_key]
+        if downloads[download_id].get('media_id'):
+            keys.append('media:' + downloads[download_id]['media_id'] + format_key_suffix(format_spec))
+        return cache.put(keys, file_path)
+
+    try:
+        downloads[download_id]['status'] = 'downloading'
+        downloads[download_id]['logs'].append(f'Starting {platform} download...')
+        store.start_attempt(download_id)
+        events.notify(download_id)
+
+        # Identical links requested at the same time share one download
+        blob, shared = cache.single_flight(url_key, fetch)
+        if shared:
+            downloads[download_id]['logs'].append('Shared an identical download already in progress')
+
+        complete_download(download_id, blob)
+
     except Exception as e:
-        downloads[download_id]['status'] = 'failed'
-        downloads[download_id]['error'] = str(e)
         downloads[download_id]['logs'].append(f'Error: {str(e)}')
+        fail_job(download_id, str(e))
+
+def fail_job(download_id, error):
+    downloads[download_id]['status'] = 'failed'
+    downloads[download_id]['error'] = error
+    store.update(download_id, status='failed', error=error, finished_at=time.time())
+    events.notify(download_id)
+    finish_job(download_id)
+
+def finish_job(download_id, retention=JOB_RETENTION):
+    """Schedule removal of a finished job and anything it left in the download folder"""
+    expiry.schedule(('job', download_id), retention, lambda: remove_job(download_id))
+
+    # Successful downloads were moved into the cache; this only finds leftovers (.part etc.)
+    for path in glob.glob(os.path.join(DOWNLOAD_FOLDER, download_id + '.*')):
+        schedule_file_removal(path)
+
+    excess = len(downloads) - MAX_JOBS
+    if excess > 0:
+        for key in expiry.earliest('job', excess):
+            expiry.expire_now(key)
+
+def remove_job(download_id):
+    downloads.pop(download_id, None)
+    store.delete(download_id)
+    events.forget(download_id)
+
+def restore_jobs():
+    """Reload jobs saved before a restart. Returns the ids of re-queued jobs"""
+    now = time.time()
+    store.delete_finished_before(now - JOB_RETENTION)
+
+    for row in store.jobs(('completed', 'failed')):
+        downloads[row['id']] = job_from_row(row)
+        finish_job(row['id'], retention=max(row['finished_at'] + JOB_RETENTION - now, 0))
+
+    resumed = []
+    for row in store.jobs(('queued', 'downloading')):
+        download_id = row['id']
+        downloads[download_id] = job_from_row(row)
+        downloads[download_id]['status'] = 'queued'
+
+        if row['attempts'] >= MAX_ATTEMPTS:
+            fail_job(download_id, 'Download was interrupted too many times')
+            continue
 
-def cleanup_old_files():
-    """Clean up files older than 30 seconds"""
-    while True:
         try:
-            current_time = datetime.now()
-            for filename in os.listdir(DOWNLOAD_FOLDER):
-                file_path = os.path.join(DOWNLOAD_FOLDER, filename)
-                if os.path.isfile(file_path):
-                    file_age = current_time - datetime.fromtimestamp(os.path.getmtime(file_path))
-                    if file_age > timedelta(seconds=30):
-                        os.remove(file_path)
-                        print(f"Cleaned up old file: {filename}")
-        except Exception as e:
-            print(f"Cleanup error: {e}")
+            scheduler.submit(download_id, row['client_ip'] or 'unknown', row['platform'],
+                             row['url'], row['platform'], row['format'])
+        except job_queue.QueueFull:
+            fail_job(download_id, 'Server restarted, please try again')
+            continue
 
-        time.sleep(15)  # Run every 15 seconds
+        store.update(download_id, status='queued')
+        downloads[download_id]['logs'].append('Resumed after server restart')
+        resumed.append(download_id)
 
-# Start cleanup thread
-cleanup_thread = threading.Thread(target=cleanup_old_files, daemon=True)
-cleanup_thread.start()
+    if resumed:
+        print(f"Social Media Saver: re-queued {len(resumed)} interrupted download(s)")
+    return resumed
+
+def schedule_file_removal(path, delay=STRAY_FILE_TTL):
+    expiry.schedule(('file', path), delay, lambda: remove_file(path))
+
+def remove_file(path):
+    try:
+        os.remove(path)
+        print(f"Cleaned up old file: {os.path.basename(path)}")
+    except FileNotFoundError:
+        pass
+
+def schedule_cache_sweep():
+    """Expire cache entries, then sleep until the next one is due"""
+    next_expiry = cache.expire()
+    delay = next_expiry - time.time() if next_expiry else CACHE_TTL
+    expiry.schedule(('cache', 'sweep'), max(delay, 1), schedule_cache_sweep)
+
+def job_table_bytes():
+    """Rough memory held by the job table"""
+    total = sys.getsizeof(downloads)
+    for download_id, job in list(downloads.items()):
+        total += sys.getsizeof(download_id) + sys.getsizeof(job)
+        total += sum(sys.getsizeof(value) for value in job.values())
+        total += sum(sys.getsizeof(line) for line in list(job['logs']))
+    return total
+
+def work_folder_bytes():
+    """Bytes of in-progress and leftover files outside the cache"""
+    total = 0
+    with os.scandir(DOWNLOAD_FOLDER) as entries:
+        for entry in entries:
+            if entry.is_file():
+                total += entry.stat().st_size
+    return total
+
+# Start expiry thread and download workers
+expiry.start()
+scheduler = job_queue.DownloadScheduler(
+    process_download,
+    workers=MAX_CONCURRENT_DOWNLOADS,
+    max_queue=MAX_QUEUED_DOWNLOADS,
+    max_per_ip=MAX_DOWNLOADS_PER_IP,
+    max_queued_per_ip=MAX_QUEUED_PER_IP,
+    platform_limits=PLATFORM_CONCURRENCY
+)
+# Recovery only runs in a process that starts with no other worker alive -
+# otherwise their running jobs and .part files would look abandoned
+if store.claim_recovery():
+    resumed_jobs = restore_jobs()
+
+    # Files from a previous run aren't tracked by anything, so clear them once -
+    # except partial downloads of re-queued jobs, which yt-dlp resumes
+    for filename in os.listdir(DOWNLOAD_FOLDER):
+        if filename.startswith('.') or filename.split('.')[0] in resumed_jobs:
+            continue
+        if os.path.isfile(os.path.join(DOWNLOAD_FOLDER, filename)):
+            schedule_file_removal(os.path.join(DOWNLOAD_FOLDER, filename))
+scheduler.start()
+schedule_cache_sweep()
+
+# Pre-create a YoutubeDL instance per platform without delaying startup
+threading.Thread(target=downloader.engine.warm_up, daemon=True).start()
@@ -1,8 +1,179 @@
 import yt_dlp
 import os
+import queue
+import threading
 from pathlib import Path
 
-def download_content(url, platform, download_folder, download_id, downloads_dict):
+# yt-dlp extractor used for each platform (pre-initialized when warming up)
+PLATFORM_EXTRACTORS = {
+    'instagram': 'Instagram',
+    'tiktok': 'TikTok',
+    'twitter': 'Twitter',
+    'facebook': 'Facebook'
+}
+
+BASE_YDL_OPTS = {
+    'format': 'best',  # Download best quality
+    'quiet': False,
+    'no_warnings': False,
+    'restrictfilenames': True,  # Sanitize filenames to remove special characters
+}
+
+
+class PooledYoutubeDL:
+    """A YoutubeDL instance that can be handed from one job to the next
+
+    Keeping the instance alive keeps its extractor instances (and whatever
+    they initialized), cookie jar and HTTP connection pool warm. Only the
+    per-job bits - output template and progress callback - are swapped.
+    """
+
+    def __init__(self, platform):
+        self.platform = platform
+        self.uses = 0
+        self.hook = None
+        self.ydl = yt_dlp.YoutubeDL(dict(BASE_YDL_OPTS))
+        self.ydl.add_progress_hook(self._dispatch_progress)
+
+    def _dispatch_progress(self, d):
+        if self.hook:
+            self.hook(d)
+
+    def prepare(self, outtmpl, hook, format_spec='best'):
+        # YoutubeDL reads outtmpl from params on every download, but compiles
+        # the format selector once in __init__ - rebuild it for this job
+        self.ydl.params['outtmpl']['default'] = outtmpl
+        if self.ydl.params.get('format') != format_spec:
+            self.ydl.params['format'] = format_spec
+            self.ydl.format_selector = self.ydl.build_format_selector(format_spec)
+        self.hook = hook
+        self.uses += 1
+
+    def release(self):
+        self.hook = None
+
+    def warm_up(self):
+        extractor = PLATFORM_EXTRACTORS.get(self.platform)
+        if extractor:
+            self.ydl.get_info_extractor(extractor)
+
+    def close(self):
+        self.ydl.close()
+
+
+class DownloaderEngine:
+    """Per-platform pools of reusable YoutubeDL instances"""
+
+    def __init__(self, pool_size=2, max_uses=50):
+        self.pool_size = pool_size
+        self.max_uses = max_uses  # recycle instances so caches/cookies can't grow forever
+        self.pools = {}
+        self.lock = threading.Lock()
+
+    def _pool(self, platform):
+        with self.lock:
+            if platform not in self.pools:
+                self.pools[platform] = queue.LifoQueue(maxsize=self.pool_size)
+            return self.pools[platform]
+
+    def acquire(self, platform):
+        try:
+            return self._pool(platform).get_nowait()
+        except queue.Empty:
+            instance = PooledYoutubeDL(platform)
+            instance.warm_up()
+            return instance
+
+    def release(self, instance):
+        instance.release()
+        if instance.uses >= self.max_uses:
+            instance.close()
+            return
+        try:
+            self._pool(instance.platform).put_nowait(instance)
+        except queue.Full:
+            instance.close()
+
+    def warm_up(self, platforms=None):
+        """Create one ready instance per platform so the first job doesn't pay for it"""
+        for platform in platforms or PLATFORM_EXTRACTORS:
+            pool = self._pool(platform)
+            if pool.empty():
+                instance = PooledYoutubeDL(platform)
+                instance.warm_up()
+                self.release(instance)
+
+
+engine = DownloaderEngine()
+
+
+def probe(url, platform):
+    """Metadata-only extraction - nothing is downloaded"""
+    instance = engine.acquire(platform)
+    try:
+        instance.prepare('%(id)s.%(ext)s', None)
+        return instance.ydl.extract_info(url, download=False)
+    finally:
+        engine.release(instance)
+
+
+def format_spec_for(format_id=None, max_height=None):
+    """yt-dlp format selector for a user's choice"""
+    if format_id:
+        return f'{format_id}/best'
+    if max_height:
+        # Unknown heights (photos) still match; nothing small enough -> take the smallest
+        return f'best[height<=?{max_height}]/worst'
+    return 'best'
+
+
+def summarize_formats(info):
+    """Trim an info dict down to what the page needs to offer a choice"""
+    duration = info.get('duration')
+    formats = []
+    for f in info.get('formats') or []:
+        vcodec, acodec = f.get('vcodec'), f.get('acodec')
+        # Video-only/audio-only streams would need ffmpeg to merge; storyboards aren't media
+        if f.get('ext') == 'mhtml' or (vcodec == 'none' and acodec == 'none'):
+            continue
+        if vcodec == 'none':
+            kind = 'audio'
+        elif acodec == 'none':
+            continue
+        else:
+            kind = 'video'
+
+        size = f.get('filesize') or f.get('filesize_approx')
+        approximate = not f.get('filesize')
+        if not size and f.get('tbr') and duration:
+            size = int(f['tbr'] * 1000 / 8 * duration)
+
+        formats.append({
+            'format_id': f.get('format_id'),
+            'ext': f.get('ext'),
+            'kind': kind,
+            'width': f.get('width'),
+            'height': f.get('height'),
+            'fps': f.get('fps'),
+            'filesize': size,
+            'filesize_approx': approximate,
+            'note': f.get('format_note')
+        })
+
+    formats.sort(key=lambda f: (f['kind'] != 'video', -(f['height'] or 0), -(f['filesize'] or 0)))
+    return {
+        'id': info.get('id'),
+        'title': info.get('title'),
+        'duration': duration,
+        'thumbnail': info.get('thumbnail'),
+        'extractor': info.get('extractor_key'),
+        'entries': len(info['entries']) if info.get('entries') is not None else None,
+        'formats': formats
+    }
+
+
+def download_content(url, platform, download_folder, download_id, downloads_dict, find_cached=None, on_update=None,
+                     format_spec=None, info=None):
     """
     Download content from Instagram, TikTok, or Twitter
 
@@ -12,60 +183,93 @@ def download_content(url, platform, download_folder, download_id, downloads_dict
         download_folder: Where to save the file
         download_id: Unique ID for this download
         downloads_dict: Dictionary to update with progress
+        find_cached: Optional callable(media_id) -> path of an already downloaded
+            copy, checked after metadata extraction and before downloading
+        on_update: Optional callable() run after every change to the job
+        format_spec: yt-dlp format selector chosen by the user (default: per platform)
+        info: Metadata from an earlier probe, skips extracting it again
 
     Returns:
         Path to the downloaded file
     """
+    job = downloads_dict[download_id]
+
+    def changed():
+        if on_update:
+            on_update()
+
+    def log(message):
+        job['logs'].append(message)
+        changed()
 
     def progress_hook(d):
         """Update progress during download"""
         if d['status'] == 'downloading':
+            # Plain HTTP downloads grow a single .part file in order, so it can be
+            # streamed to the client while it's written (HLS/DASH get remuxed afterwards)
+            if (not job.get('partial_file') and d.get('tmpfilename') and
+                    d.get('info_dict', {}).get('protocol') in ('http', 'https')):
+                job['partial_file'] = os.path.basename(d['tmpfilename'])
+                job['total_bytes'] = d.get('total_bytes')
+                changed()
+
             if 'total_bytes' in d and d['total_bytes'] > 0:
                 progress = int((d['downloaded_bytes'] / d['total_bytes']) * 100)
-                downloads_dict[download_id]['progress'] = progress
-                downloads_dict[download_id]['logs'].append(f'Downloading... {progress}%')
+                # yt-dlp calls this for every chunk - only record whole-percent steps
+                if progress != job['progress']:
+                    job['progress'] = progress
+                    log(f'Downloading... {progress}%')
         elif d['status'] == 'finished':
-            downloads_dict[download_id]['logs'].append('Processing file...')
-
-    # Configure yt-dlp options
-    ydl_opts = {
-        'format': 'best',  # Download best quality
-        'outtmpl': os.path.join(download_folder, f'{download_id}.%(ext)s'),
-        'progress_hooks': [progress_hook],
-        'quiet': False,
-        'no_warnings': False,
-        'restrictfilenames': True,  # Sanitize filenames to remove special characters
-    }
+            log('Processing file...')
 
     # Platform-specific settings
     if platform == 'instagram':
-        downloads_dict[download_id]['logs'].append('Fetching Instagram content...')
+        log('Fetching Instagram content...')
         # Instagram: Download the best quality photo/video
-        ydl_opts['format'] = 'best'
+        default_format = 'best'
 
     elif platform == 'tiktok':
-        downloads_dict[download_id]['logs'].append('Fetching TikTok video...')
+        log('Fetching TikTok video...')
         # TikTok: Try to get version without watermark
-        ydl_opts['format'] = 'best'
+        default_format = 'best'
 
     elif platform == 'twitter':
-        downloads_dict[download_id]['logs'].append('Fetching Twitter/X media...')
+        log('Fetching Twitter/X media...')
         # Twitter: Download best quality media
-        ydl_opts['format'] = 'best'
+        default_format = 'best'
+
+    else:
+        default_format = 'best'
 
+    format_spec = format_spec or default_format
+
+    instance = engine.acquire(platform)
     try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            # Extract info to get the filename
-            info = ydl.extract_info(url, download=True)
+        instance.prepare(os.path.join(download_folder, f'{download_id}.%(ext)s'), progress_hook, format_spec)
+        ydl = instance.ydl
+
+        # Extract metadata first so a cached copy of the same video can be reused
+        if info is None:
+            info = ydl.extract_info(url, download=False)
+        media_id = f"{info.get('extractor_key')}:{info.get('id')}"
+        job['media_id'] = media_id
+
+        if find_cached:
+            cached_path = find_cached(media_id)
+            if cached_path:
+                log('Found in cache')
+                return cached_path
 
-            # Get the actual filename
-            filename = ydl.prepare_filename(info)
+        info = ydl.process_ie_result(info, download=True)
 
-            if os.path.exists(filename):
-                downloads_dict[download_id]['logs'].append(f'Downloaded: {Path(filename).name}')
-                return filename
-            else:
-                raise Exception('File was not created')
+        # Get the actual filename
+        filename = ydl.prepare_filename(info)
+
+        if os.path.exists(filename):
+            log(f'Downloaded: {Path(filename).name}')
+            return filename
+        else:
+            raise Exception('File was not created')
 
     except Exception as e:
         error_msg = str(e)
@@ -73,8 +277,59 @@ def download_content(url, platform, download_folder, download_id, downloads_dict
         # Provide more user-friendly error messages for common issues
         if platform == 'facebook' and 'Cannot parse data' in error_msg:
             user_friendly_msg = 'Facebook download failed. This video may be private, restricted, or use a format that is currently unsupported. Try a different Facebook video or wait for CUBSOFTWARE to release an update.'
-            downloads_dict[download_id]['logs'].append(f'Error: {user_friendly_msg}')
+            log(f'Error: {user_friendly_msg}')
             raise Exception(user_friendly_msg)
 
-        downloads_dict[download_id]['logs'].append(f'Error: {error_msg}')
+        log(f'Error: {error_msg}')
         raise Exception(f'Failed to download from {platform}: {error_msg}')
+
+    finally:
+        engine.release(instance)
+
+
+# Benchmark: per-job setup overhead before (reload module + new YoutubeDL) and after (pooled)
+if __name__ == '__main__':
+    import importlib.util
+    import sys
+    import time
+
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    module_path = os.path.abspath(__file__)
+
+    def old_setup(platform):
+        spec = importlib.util.spec_from_file_location('downloader', module_path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        with yt_dlp.YoutubeDL(dict(BASE_YDL_OPTS)) as ydl:
+            ydl.get_info_extractor(PLATFORM_EXTRACTORS[platform])
+
+    def new_setup(platform):
+        instance = engine.acquire(platform)
+        instance.prepare(os.path.join('downloads', 'bench.%(ext)s'), None)
+        instance.ydl.get_info_extractor(PLATFORM_EXTRACTORS[platform])
+        engine.release(instance)
+
+    # A pooled instance must pick the format of the job it was prepared for
+    formats = [{'format_id': f'{height}p', 'url': f'https://example.com/{height}.mp4', 'ext': 'mp4',
+                'height': height, 'vcodec': 'h264', 'acodec': 'aac'} for height in (360, 720, 1080)]
+    instance = engine.acquire('instagram')
+    for format_spec, expected in ((format_spec_for(max_height=360), '360p'), (format_spec_for(), '1080p'),
+                                  (format_spec_for(format_id='720p'), '720p'), (format_spec_for(max_height=720), '720p')):
+        instance.prepare(os.path.join('downloads', 'check.%(ext)s'), None, format_spec)
+        info = instance.ydl.process_ie_result({'id': 'check', 'title': 'check', 'extractor': 'generic',
+                                               'extractor_key': 'Generic', 'webpage_url': 'https://example.com',
+                                               'formats': [dict(f) for f in formats]}, download=False)
+        assert info['format_id'] == expected, (format_spec, info['format_id'])
+    engine.release(instance)
+    print('Format selection check passed')
+
+    engine.warm_up()
+    print(f'Per-job setup overhead ({iterations} jobs per platform)')
+    print('=' * 60)
+    for label, setup in (('before (reload + new YoutubeDL)', old_setup), ('after (pooled instance)', new_setup)):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            for platform in PLATFORM_EXTRACTORS:
+                setup(platform)
+        per_job = (time.perf_counter() - start) * 1000 / (iterations * len(PLATFORM_EXTRACTORS))
+        print(f'{label:<34} {per_job:8.3f} ms/job')
@@ -0,0 +1,57 @@
+"""
+Social Media Saver - Job Progress Events
+
+Writers call JobEvents.notify(job_id) after changing a job, and progress
+streams block in wait() until something changed instead of the browser
+polling /api/status. Job logs live in a LogBuffer: a fixed-size ring that
+also counts every line ever added, so a stream can send just the new ones.
+"""
+
+import threading
+from collections import deque
+
+
+class LogBuffer(deque):
+    """Ring buffer of the last `maxlen` log lines"""
+
+    def __init__(self, maxlen=50):
+        super().__init__(maxlen=maxlen)
+        self.total = 0  # lines ever appended, including ones that fell off
+
+    def append(self, line):
+        super().append(line)
+        self.total += 1
+
+    def since(self, seen):
+        """Lines appended after the first `seen` (only those still in the buffer)"""
+        new = min(self.total - seen, len(self))
+        return list(self)[-new:] if new > 0 else []
+
+
+class JobEvents:
+    """Per-job change counters with a condition to wait on"""
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.versions = {}
+
+    def notify(self, job_id):
+        with self.cond:
+            self.versions[job_id] = self.versions.get(job_id, 0) + 1
+            self.cond.notify_all()
+
+    def version(self, job_id):
+        with self.cond:
+            return self.versions.get(job_id, 0)
+
+    def wait(self, job_id, seen, timeout):
+        """Block until the job's version differs from `seen` or timeout; returns the current version"""
+        with self.cond:
+            self.cond.wait_for(lambda: self.versions.get(job_id, 0) != seen, timeout=timeout)
+            return self.versions.get(job_id, 0)
+
+    def forget(self, job_id):
+        with self.cond:
+            self.versions.pop(job_id, None)
+            # Wake streams for this job so they notice it's gone
+            self.cond.notify_all()
@@ -0,0 +1,94 @@
+"""
+Social Media Saver - Job Lifecycle
+
+Finished job records, leftover files and cache sweeps each get an explicit
+deadline in one heap. A single thread sleeps until the earliest deadline
+and runs its callback, so nothing rescans the download folder on a timer.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+
+
+class ExpiryScheduler:
+    """Runs callback() for each key once its deadline passes
+
+    Scheduling a key again replaces its previous deadline; cancelled and
+    replaced entries are skipped lazily when they reach the top of the heap.
+    """
+
+    def __init__(self):
+        self.heap = []  # (deadline, seq, key, callback)
+        self.entries = {}  # key -> (deadline, seq, callback) of its live heap entry
+        self.seq = itertools.count()
+        self.cond = threading.Condition()
+        self.thread = None
+
+    def start(self):
+        with self.cond:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name='job-expiry', daemon=True)
+                self.thread.start()
+
+    def schedule(self, key, delay, callback):
+        with self.cond:
+            deadline = time.time() + delay
+            seq = next(self.seq)
+            self.entries[key] = (deadline, seq, callback)
+            heapq.heappush(self.heap, (deadline, seq, key, callback))
+            # Only the earliest deadline matters to the sleeping thread
+            if self.heap[0][1] == seq:
+                self.cond.notify()
+
+    def cancel(self, key):
+        with self.cond:
+            self.entries.pop(key, None)
+
+    def expire_now(self, key):
+        """Move a key's deadline to now"""
+        with self.cond:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.schedule(key, 0, entry[2])
+
+    def earliest(self, kind, count):
+        """Keys of the given kind (key[0]) with the soonest deadlines"""
+        with self.cond:
+            keys = [key for key in self.entries if key[0] == kind]
+            return sorted(keys, key=lambda key: self.entries[key][:2])[:count]
+
+    def stats(self):
+        with self.cond:
+            counts = {}
+            for key in self.entries:
+                counts[key[0]] = counts.get(key[0], 0) + 1
+            return {
+                'scheduled': counts,
+                'next_deadline_in': round(self.heap[0][0] - time.time(), 1) if self.heap else None
+            }
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while True:
+                    if not self.heap:
+                        self.cond.wait()
+                        continue
+                    deadline, seq, key, callback = self.heap[0]
+                    if key not in self.entries or self.entries[key][1] != seq:
+                        heapq.heappop(self.heap)  # cancelled or rescheduled
+                        continue
+                    delay = deadline - time.time()
+                    if delay > 0:
+                        self.cond.wait(delay)
+                        continue
+                    heapq.heappop(self.heap)
+                    del self.entries[key]
+                    break
+
+            try:
+                callback()
+            except Exception as e:
+                print(f'Expiry callback error ({key}): {e}')
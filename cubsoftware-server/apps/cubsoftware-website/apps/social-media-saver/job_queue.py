@@ -0,0 +1,143 @@
+"""
+Social Media Saver - Download Job Scheduler
+
+Bounded worker pool fed by a priority FIFO queue. Jobs wait in the queue
+until a worker is free AND their IP and platform are below their
+concurrency caps, so one user or one slow platform can't take every worker.
+"""
+
+import heapq
+import itertools
+import threading
+
+
+class QueueFull(Exception):
+    """Raised when a job can't be accepted. `retry_after` is a hint in seconds"""
+
+    def __init__(self, message, retry_after=10):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class DownloadScheduler:
+    """Runs handler(job_id, *args) on a fixed pool of worker threads"""
+
+    def __init__(self, handler, workers=3, max_queue=50, max_per_ip=2,
+                 max_queued_per_ip=5, platform_limits=None, default_platform_limit=2):
+        self.handler = handler
+        self.workers = workers
+        self.max_queue = max_queue
+        self.max_per_ip = max_per_ip
+        self.max_queued_per_ip = max_queued_per_ip
+        self.platform_limits = platform_limits or {}
+        self.default_platform_limit = default_platform_limit
+
+        self.queue = []  # heap of (priority, seq, job)
+        self.seq = itertools.count()
+        self.running = {}  # job_id -> job
+        self.running_by_ip = {}
+        self.running_by_platform = {}
+        self.queued_by_ip = {}
+        self.cond = threading.Condition()
+        self.threads = []
+
+    def start(self):
+        """Start the worker threads (idempotent)"""
+        with self.cond:
+            if self.threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._worker, name=f'download-worker-{i}', daemon=True)
+                thread.start()
+                self.threads.append(thread)
+
+    def submit(self, job_id, ip, platform, *args, priority=None):
+        """Queue a job. Raises QueueFull when the queue or the IP's share is full
+
+        Lower priority runs first. By default an IP's jobs are ranked by how
+        many it already has in flight, so other users' first jobs go ahead of
+        someone's fifth.
+        """
+        with self.cond:
+            if len(self.queue) >= self.max_queue:
+                raise QueueFull('Server is busy, please try again shortly', retry_after=30)
+
+            in_flight = self.queued_by_ip.get(ip, 0) + self.running_by_ip.get(ip, 0)
+            if self.queued_by_ip.get(ip, 0) >= self.max_queued_per_ip:
+                raise QueueFull('Too many downloads queued, please wait for some to finish', retry_after=10)
+
+            if priority is None:
+                priority = in_flight
+
+            job = {'id': job_id, 'ip': ip, 'platform': platform, 'args': args}
+            heapq.heappush(self.queue, (priority, next(self.seq), job))
+            self.queued_by_ip[ip] = self.queued_by_ip.get(ip, 0) + 1
+            self.cond.notify()
+
+    def position(self, job_id):
+        """1-based position in the queue, or None if not queued"""
+        with self.cond:
+            for i, (_, _, job) in enumerate(sorted(self.queue, key=lambda item: item[:2])):
+                if job['id'] == job_id:
+                    return i + 1
+        return None
+
+    def stats(self):
+        with self.cond:
+            return {
+                'workers': self.workers,
+                'running': len(self.running),
+                'queued': len(self.queue),
+                'max_queue': self.max_queue
+            }
+
+    def _platform_limit(self, platform):
+        return self.platform_limits.get(platform, self.default_platform_limit)
+
+    def _can_run(self, job):
+        return (self.running_by_ip.get(job['ip'], 0) < self.max_per_ip and
+                self.running_by_platform.get(job['platform'], 0) < self._platform_limit(job['platform']))
+
+    def _take_next(self):
+        """Pop the highest-priority job whose IP and platform have capacity"""
+        skipped = []
+        job = None
+        while self.queue:
+            item = heapq.heappop(self.queue)
+            if self._can_run(item[2]):
+                job = item[2]
+                break
+            skipped.append(item)
+        for item in skipped:
+            heapq.heappush(self.queue, item)
+        return job
+
+    def _increment(self, counter, key, delta):
+        counter[key] = counter.get(key, 0) + delta
+        if counter[key] <= 0:
+            del counter[key]
+
+    def _worker(self):
+        while True:
+            with self.cond:
+                job = self._take_next()
+                while job is None:
+                    self.cond.wait()
+                    job = self._take_next()
+
+                self._increment(self.queued_by_ip, job['ip'], -1)
+                self._increment(self.running_by_ip, job['ip'], 1)
+                self._increment(self.running_by_platform, job['platform'], 1)
+                self.running[job['id']] = job
+
+            try:
+                self.handler(job['id'], *job['args'])
+            except Exception as e:
+                print(f"Download worker error ({job['id']}): {e}")
+            finally:
+                with self.cond:
+                    del self.running[job['id']]
+                    self._increment(self.running_by_ip, job['ip'], -1)
+                    self._increment(self.running_by_platform, job['platform'], -1)
+                    # A freed IP/platform slot may unblock jobs other workers skipped
+                    self.cond.notify_all()
@@ -0,0 +1,151 @@
+"""
+Social Media Saver - Persistent Job Store
+
+SQLite copy of the job table and global counters, so a restart doesn't
+turn in-flight downloads into 404s or reset the stats. The in-memory
+`downloads` dict stays the fast path; this only sees state transitions
+(created, started, finished), never per-percent progress.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows - waitress runs a single process there
+    fcntl = None
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    platform TEXT NOT NULL,
+    url TEXT NOT NULL,
+    format TEXT NOT NULL DEFAULT 'best',
+    client_ip TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    file TEXT,
+    error TEXT,
+    media_id TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status);
+CREATE TABLE IF NOT EXISTS stats (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+# Columns callers may update
+JOB_FIELDS = ('status', 'platform', 'url', 'format', 'client_ip', 'attempts', 'file', 'error', 'media_id', 'finished_at')
+
+
+class JobStore:
+    """Thread-safe wrapper around one SQLite connection"""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.process_lock = None  # held (shared) for the life of the process, see claim_recovery()
+        self.db = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self.db.row_factory = sqlite3.Row
+        # WAL lets other processes (more gunicorn workers) read while we write
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.executescript(SCHEMA)
+        self.db.commit()
+
+    def claim_recovery(self):
+        """True if no other process has this store open, so startup recovery is ours
+
+        Every process keeps a shared lock on <db>.lock for its lifetime. A
+        new process may re-queue interrupted jobs and clear leftover files
+        only if it can take that lock exclusively - i.e. nobody else is
+        running. A worker respawned next to live siblings gets False, since
+        their 'downloading' jobs aren't interrupted. Startups are serialized
+        on <db>.startup.lock so two workers can't both see an empty room.
+        """
+        if fcntl is None:
+            return True
+        startup = open(self.path + '.startup.lock', 'a')
+        try:
+            fcntl.flock(startup, fcntl.LOCK_EX)
+            self.process_lock = open(self.path + '.lock', 'a')
+            try:
+                fcntl.flock(self.process_lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                claimed = True
+            except BlockingIOError:
+                claimed = False
+            fcntl.flock(self.process_lock, fcntl.LOCK_SH)
+        finally:
+            startup.close()
+        return claimed
+
+    def create(self, job_id, platform, url, format_spec='best', client_ip=None, status='queued'):
+        now = time.time()
+        with self.lock:
+            self.db.execute(
+                'INSERT INTO jobs (id, status, platform, url, format, client_ip, created_at, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (job_id, status, platform, url, format_spec, client_ip, now, now))
+            self.db.commit()
+
+    def update(self, job_id, **fields):
+        unknown = set(fields) - set(JOB_FIELDS)
+        if unknown:
+            raise ValueError(f'Unknown job fields: {", ".join(sorted(unknown))}')
+        fields['updated_at'] = time.time()
+        columns = ', '.join(f'{name} = ?' for name in fields)
+        with self.lock:
+            self.db.execute(f'UPDATE jobs SET {columns} WHERE id = ?', (*fields.values(), job_id))
+            self.db.commit()
+
+    def start_attempt(self, job_id):
+        """Mark a job downloading and count the attempt"""
+        with self.lock:
+            self.db.execute("UPDATE jobs SET status = 'downloading', attempts = attempts + 1, updated_at = ? "
+                            "WHERE id = ?", (time.time(), job_id))
+            self.db.commit()
+
+    def get(self, job_id):
+        with self.lock:
+            row = self.db.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def delete(self, job_id):
+        with self.lock:
+            self.db.execute('DELETE FROM jobs WHERE id = ?', (job_id,))
+            self.db.commit()
+
+    def jobs(self, statuses):
+        """All jobs in the given states, oldest first"""
+        marks = ', '.join('?' for _ in statuses)
+        with self.lock:
+            rows = self.db.execute(f'SELECT * FROM jobs WHERE status IN ({marks}) ORDER BY created_at',
+                                   tuple(statuses)).fetchall()
+        return [dict(row) for row in rows]
+
+    def delete_finished_before(self, cutoff):
+        with self.lock:
+            cursor = self.db.execute("DELETE FROM jobs WHERE status IN ('completed', 'failed') AND finished_at < ?",
+                                     (cutoff,))
+            self.db.commit()
+            return cursor.rowcount
+
+    # ---------- counters ----------
+
+    def increment_stat(self, name, amount=1):
+        with self.lock:
+            self.db.execute('INSERT INTO stats (name, value) VALUES (?, ?) '
+                            'ON CONFLICT(name) DO UPDATE SET value = value + excluded.value', (name, amount))
+            self.db.commit()
+            return self.db.execute('SELECT value FROM stats WHERE name = ?', (name,)).fetchone()[0]
+
+    def get_stat(self, name, default=0):
+        with self.lock:
+            row = self.db.execute('SELECT value FROM stats WHERE name = ?', (name,)).fetchone()
+        return row[0] if row else default
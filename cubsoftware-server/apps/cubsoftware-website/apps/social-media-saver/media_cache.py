@@ -0,0 +1,271 @@
+"""
+Social Media Saver - Downloaded Media Cache
+
+Finished downloads are stored once, named by the SHA-256 of their content,
+and looked up by canonical URL or by extractor video ID. The store is size
+bounded (least recently used blobs go first) and entries expire after a TTL.
+Concurrent jobs for the same key share one in-flight download.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# Query parameters that never change which media a link points to
+TRACKING_PARAMS = {
+    'igshid', 'igsh', 'utm_source', 'utm_medium', 'utm_campaign', 'utm_term', 'utm_content',
+    'is_from_webapp', 'sender_device', 'sender_web_id', '_r', '_t', 's', 't', 'ref', 'ref_src',
+    'mibextid', 'rdid', 'share_url', 'fbclid', 'si', 'feature'
+}
+
+HOST_ALIASES = {
+    'twitter.com': 'x.com',
+    'mobile.twitter.com': 'x.com',
+    'instagr.am': 'instagram.com',
+    'm.facebook.com': 'facebook.com',
+    'fb.com': 'facebook.com'
+}
+
+def canonicalize_url(url):
+    """Normalize a share link so different copies of it map to one cache key"""
+    parts = urlsplit(url.strip())
+    host = (parts.hostname or '').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    host = HOST_ALIASES.get(host, host)
+
+    query = sorted((k, v) for k, v in parse_qsl(parts.query) if k.lower() not in TRACKING_PARAMS)
+    path = parts.path.rstrip('/') or '/'
+    return urlunsplit(('https', host, path, urlencode(query), ''))
+
+
+class TTLCache:
+    """Small in-memory LRU whose entries expire after `ttl` seconds"""
+
+    def __init__(self, max_entries=500, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()  # key -> (expires_at, value)
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.time():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.time() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class InFlight:
+    """A download other jobs with the same key are waiting on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.blob = None
+        self.error = None
+
+
+class MediaCache:
+    """Size-bounded, TTL'd, content-addressed store of finished downloads"""
+
+    def __init__(self, folder, max_bytes=2 * 1024 ** 3, ttl=6 * 3600):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.index_file = os.path.join(folder, 'index.json')
+        self.lock = threading.Lock()
+        self.keys = {}  # cache key -> blob name
+        self.blobs = {}  # blob name -> {'size', 'created', 'last_access', 'keys'}
+        self.in_flight = {}  # cache key -> InFlight
+        self.total_bytes = 0
+        os.makedirs(folder, exist_ok=True)
+        self._load_index()
+
+    # ---------- persistence ----------
+
+    def _load_index(self):
+        if os.path.exists(self.index_file):
+            try:
+                with open(self.index_file, 'r') as f:
+                    data = json.load(f)
+                for name, blob in data.get('blobs', {}).items():
+                    if os.path.exists(os.path.join(self.folder, name)):
+                        self.blobs[name] = blob
+                        self.total_bytes += blob['size']
+                        for key in blob['keys']:
+                            self.keys[key] = name
+            except (OSError, ValueError, KeyError) as e:
+                print(f'Media cache index unreadable, starting empty: {e}')
+
+        # Remove blobs the index doesn't know about
+        for filename in os.listdir(self.folder):
+            if filename != 'index.json' and filename not in self.blobs:
+                try:
+                    os.remove(os.path.join(self.folder, filename))
+                except OSError:
+                    pass
+
+    def _save_index(self):
+        tmp = self.index_file + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({'blobs': self.blobs}, f)
+        os.replace(tmp, self.index_file)
+
+    # ---------- lookups ----------
+
+    def path(self, blob):
+        return os.path.join(self.folder, blob)
+
+    def get(self, key):
+        """Blob name for a key, or None if missing or expired"""
+        with self.lock:
+            name = self.keys.get(key)
+            if name is None:
+                return None
+            blob = self.blobs[name]
+            if time.time() - blob['created'] > self.ttl or not os.path.exists(self.path(name)):
+                self._remove_blob(name)
+                self._save_index()
+                return None
+            blob['last_access'] = time.time()
+            return name
+
+    def stats(self):
+        with self.lock:
+            return {
+                'entries': len(self.blobs),
+                'bytes': self.total_bytes,
+                'max_bytes': self.max_bytes,
+                'in_flight': len(self.in_flight)
+            }
+
+    # ---------- storing ----------
+
+    def put(self, keys, file_path):
+        """Move a finished download into the store under `keys`. Returns the blob name"""
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        ext = os.path.splitext(file_path)[1].lower()
+        name = digest.hexdigest() + ext
+
+        with self.lock:
+            if name in self.blobs:
+                # Same content already stored (e.g. different URL for the same video)
+                os.remove(file_path)
+                blob = self.blobs[name]
+            else:
+                shutil.move(file_path, self.path(name))
+                blob = self.blobs[name] = {
+                    'size': os.path.getsize(self.path(name)),
+                    'created': time.time(),
+                    'last_access': time.time(),
+                    'keys': []
+                }
+                self.total_bytes += blob['size']
+
+            blob['last_access'] = time.time()
+            for key in keys:
+                old = self.keys.get(key)
+                if old and old != name and old in self.blobs:
+                    self.blobs[old]['keys'].remove(key)
+                self.keys[key] = name
+                if key not in blob['keys']:
+                    blob['keys'].append(key)
+
+            self._evict(keep=name)
+            self._save_index()
+        return name
+
+    def add_key(self, key, name):
+        """Point another key at an existing blob"""
+        with self.lock:
+            if name in self.blobs and self.keys.get(key) != name:
+                self.keys[key] = name
+                self.blobs[name]['keys'].append(key)
+                self._save_index()
+
+    def _remove_blob(self, name):
+        blob = self.blobs.pop(name)
+        self.total_bytes -= blob['size']
+        for key in blob['keys']:
+            if self.keys.get(key) == name:
+                del self.keys[key]
+        try:
+            os.remove(self.path(name))
+        except OSError:
+            pass
+
+    def _evict(self, keep=None):
+        """Drop expired blobs, then least recently used ones until under max_bytes"""
+        now = time.time()
+        for name in [n for n, b in self.blobs.items() if now - b['created'] > self.ttl and n != keep]:
+            self._remove_blob(name)
+
+        if self.total_bytes > self.max_bytes:
+            for name in sorted(self.blobs, key=lambda n: self.blobs[n]['last_access']):
+                if self.total_bytes <= self.max_bytes:
+                    break
+                if name != keep:
+                    self._remove_blob(name)
+
+    def expire(self):
+        """Sweep expired entries. Returns when the next one expires (None if empty)"""
+        with self.lock:
+            before = len(self.blobs)
+            self._evict()
+            if len(self.blobs) != before:
+                self._save_index()
+            if not self.blobs:
+                return None
+            return min(blob['created'] for blob in self.blobs.values()) + self.ttl
+
+    # ---------- single flight ----------
+
+    def single_flight(self, key, produce):
+        """Run produce() -> blob name once per key; concurrent callers wait for and share the result
+
+        Returns (blob_name, shared) where shared is True when another job did the work.
+        """
+        with self.lock:
+            flight = self.in_flight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self.in_flight[key] = InFlight()
+
+        if not leader:
+            flight.done.wait()
+            if flight.error:
+                raise flight.error
+            return flight.blob, True
+
+        try:
+            flight.blob = produce()
+            return flight.blob, False
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.in_flight[key]
+            flight.done.set()
@@ -1,5 +1,8 @@
 let activeDownloads = new Set();
 let pollingIntervals = new Map();
+let streamedDownloads = new Set();
+let progressStreams = new Map();
+const MAX_LOG_LINES = 50;
 
 function startDownload() {
     const urlInput = document.getElementById('urlInput');
@@ -9,6 +12,7 @@ function startDownload() {
     const errorMessage = document.getElementById('errorMessage');
 
     const url = urlInput.value.trim();
+    const maxHeight = document.getElementById('qualitySelect').value;
 
     if (!url) {
         showError('Please enter a URL');
@@ -27,7 +31,7 @@ function startDownload() {
         headers: {
             'Content-Type': 'application/json'
         },
-        body: JSON.stringify({ url: url })
+        body: JSON.stringify(maxHeight ? { url: url, max_height: Number(maxHeight) } : { url: url })
     })
     .then(response => response.json())
     .then(data => {
@@ -45,8 +49,8 @@ function startDownload() {
         activeDownloads.add(data.download_id);
         createDownloadCard(data.download_id, url, data.platform);
 
-        // Start polling for status
-        startPolling(data.download_id);
+        // Follow progress (push, falling back to polling)
+        watchDownload(data.download_id);
     })
     .catch(error => {
         showError('Failed to start download: ' + error.message);
@@ -85,6 +89,72 @@ function createDownloadCard(downloadId, url, platform) {
     container.prepend(card);
 }
 
+function watchDownload(downloadId) {
+    if (!window.EventSource) {
+        startPolling(downloadId);
+        return;
+    }
+
+    // Server only sends changed fields - keep the merged state here
+    const state = { status: 'queued', progress: 0, logs: [] };
+    const stream = new EventSource(`/apps/social-media-saver/api/progress/${downloadId}`);
+    progressStreams.set(downloadId, stream);
+
+    const stop = () => {
+        stream.close();
+        progressStreams.delete(downloadId);
+    };
+
+    // Every (re)connect starts with the full state, including the buffered logs
+    stream.onopen = () => {
+        state.logs = [];
+    };
+
+    stream.onmessage = (event) => {
+        const delta = JSON.parse(event.data);
+        const newLogs = delta.logs || [];
+        delete delta.logs;
+        Object.assign(state, delta);
+        state.logs = state.logs.concat(newLogs).slice(-MAX_LOG_LINES);
+
+        if (handleStatus(downloadId, state)) {
+            stop();
+        }
+    };
+
+    stream.addEventListener('done', stop);
+    stream.addEventListener('gone', stop);
+
+    stream.onerror = () => {
+        // Refused (no free slot) or dropped for good - poll instead
+        if (stream.readyState === EventSource.CLOSED && progressStreams.get(downloadId) === stream) {
+            progressStreams.delete(downloadId);
+            startPolling(downloadId);
+        }
+    };
+}
+
+function handleStatus(downloadId, data) {
+    // Returns true once the job is finished
+    updateDownloadCard(downloadId, data);
+
+    // Start receiving the file as soon as the server can stream it
+    if (data.streamable && !streamedDownloads.has(downloadId)) {
+        streamedDownloads.add(downloadId);
+        triggerDownload(downloadId);
+    }
+
+    if (data.status === 'completed' || data.status === 'failed') {
+        // Skip if the file was already delivered while downloading
+        if (data.status === 'completed' && !data.streamed) {
+            triggerDownload(downloadId);
+        }
+        streamedDownloads.delete(downloadId);
+        return true;
+    }
+    return false;
+}
+
 function startPolling(downloadId) {
     const interval = setInterval(() => {
         fetch(`/apps/social-media-saver/api/status/${downloadId}`)
@@ -100,15 +170,9 @@ function startPolling(downloadId) {
                 return response.json();
             })
             .then(data => {
-                updateDownloadCard(downloadId, data);
-
-                if (data.status === 'completed' || data.status === 'failed') {
+                if (handleStatus(downloadId, data)) {
                     clearInterval(interval);
                     pollingIntervals.delete(downloadId);
-
-                    if (data.status === 'completed') {
-                        triggerDownload(downloadId);
-                    }
                 }
             })
             .catch(error => {
@@ -123,6 +187,16 @@ function updateDownloadCard(downloadId, data) {
     const statusBadge = document.getElementById(`status-${downloadId}`);
     const progressBar = document.getElementById(`progress-${downloadId}`);
     const logsSection = document.getElementById(`logs-${downloadId}`);
+    const title = document.getElementById(`title-${downloadId}`);
+
+    // Show queue position while waiting for a worker
+    if (title) {
+        if (data.status === 'queued' && data.queue_position) {
+            title.textContent = `Waiting in queue (position ${data.queue_position})`;
+        } else if (data.status !== 'queued') {
+            title.textContent = 'Preparing download...';
+        }
+    }
 
     // Update status badge
     if (statusBadge) {
@@ -1,5 +1,7 @@
 # Gunicorn configuration file for production deployment
 
+import os
+
 # Server socket
 bind = "127.0.0.1:3000"
 backlog = 2048
@@ -9,7 +11,8 @@ backlog = 2048
 # Use threads for concurrency instead of multiple workers
 workers = 1
 worker_class = 'gthread'
-threads = 4
+# Same default as request_budget.REQUEST_THREADS - long-lived streams are capped below it
+threads = int(os.environ.get('REQUEST_THREADS', 4))
 worker_connections = 1000
 timeout = 300
 keepalive = 2
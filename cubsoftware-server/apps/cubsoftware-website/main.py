@@ -1,4 +1,4 @@
-from flask import Flask, send_from_directory, render_template, redirect, request, jsonify, session, url_for
+from flask import Flask, send_from_directory, render_template, redirect, request, jsonify, session, url_for, Response, stream_with_context
 from waitress import serve
 import socket
 import os
@@ -7,9 +7,16 @@ import importlib.util
 import json
 import hashlib
 import time
+import math
 from datetime import datetime, timedelta
 import secrets
 import subprocess
+import threading
+import select
+import ctypes
+import ctypes.util
+import csv
+from array import array
 import requests
 import urllib.parse
 import atexit
@@ -22,6 +29,8 @@ import io
 # Add shared folder to path for imports
 sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'shared'))
 from bot_logger import BotLogger
+from pm2_rpc import PM2Client, PM2EventSubscriber, PM2RPCError, PM2RPCSentError
+import request_budget
 
 # Initialize bot logger
 logger = BotLogger('cubsoftware-website', os.environ.get('BOT_API_KEY'))
@@ -3024,131 +3033,735 @@ def pm2_logout():
     session.pop('pm2_user', None)
     return redirect(url_for('pm2_login'))
 
+# ==================== PM2 BACKGROUND POLLER ====================
+
+# A single background thread samples `pm2 jlist` and system stats into an
+# in-memory snapshot, so dashboard viewers never spawn the CLI themselves.
+PM2_POLL_INTERVAL = float(os.environ.get('PM2_POLL_INTERVAL', 2))  # seconds between samples
+PM2_POLL_IDLE_TIMEOUT = 60  # slow down sampling when nobody has viewed the dashboard for this long
+# Each SSE stream holds a request thread, so keep them scarce - they also draw from the
+# site-wide request_budget shared with the social media saver's streams and probes
+PM2_STREAM_MAX_CLIENTS = {'processes': 2, 'logs': 1}
+PM2_STREAM_MAX_DURATION = 300  # close streams periodically, EventSource reconnects on its own
+PM2_STREAM_HEARTBEAT = 15  # seconds between keep-alive comments
+
+pm2_snapshot = {
+    'version': 0,
+    'data': None,  # dict served to clients
+    'json': None,  # pre-serialized copy of data
+    'error': None,
+    'updated_at': 0
+}
+pm2_snapshot_cond = threading.Condition()
+pm2_poll_wakeup = threading.Event()
+pm2_poller_thread = None
+pm2_poller_lock = threading.Lock()
+pm2_last_viewed = 0
+pm2_stream_clients = {'processes': 0, 'logs': 0}
+pm2_log_paths = {}  # process name -> {'out': path, 'err': path, 'date_format': bool}
+
+# Talk to the PM2 daemon socket directly; the CLI is only a fallback
+pm2_client = PM2Client()
+pm2_events = PM2EventSubscriber(lambda event, data: pm2_poll_wakeup.set())
+
+def pm2_list_processes():
+    """`pm2 jlist` data, fetched over the daemon socket when possible"""
+    if pm2_client.is_available():
+        try:
+            return pm2_client.list_processes()
+        except (PM2RPCError, TypeError, AttributeError, KeyError, IndexError) as e:
+            # A reply we can't read is treated like no daemon at all
+            print(f'PM2 RPC failed, falling back to CLI: {e}')
+
+    result = subprocess.run(
+        ['pm2', 'jlist'],
+        capture_output=True,
+        text=True,
+        timeout=10
+    )
+
+    if result.returncode != 0:
+        raise RuntimeError('Failed to get PM2 processes')
+
+    return json.loads(result.stdout)
+
+def run_pm2_action(action, process_name):
+    """Run start/stop/restart/reset over RPC, falling back to the CLI. Returns (success, error)"""
+    if pm2_client.is_available():
+        try:
+            getattr(pm2_client, action)(process_name)
+            return True, None
+        except PM2RPCSentError as e:
+            # The daemon already has the command - running it again via the CLI could restart twice
+            print(f'PM2 RPC {action} failed after it was sent: {e}')
+            return False, str(e)
+        except (PM2RPCError, TypeError, AttributeError, KeyError, IndexError) as e:
+            # Nothing was sent yet (a PM2RPCSentError is caught above), so the CLI is safe
+            print(f'PM2 RPC {action} failed, falling back to CLI: {e}')
+
+    result = subprocess.run(
+        ['pm2', action, process_name],
+        capture_output=True,
+        text=True,
+        timeout=30
+    )
+    return result.returncode == 0, result.stderr
+
+def collect_pm2_snapshot():
+    """Fetch the PM2 process list once and build the dashboard payload"""
+    global pm2_log_paths
+    processes_data = pm2_list_processes()
+
+    processes = []
+    log_paths = {}
+    total_cpu = 0
+    total_memory = 0
+
+    for proc in processes_data:
+        cpu = proc.get('monit', {}).get('cpu', 0)
+        memory = proc.get('monit', {}).get('memory', 0)
+        total_cpu += cpu
+        total_memory += memory
+
+        pm2_env = proc.get('pm2_env', {})
+
+        # Kept server-side only, used by the log reader
+        log_paths[proc.get('name')] = {
+            'out': pm2_env.get('pm_out_log_path'),
+            'err': pm2_env.get('pm_err_log_path'),
+            'date_format': bool(pm2_env.get('log_date_format'))
+        }
+
+        processes.append({
+            'name': proc.get('name'),
+            'pm_id': proc.get('pm_id'),
+            'pid': proc.get('pid'),
+            'status': pm2_env.get('status', 'unknown'),
+            'cpu': cpu,
+            'memory': memory,
+            'uptime': time.time() * 1000 - pm2_env.get('pm_uptime', time.time() * 1000) if pm2_env.get('status') == 'online' else 0,
+            'restarts': pm2_env.get('restart_time', 0),
+            'exec_mode': pm2_env.get('exec_mode', 'fork'),
+            'instances': pm2_env.get('instances', 1)
+        })
+
+    # Get system stats
+    try:
+        # Non-blocking: measures CPU since the previous sample taken by this thread
+        import psutil
+        system_cpu = psutil.cpu_percent(interval=None)
+        system_memory = psutil.virtual_memory().percent
+    except ImportError:
+        # Fallback if psutil not installed
+        system_cpu = total_cpu
+        system_memory = 0
+
+    # Swap in a new dict in one step - readers never see it half rebuilt
+    pm2_log_paths = log_paths
+
+    return {
+        'processes': processes,
+        'system': {
+            'cpu': system_cpu,
+            'memory': system_memory
+        }
+    }
+
+def pm2_snapshot_fingerprint(data):
+    """Hash of the snapshot ignoring uptime, used to skip pushing unchanged samples"""
+    stable = {
+        'processes': [{k: v for k, v in p.items() if k != 'uptime'} for p in data['processes']],
+        'system': data['system']
+    }
+    return hashlib.md5(json.dumps(stable, sort_keys=True).encode()).hexdigest()
+
+def publish_pm2_snapshot(data=None, error=None):
+    """Store a new snapshot and wake up every waiting viewer"""
+    with pm2_snapshot_cond:
+        if data is not None:
+            pm2_snapshot['data'] = data
+            pm2_snapshot['json'] = json.dumps(data)
+        pm2_snapshot['error'] = error
+        pm2_snapshot['updated_at'] = time.time()
+        pm2_snapshot['version'] += 1
+        pm2_snapshot_cond.notify_all()
+
+# ==================== PM2 METRICS HISTORY ====================
+
+# Per-process CPU/memory/restarts kept in fixed-size arrays at three
+# resolutions, so memory use stays constant no matter how long we run.
+PM2_HISTORY_ENABLED = os.environ.get('PM2_HISTORY_ENABLED', '1') != '0'
+PM2_HISTORY_IDLE_INTERVAL = 10  # seconds between samples when nobody is viewing
+PM2_HISTORY_MAX_PROCESSES = 64
+# The finest bucket is one poll interval (2s by default, rounded up to whole
+# seconds) - the poller never samples faster, so 1s buckets would be half
+# empty. While nobody views the dashboard it samples every
+# PM2_HISTORY_IDLE_INTERVAL, and points() skips the buckets in between.
+PM2_HISTORY_STEP = max(1, math.ceil(PM2_POLL_INTERVAL))
+PM2_HISTORY_FINEST = f'{PM2_HISTORY_STEP}s'
+PM2_HISTORY_RESOLUTIONS = {
+    PM2_HISTORY_FINEST: (PM2_HISTORY_STEP, 3600 // PM2_HISTORY_STEP),  # last hour
+    '1m': (60, 1440),     # last day
+    '1h': (3600, 720)     # last 30 days
+}
+
+class MetricSeries:
+    """Ring buffer of time buckets at one resolution
+
+    Samples falling into the same bucket are averaged (cpu, memory) or
+    maxed (peak memory, restart count), which downsamples on write.
+    """
+
+    def __init__(self, step, capacity):
+        self.step = step
+        self.capacity = capacity
+        self.buckets = array('q', [-1]) * capacity  # bucket number stored in each slot
+        self.count = array('l', [0]) * capacity
+        self.cpu = array('d', [0.0]) * capacity  # running sum
+        self.memory = array('d', [0.0]) * capacity  # running sum
+        self.memory_max = array('d', [0.0]) * capacity
+        self.restarts = array('l', [0]) * capacity
+        self.latest = -1
+
+    def add(self, ts, cpu, memory, restarts):
+        bucket = int(ts // self.step)
+        i = bucket % self.capacity
+        if self.buckets[i] != bucket:
+            # Slot holds an expired bucket - overwrite it
+            self.buckets[i] = bucket
+            self.count[i] = 0
+            self.cpu[i] = 0.0
+            self.memory[i] = 0.0
+            self.memory_max[i] = 0.0
+            self.restarts[i] = 0
+        self.count[i] += 1
+        self.cpu[i] += cpu
+        self.memory[i] += memory
+        self.memory_max[i] = max(self.memory_max[i], memory)
+        self.restarts[i] = max(self.restarts[i], restarts)
+        self.latest = max(self.latest, bucket)
+
+    def points(self, since=None, limit=None):
+        """Chronological [ts, cpu, memory, memory_max, restarts] rows, skipping empty buckets"""
+        if self.latest < 0:
+            return []
+
+        first = self.latest - self.capacity + 1
+        if since is not None:
+            first = max(first, int(since // self.step))
+        if limit is not None:
+            first = max(first, self.latest - limit + 1)
+
+        rows = []
+        for bucket in range(first, self.latest + 1):
+            i = bucket % self.capacity
+            if self.buckets[i] != bucket or not self.count[i]:
+                continue
+            n = self.count[i]
+            rows.append([
+                bucket * self.step,
+                round(self.cpu[i] / n, 2),
+                int(self.memory[i] / n),
+                int(self.memory_max[i]),
+                self.restarts[i]
+            ])
+        return rows
+
+class MetricHistory:
+    """One MetricSeries per resolution for a single process"""
+
+    def __init__(self):
+        self.series = {name: MetricSeries(step, capacity)
+                       for name, (step, capacity) in PM2_HISTORY_RESOLUTIONS.items()}
+        self.last_seen = 0
+
+    def add(self, ts, cpu, memory, restarts):
+        self.last_seen = ts
+        for series in self.series.values():
+            series.add(ts, cpu, memory, restarts)
+
+pm2_history = {}  # process name -> MetricHistory
+pm2_system_history = MetricHistory()
+pm2_history_lock = threading.Lock()
+
+def record_pm2_history(data, ts=None):
+    """Append one poller snapshot to the history buffers"""
+    ts = ts or time.time()
+    with pm2_history_lock:
+        for proc in data['processes']:
+            history = pm2_history.get(proc['name'])
+            if history is None:
+                if len(pm2_history) >= PM2_HISTORY_MAX_PROCESSES:
+                    # Evict the process that disappeared longest ago
+                    oldest = min(pm2_history, key=lambda name: pm2_history[name].last_seen)
+                    del pm2_history[oldest]
+                history = pm2_history[proc['name']] = MetricHistory()
+            history.add(ts, proc['cpu'] or 0, proc['memory'] or 0, proc['restarts'] or 0)
+
+        # System memory is a percentage, stored in the memory column
+        pm2_system_history.add(ts, data['system']['cpu'] or 0, data['system']['memory'] or 0, 0)
+
+def query_pm2_history(resolution, since=None, limit=None, process_name=None):
+    """Collect history rows for one or all processes"""
+    with pm2_history_lock:
+        names = [process_name] if process_name else list(pm2_history)
+        processes = {name: pm2_history[name].series[resolution].points(since, limit)
+                     for name in names if name in pm2_history}
+        system = pm2_system_history.series[resolution].points(since, limit)
+    return processes, system
+
+def pm2_poller():
+    """Background loop sampling PM2 while the dashboard is being viewed"""
+    try:
+        import psutil
+        psutil.cpu_percent(interval=None)  # Prime the non-blocking CPU counter
+    except ImportError:
+        pass
+
+    last_fingerprint = None
+    while True:
+        idle = time.time() - pm2_last_viewed > PM2_POLL_IDLE_TIMEOUT
+        if idle:
+            # Nobody is watching - keep feeding the history slowly, or sleep until a request wakes us up
+            pm2_poll_wakeup.wait(PM2_HISTORY_IDLE_INTERVAL if PM2_HISTORY_ENABLED else None)
+        pm2_poll_wakeup.clear()
+
+        try:
+            data = collect_pm2_snapshot()
+            if PM2_HISTORY_ENABLED:
+                record_pm2_history(data)
+            fingerprint = pm2_snapshot_fingerprint(data)
+            if fingerprint != last_fingerprint or pm2_snapshot['error']:
+                last_fingerprint = fingerprint
+                publish_pm2_snapshot(data)
+            else:
+                # Keep uptimes fresh for REST readers without waking streams
+                with pm2_snapshot_cond:
+                    pm2_snapshot['data'] = data
+                    pm2_snapshot['json'] = json.dumps(data)
+                    pm2_snapshot['updated_at'] = time.time()
+        except subprocess.TimeoutExpired:
+            publish_pm2_snapshot(error='PM2 command timed out')
+        except json.JSONDecodeError:
+            publish_pm2_snapshot(error='Invalid PM2 response')
+        except Exception as e:
+            publish_pm2_snapshot(error=str(e))
+
+        if not idle:
+            # Wake on the interval grid rather than a full interval after this sample,
+            # so time spent collecting doesn't drift past a history bucket
+            pm2_poll_wakeup.wait(PM2_POLL_INTERVAL - time.time() % PM2_POLL_INTERVAL)
+
+def start_pm2_poller():
+    """Start the poller thread if it is not already running"""
+    global pm2_poller_thread
+    with pm2_poller_lock:
+        if pm2_poller_thread is None or not pm2_poller_thread.is_alive():
+            pm2_poller_thread = threading.Thread(target=pm2_poller, daemon=True)
+            pm2_poller_thread.start()
+            # Process events (crash, restart, stop) trigger an immediate sample
+            pm2_events.start()
+
+def touch_pm2_poller(refresh=False):
+    """Mark the dashboard as viewed, starting the poller on first use"""
+    global pm2_last_viewed
+    pm2_last_viewed = time.time()
+
+    start_pm2_poller()
+
+    if refresh or time.time() - pm2_snapshot['updated_at'] > PM2_POLL_INTERVAL * 2:
+        pm2_poll_wakeup.set()
+
+def acquire_pm2_stream_slot(kind):
+    """Reserve one of the limited SSE slots. Returns False when all are taken"""
+    with pm2_poller_lock:
+        if pm2_stream_clients[kind] >= PM2_STREAM_MAX_CLIENTS[kind] or not request_budget.acquire():
+            return False
+        pm2_stream_clients[kind] += 1
+        return True
+
+def release_pm2_stream_slot(kind):
+    """Give back an SSE slot when its stream ends"""
+    with pm2_poller_lock:
+        pm2_stream_clients[kind] -= 1
+        request_budget.release()
+
+def wait_for_pm2_snapshot(timeout=12):
+    """Block until the first snapshot exists (only on a cold start)"""
+    with pm2_snapshot_cond:
+        pm2_snapshot_cond.wait_for(lambda: pm2_snapshot['version'] > 0, timeout=timeout)
+        return pm2_snapshot['data'], pm2_snapshot['json'], pm2_snapshot['error']
+
 # PM2 API Endpoints
 @app.route('/api/pm2/processes')
 @pm2_auth_required
 def pm2_get_processes():
-    """Get all PM2 processes with system stats"""
-    try:
-        # Get PM2 process list in JSON format
-        result = subprocess.run(
-            ['pm2', 'jlist'],
-            capture_output=True,
-            text=True,
-            timeout=10
-        )
+    """Get all PM2 processes with system stats (served from the poller snapshot)"""
+    touch_pm2_poller()
+    data, data_json, error = wait_for_pm2_snapshot()
 
-        if result.returncode != 0:
-            return jsonify({'error': 'Failed to get PM2 processes'}), 500
-
-        processes_data = json.loads(result.stdout)
-
-        processes = []
-        total_cpu = 0
-        total_memory = 0
-
-        for proc in processes_data:
-            cpu = proc.get('monit', {}).get('cpu', 0)
-            memory = proc.get('monit', {}).get('memory', 0)
-            total_cpu += cpu
-            total_memory += memory
-
-            pm2_env = proc.get('pm2_env', {})
-
-            processes.append({
-                'name': proc.get('name'),
-                'pm_id': proc.get('pm_id'),
-                'pid': proc.get('pid'),
-                'status': pm2_env.get('status', 'unknown'),
-                'cpu': cpu,
-                'memory': memory,
-                'uptime': time.time() * 1000 - pm2_env.get('pm_uptime', time.time() * 1000) if pm2_env.get('status') == 'online' else 0,
-                'restarts': pm2_env.get('restart_time', 0),
-                'exec_mode': pm2_env.get('exec_mode', 'fork'),
-                'instances': pm2_env.get('instances', 1)
-            })
+    if error:
+        return jsonify({'error': error}), 500
+    if data_json is None:
+        return jsonify({'error': 'PM2 command timed out'}), 500
+
+    return Response(data_json, mimetype='application/json')
+
+@app.route('/api/pm2/stream')
+@pm2_auth_required
+def pm2_stream_processes():
+    """Server-Sent Events stream pushing PM2 snapshots as they change"""
+    if not acquire_pm2_stream_slot('processes'):
+        # Client falls back to polling /api/pm2/processes
+        return jsonify({'error': 'Too many live viewers'}), 503
+
+    touch_pm2_poller()
 
-        # Get system stats
+    def generate():
         try:
-            # Try to get system CPU and memory usage
-            import psutil
-            system_cpu = psutil.cpu_percent(interval=0.1)
-            system_memory = psutil.virtual_memory().percent
-        except ImportError:
-            # Fallback if psutil not installed
-            system_cpu = total_cpu
-            system_memory = 0
+            started = time.time()
+            last_version = 0
+            yield f'retry: {int(PM2_POLL_INTERVAL * 1000)}\n\n'
+
+            while time.time() - started < PM2_STREAM_MAX_DURATION:
+                with pm2_snapshot_cond:
+                    pm2_snapshot_cond.wait_for(lambda: pm2_snapshot['version'] != last_version,
+                                               timeout=PM2_STREAM_HEARTBEAT)
+                    version = pm2_snapshot['version']
+                    data_json = pm2_snapshot['json']
+                    error = pm2_snapshot['error']
+
+                # An open stream counts as an active viewer
+                touch_pm2_poller()
+
+                if version == last_version:
+                    yield ': ping\n\n'
+                    continue
+                last_version = version
+
+                if error:
+                    yield f'event: error\ndata: {json.dumps({"error": error})}\n\n'
+                elif data_json:
+                    yield f'id: {version}\ndata: {data_json}\n\n'
+        finally:
+            release_pm2_stream_slot('processes')
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # Disable nginx buffering
+    return response
 
-        return jsonify({
+@app.route('/api/pm2/history')
+@pm2_auth_required
+def pm2_get_history():
+    """CPU/memory/restart history for sparklines
+
+    Query: resolution (1m, 1h or PM2_HISTORY_FINEST - one poll interval, 2s by
+    default), points (max rows per process), since (unix seconds),
+    process (single process name).
+    Rows are [timestamp, cpu, memory, memory_max, restarts].
+    """
+    resolution = request.args.get('resolution', '1m')
+    if resolution not in PM2_HISTORY_RESOLUTIONS:
+        return jsonify({'error': 'Invalid resolution'}), 400
+
+    touch_pm2_poller()
+    points = request.args.get('points', 60, type=int)
+    since = request.args.get('since', type=float)
+    processes, system = query_pm2_history(resolution, since, points, request.args.get('process'))
+
+    return jsonify({
+        'resolution': resolution,
+        'step': PM2_HISTORY_RESOLUTIONS[resolution][0],
+        'columns': ['timestamp', 'cpu', 'memory', 'memory_max', 'restarts'],
+        'processes': processes,
+        'system': system
+    })
+
+@app.route('/api/pm2/history/export')
+@pm2_auth_required
+def pm2_export_history():
+    """Download the full history at one resolution as CSV or JSON"""
+    resolution = request.args.get('resolution', '1m')
+    if resolution not in PM2_HISTORY_RESOLUTIONS:
+        return jsonify({'error': 'Invalid resolution'}), 400
+
+    processes, system = query_pm2_history(resolution)
+    filename = f'pm2-history-{resolution}-{datetime.now().strftime("%Y%m%d-%H%M%S")}'
+
+    if request.args.get('format', 'csv') == 'json':
+        response = jsonify({
+            'resolution': resolution,
+            'columns': ['timestamp', 'cpu', 'memory', 'memory_max', 'restarts'],
             'processes': processes,
-            'system': {
-                'cpu': system_cpu,
-                'memory': system_memory
-            }
+            'system': system
         })
+        response.headers['Content-Disposition'] = f'attachment; filename={filename}.json'
+        return response
 
-    except subprocess.TimeoutExpired:
-        return jsonify({'error': 'PM2 command timed out'}), 500
-    except json.JSONDecodeError:
-        return jsonify({'error': 'Invalid PM2 response'}), 500
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(['process', 'timestamp', 'cpu', 'memory', 'memory_max', 'restarts'])
+    for name, rows in processes.items():
+        for row in rows:
+            writer.writerow([name] + row)
+    for row in system:
+        # System memory column is a percentage
+        writer.writerow(['[system]'] + row)
+
+    return Response(output.getvalue(), mimetype='text/csv',
+                    headers={'Content-Disposition': f'attachment; filename={filename}.csv'})
+
+# Sample continuously so history covers time when nobody has the dashboard open
+if PM2_HISTORY_ENABLED:
+    start_pm2_poller()
+
+# ==================== PM2 LOG TAILING ====================
+
+# Logs are read straight from PM2's log files instead of `pm2 logs`, so the
+# cost of a request depends on the lines returned, not on the file size.
+PM2_LOG_BLOCK_SIZE = 8192
+PM2_LOG_MAX_LINES = 2000
+PM2_LOG_MAX_BACKLOG = 256 * 1024  # bytes a resumed reader may catch up on before skipping ahead
+
+def resolve_pm2_log_path(process_name, log_type):
+    """Find a process log file from the poller snapshot. Returns (path, date_format)"""
+    touch_pm2_poller()
+    wait_for_pm2_snapshot()
+
+    paths = pm2_log_paths.get(process_name)
+    if not paths:
+        return None, False
+
+    path = paths['err'] if log_type in ('err', 'error') else paths['out']
+    return path, paths['date_format']
+
+def read_log_tail(path, count):
+    """Read the last `count` complete lines by seeking backwards in blocks
+
+    Returns (lines, offset) where offset is the byte position just after the
+    last complete line, suitable for resuming with read_log_from().
+    """
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        data = b''
+
+        while pos > 0 and data.count(b'\n') <= count:
+            step = min(PM2_LOG_BLOCK_SIZE, pos)
+            pos -= step
+            f.seek(pos)
+            data = f.read(step) + data
+
+    # Leave a partially written last line for the next read
+    end = data.rfind(b'\n') + 1
+    offset = pos + end
+    lines = data[:end].split(b'\n')[:-1]
+    if pos > 0 and lines:
+        lines = lines[1:]  # First line may have been cut by the block boundary
+
+    return [line.decode('utf-8', 'replace') for line in lines[-count:]], offset
+
+def read_log_from(f, offset, limit=PM2_LOG_MAX_BACKLOG):
+    """Read complete lines written after `offset` from an open log file
+
+    Returns (lines, offset). Jumps to the tail if the reader fell too far
+    behind, and restarts from 0 if the file was truncated (`pm2 flush`).
+    """
+    size = os.fstat(f.fileno()).st_size
+    if offset > size:
+        offset = 0
+
+    skipped = size - offset > limit
+    if skipped:
+        offset = size - limit
+
+    f.seek(offset)
+    data = f.read(limit)
+
+    if skipped:
+        # Drop the line we landed in the middle of
+        start = data.find(b'\n') + 1
+        data = data[start:]
+        offset += start
+
+    end = data.rfind(b'\n') + 1
+    lines = data[:end].split(b'\n')[:-1]
+    return [line.decode('utf-8', 'replace') for line in lines], offset + end
+
+def parse_pm2_log_line(line, date_format):
+    """Split PM2's `<date>: <message>` prefix when log_date_format is set"""
+    if date_format:
+        parts = line.split(': ', 1)
+        if len(parts) == 2:
+            return {'timestamp': parts[0].strip(), 'content': parts[1].rstrip()}
+    return {'timestamp': '', 'content': line.rstrip()}
+
+class LogFileWatcher:
+    """Wait for writes to a log file - inotify on Linux, stat polling elsewhere"""
+
+    IN_MODIFY = 0x00000002
+    IN_ATTRIB = 0x00000004
+    IN_MOVE_SELF = 0x00000800
+    IN_DELETE_SELF = 0x00000400
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+
+    def __init__(self, path):
+        self.path = path
+        self.fd = None
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+            fd = libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+            if fd < 0:
+                return
+            mask = self.IN_MODIFY | self.IN_ATTRIB | self.IN_MOVE_SELF | self.IN_DELETE_SELF
+            if libc.inotify_add_watch(fd, path.encode(), mask) < 0:
+                os.close(fd)
+                return
+            self.fd = fd
+        except (OSError, AttributeError):
+            # No inotify (Windows/macOS) - fall back to polling
+            self.fd = None
+
+    def wait(self, timeout):
+        """Block until the file changes or `timeout` passes. Returns True on change"""
+        if self.fd is None:
+            time.sleep(min(timeout, 1))
+            return True
+
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return False
+        try:
+            os.read(self.fd, 4096)  # Drain queued events
+        except BlockingIOError:
+            pass
+        return True
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
 
 @app.route('/api/pm2/logs/<process_name>')
 @pm2_auth_required
 def pm2_get_logs(process_name):
-    """Get logs for a specific PM2 process"""
+    """Get logs for a specific PM2 process
+
+    Without `offset` returns the last `lines` lines. With `offset` returns
+    lines written since that byte position (incremental polling).
+    """
     try:
         log_type = request.args.get('type', 'out')
-        lines = int(request.args.get('lines', 100))
+        lines = min(max(int(request.args.get('lines', 100)), 1), PM2_LOG_MAX_LINES)
+        offset = request.args.get('offset', type=int)
 
-        # Determine log file type
-        log_suffix = 'out' if log_type == 'out' else 'error'
+        path, date_format = resolve_pm2_log_path(process_name, log_type)
+        if not path:
+            return jsonify({'error': 'Process not found'}), 404
+        if not os.path.exists(path):
+            return jsonify({'logs': [], 'offset': 0})
 
-        # Get PM2 logs using tail
-        result = subprocess.run(
-            ['pm2', 'logs', process_name, '--nostream', '--lines', str(lines)],
-            capture_output=True,
-            text=True,
-            timeout=10
-        )
-
-        # Parse log output
-        logs = []
-        for line in result.stdout.split('\n'):
-            if line.strip():
-                # Try to extract timestamp and content
-                parts = line.split('|', 1)
-                if len(parts) == 2:
-                    logs.append({
-                        'timestamp': parts[0].strip(),
-                        'content': parts[1].strip()
-                    })
-                else:
-                    logs.append({
-                        'timestamp': '',
-                        'content': line.strip()
-                    })
+        if offset is None:
+            raw_lines, offset = read_log_tail(path, lines)
+        else:
+            with open(path, 'rb') as f:
+                raw_lines, offset = read_log_from(f, offset)
+            raw_lines = raw_lines[-PM2_LOG_MAX_LINES:]
 
-        return jsonify({'logs': logs[-lines:]})
+        logs = [parse_pm2_log_line(line, date_format) for line in raw_lines if line.strip()]
+        return jsonify({'logs': logs, 'offset': offset})
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/pm2/logs/<process_name>/stream')
+@pm2_auth_required
+def pm2_stream_logs(process_name):
+    """Live log tail over Server-Sent Events
+
+    Each event carries the byte offset as its id, so a reconnecting
+    EventSource resumes exactly where it left off via Last-Event-ID.
+    """
+    log_type = request.args.get('type', 'out')
+    offset = request.headers.get('Last-Event-ID', request.args.get('offset'))
+    try:
+        offset = int(offset) if offset is not None else None
+    except ValueError:
+        offset = None
+
+    path, date_format = resolve_pm2_log_path(process_name, log_type)
+    if not path:
+        return jsonify({'error': 'Process not found'}), 404
+
+    if not acquire_pm2_stream_slot('logs'):
+        # Client falls back to polling /api/pm2/logs with an offset
+        return jsonify({'error': 'Too many live viewers'}), 503
+
+    def generate():
+        nonlocal offset
+        watcher = None
+        f = None
+        try:
+            started = time.time()
+            yield 'retry: 2000\n\n'
+
+            while time.time() - started < PM2_STREAM_MAX_DURATION:
+                if f is None:
+                    if not os.path.exists(path):
+                        time.sleep(1)
+                        yield ': waiting for log file\n\n'
+                        continue
+                    f = open(path, 'rb')
+                    watcher = LogFileWatcher(path)
+                    if offset is None:
+                        offset = os.fstat(f.fileno()).st_size
+
+                raw_lines, offset = read_log_from(f, offset)
+                if raw_lines:
+                    logs = [parse_pm2_log_line(line, date_format) for line in raw_lines if line.strip()]
+                    yield f'id: {offset}\ndata: {json.dumps({"logs": logs, "offset": offset})}\n\n'
+                    continue
+
+                # Reopen after log rotation (file replaced under the same name)
+                try:
+                    rotated = os.stat(path).st_ino != os.fstat(f.fileno()).st_ino
+                except FileNotFoundError:
+                    rotated = True
+                if rotated:
+                    f.close()
+                    watcher.close()
+                    f = None
+                    offset = 0
+                    continue
+
+                if not watcher.wait(PM2_STREAM_HEARTBEAT):
+                    yield ': ping\n\n'
+        finally:
+            if f is not None:
+                f.close()
+            if watcher is not None:
+                watcher.close()
+            release_pm2_stream_slot('logs')
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # Disable nginx buffering
+    return response
+
 @app.route('/api/pm2/start/<process_name>', methods=['POST'])
 @pm2_auth_required
 def pm2_start_process(process_name):
     """Start a PM2 process"""
     try:
-        result = subprocess.run(
-            ['pm2', 'start', process_name],
-            capture_output=True,
-            text=True,
-            timeout=30
-        )
+        success, error = run_pm2_action('start', process_name)
+
+        if not success:
+            return jsonify({'error': error or 'Failed to start process'}), 500
 
-        if result.returncode != 0:
-            return jsonify({'error': result.stderr or 'Failed to start process'}), 500
+        # Push the new state to dashboard viewers right away
+        touch_pm2_poller(refresh=True)
 
         return jsonify({'success': True, 'message': f'Process {process_name} started'})
 
@@ -3160,15 +3773,13 @@ def pm2_start_process(process_name):
 def pm2_stop_process(process_name):
     """Stop a PM2 process"""
     try:
-        result = subprocess.run(
-            ['pm2', 'stop', process_name],
-            capture_output=True,
-            text=True,
-            timeout=30
-        )
+        success, error = run_pm2_action('stop', process_name)
+
+        if not success:
+            return jsonify({'error': error or 'Failed to stop process'}), 500
 
-        if result.returncode != 0:
-            return jsonify({'error': result.stderr or 'Failed to stop process'}), 500
+        # Push the new state to dashboard viewers right away
+        touch_pm2_poller(refresh=True)
 
         return jsonify({'success': True, 'message': f'Process {process_name} stopped'})
 
@@ -3180,15 +3791,13 @@ def pm2_stop_process(process_name):
 def pm2_restart_process(process_name):
     """Restart a PM2 process"""
     try:
-        result = subprocess.run(
-            ['pm2', 'restart', process_name],
-            capture_output=True,
-            text=True,
-            timeout=30
-        )
+        success, error = run_pm2_action('restart', process_name)
 
-        if result.returncode != 0:
-            return jsonify({'error': result.stderr or 'Failed to restart process'}), 500
+        if not success:
+            return jsonify({'error': error or 'Failed to restart process'}), 500
+
+        # Push the new state to dashboard viewers right away
+        touch_pm2_poller(refresh=True)
 
         return jsonify({'success': True, 'message': f'Process {process_name} restarted'})
 
@@ -3200,15 +3809,13 @@ def pm2_restart_process(process_name):
 def pm2_reset_process(process_name):
     """Reset PM2 process counters (restart count, etc.)"""
     try:
-        result = subprocess.run(
-            ['pm2', 'reset', process_name],
-            capture_output=True,
-            text=True,
-            timeout=30
-        )
+        success, error = run_pm2_action('reset', process_name)
+
+        if not success:
+            return jsonify({'error': error or 'Failed to reset process'}), 500
 
-        if result.returncode != 0:
-            return jsonify({'error': result.stderr or 'Failed to reset process'}), 500
+        # Push the new state to dashboard viewers right away
+        touch_pm2_poller(refresh=True)
 
         return jsonify({'success': True, 'message': f'Process {process_name} counters reset'})
 
@@ -5207,4 +5814,4 @@ if __name__ == '__main__':
     atexit.register(lambda: logger.shutdown())
 
     # Run production server with Waitress
-    serve(app, host='0.0.0.0', port=3000, threads=4)
+    serve(app, host='0.0.0.0', port=3000, threads=request_budget.REQUEST_THREADS)
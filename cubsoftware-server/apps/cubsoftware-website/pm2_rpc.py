@@ -0,0 +1,366 @@
+"""
+PM2 RPC Client - Talk to the PM2 daemon over its Unix sockets
+
+PM2's daemon (God) listens on two axon sockets in $PM2_HOME (~/.pm2):
+    rpc.sock - request/reply, every CLI command ends up as a call here
+    pub.sock - publish, emits process events (online, exit, restart, ...)
+
+Talking to them directly skips the ~300ms Node.js startup of the `pm2` CLI.
+
+Usage:
+    from pm2_rpc import PM2Client, PM2EventSubscriber
+
+    client = PM2Client()
+    processes = client.list_processes()   # same payload as `pm2 jlist`
+    client.restart('my-app')
+
+    subscriber = PM2EventSubscriber(lambda event, data: print(event, data))
+    subscriber.start()
+
+Benchmark against the CLI:
+    python pm2_rpc.py [iterations]
+"""
+
+import os
+import json
+import queue
+import socket
+import struct
+import threading
+import time
+
+
+PM2_HOME = os.environ.get('PM2_HOME', os.path.join(os.path.expanduser('~'), '.pm2'))
+RPC_SOCKET = os.path.join(PM2_HOME, 'rpc.sock')
+PUB_SOCKET = os.path.join(PM2_HOME, 'pub.sock')
+
+
+class PM2RPCError(Exception):
+    """Raised when the daemon is unreachable or a call fails"""
+
+
+class PM2RPCSentError(PM2RPCError):
+    """Raised when a call reached the daemon but failed or timed out afterwards
+
+    The command may already have run, so callers must not retry it elsewhere.
+    """
+
+
+# ==================== AXON WIRE FORMAT ====================
+#
+# Axon frames messages with AMP: one byte holding version (high nibble) and
+# argument count (low nibble), then a 32-bit big endian length + data for
+# each argument. Arguments are tagged 's:' (string) or 'j:' (JSON).
+
+AMP_VERSION = 1
+
+def pack_arg(arg):
+    """Encode one axon argument"""
+    if isinstance(arg, bytes):
+        return arg
+    if isinstance(arg, str):
+        return b's:' + arg.encode('utf-8')
+    return b'j:' + json.dumps(arg).encode('utf-8')
+
+def unpack_arg(data):
+    """Decode one axon argument"""
+    if data[:2] == b'j:':
+        return json.loads(data[2:].decode('utf-8'))
+    if data[:2] == b's:':
+        return data[2:].decode('utf-8')
+    return data
+
+def encode_message(args):
+    """Encode a list of arguments as a single AMP frame"""
+    parts = [bytes([(AMP_VERSION << 4) | len(args)])]
+    for arg in args:
+        data = pack_arg(arg)
+        parts.append(struct.pack('>I', len(data)))
+        parts.append(data)
+    return b''.join(parts)
+
+class MessageReader:
+    """Reassemble AMP frames from a stream socket"""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.buffer = b''
+
+    def _read(self, size):
+        while len(self.buffer) < size:
+            chunk = self.sock.recv(65536)
+            if not chunk:
+                raise PM2RPCError('PM2 daemon closed the connection')
+            self.buffer += chunk
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+    def read_message(self):
+        argc = self._read(1)[0] & 0x0f
+        args = []
+        for _ in range(argc):
+            length = struct.unpack('>I', self._read(4))[0]
+            args.append(unpack_arg(self._read(length)))
+        return args
+
+
+# ==================== RPC CLIENT ====================
+
+class RPCConnection:
+    """One connection to rpc.sock (axon req socket)"""
+
+    def __init__(self, path, timeout):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(path)
+        self.reader = MessageReader(self.sock)
+        self.ids = 0
+
+    def call(self, method, args):
+        self.ids += 1
+        message_id = f'{os.getpid()}:{self.ids}'
+        try:
+            self.sock.sendall(encode_message([{'type': 'call', 'method': method, 'args': args}, message_id]))
+        except OSError as e:
+            raise PM2RPCError(f'Cannot send {method} to PM2 daemon: {e}')
+
+        try:
+            while True:
+                reply = self.reader.read_message()
+                if reply and reply[-1] == message_id:
+                    break
+        except (OSError, ValueError, PM2RPCError) as e:
+            raise PM2RPCSentError(f'No reply from PM2 daemon for {method}: {e}')
+
+        # Reply is [err, result..., id] (axon-rpc's reply(err, ...results) plus the
+        # req socket's message id) - errors are serialized as objects
+        error = reply[0] if len(reply) > 1 else None
+        if error:
+            message = error.get('message', str(error)) if isinstance(error, dict) else str(error)
+            raise PM2RPCSentError(message)
+        return reply[1:-1]
+
+    def close(self):
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+class PM2Client:
+    """Pooled RPC client for the PM2 daemon"""
+
+    def __init__(self, socket_path=RPC_SOCKET, pool_size=4, timeout=10):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.pool = queue.LifoQueue(maxsize=pool_size)
+
+    def is_available(self):
+        """True when the daemon socket exists (Unix only)"""
+        return hasattr(socket, 'AF_UNIX') and os.path.exists(self.socket_path)
+
+    def call(self, method, *args):
+        """Call a daemon method and return the list of its callback's results"""
+        if not self.is_available():
+            raise PM2RPCError(f'PM2 socket not found at {self.socket_path}')
+
+        try:
+            conn = self.pool.get_nowait()
+        except queue.Empty:
+            try:
+                conn = RPCConnection(self.socket_path, self.timeout)
+            except OSError as e:
+                raise PM2RPCError(f'Cannot connect to PM2 daemon: {e}')
+
+        try:
+            result = conn.call(method, list(args))
+        except (OSError, PM2RPCError, ValueError) as e:
+            # Connection is in an unknown state - drop it
+            conn.close()
+            if isinstance(e, PM2RPCError):
+                raise
+            raise PM2RPCError(f'PM2 RPC call {method} failed: {e}')
+
+        try:
+            self.pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+        return result
+
+    def close(self):
+        while True:
+            try:
+                self.pool.get_nowait().close()
+            except queue.Empty:
+                return
+
+    def list_processes(self):
+        """Full process list, same format as `pm2 jlist`"""
+        result = self.call('getMonitorData', {})
+        processes = result[0] if result else []
+        if not isinstance(processes, list) or not all(isinstance(p, dict) for p in processes):
+            raise PM2RPCError(f'Unexpected getMonitorData reply: {type(processes).__name__}')
+        return processes
+
+    def resolve_ids(self, name):
+        """Map a process name, id or 'all' to pm_ids like the CLI does"""
+        processes = self.list_processes()
+        if name == 'all':
+            return [p['pm_id'] for p in processes]
+        ids = [p['pm_id'] for p in processes if p.get('name') == name or str(p.get('pm_id')) == str(name)]
+        if not ids:
+            raise PM2RPCError(f'Process or Namespace {name} not found')
+        return ids
+
+    def call_each(self, name, method, make_arg):
+        """Call method once per pm_id of name
+
+        Once any call has reached the daemon, a later failure is raised as
+        PM2RPCSentError too - part of the command has already run.
+        """
+        sent = False
+        for pm_id in self.resolve_ids(name):
+            try:
+                self.call(method, make_arg(pm_id))
+            except PM2RPCSentError:
+                raise
+            except PM2RPCError as e:
+                if sent:
+                    raise PM2RPCSentError(str(e))
+                raise
+            sent = True
+
+    def start(self, name):
+        # Starting an existing (stopped) app is a restart, same as `pm2 start <name>`
+        self.call_each(name, 'restartProcessId', lambda pm_id: {'id': pm_id, 'env': {}})
+
+    def stop(self, name):
+        self.call_each(name, 'stopProcessId', lambda pm_id: pm_id)
+
+    def restart(self, name):
+        self.call_each(name, 'restartProcessId', lambda pm_id: {'id': pm_id, 'env': {}})
+
+    def reset(self, name):
+        self.call_each(name, 'resetMetaProcessId', lambda pm_id: pm_id)
+
+
+# ==================== EVENT SUBSCRIBER ====================
+
+class PM2EventSubscriber:
+    """Background listener on pub.sock, calling callback(event, data) per message
+
+    Reconnects automatically, so it survives PM2 daemon restarts.
+    """
+
+    def __init__(self, callback, socket_path=PUB_SOCKET, prefix='process:'):
+        self.callback = callback
+        self.socket_path = socket_path
+        self.prefix = prefix
+        self.thread = None
+        self.stopped = threading.Event()
+
+    def start(self):
+        if self.thread is None or not self.thread.is_alive():
+            self.stopped.clear()
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+
+    def _run(self):
+        while not self.stopped.is_set():
+            if not hasattr(socket, 'AF_UNIX') or not os.path.exists(self.socket_path):
+                self.stopped.wait(30)
+                continue
+
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                sock.connect(self.socket_path)
+                reader = MessageReader(sock)
+                while not self.stopped.is_set():
+                    message = reader.read_message()
+                    if not message or not isinstance(message[0], str):
+                        continue
+                    if message[0].startswith(self.prefix):
+                        try:
+                            self.callback(message[0], message[1] if len(message) > 1 else None)
+                        except Exception as e:
+                            print(f'[pm2_rpc] Event callback error: {e}')
+            except (OSError, PM2RPCError, ValueError):
+                pass
+            finally:
+                sock.close()
+
+            self.stopped.wait(5)
+
+
+# Reply framing check against a fake daemon, then latency benchmark: RPC vs spawning the CLI
+if __name__ == '__main__':
+    import subprocess
+    import sys
+    import tempfile
+
+    def fake_daemon(path, replies):
+        """Answer each call like pm2-axon-rpc: reply(err, ...results) framed as [err, result..., id]"""
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(path)
+        server.listen(1)
+
+        def serve():
+            conn, _ = server.accept()
+            reader = MessageReader(conn)
+            try:
+                while True:
+                    call, message_id = reader.read_message()
+                    conn.sendall(encode_message(replies[call['method']] + [message_id]))
+            except (OSError, PM2RPCError):
+                conn.close()
+        threading.Thread(target=serve, daemon=True).start()
+        return server
+
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, 'rpc.sock')
+        processes = [{'name': 'web', 'pm_id': 0}, {'name': 'worker', 'pm_id': 1}]
+        server = fake_daemon(path, {'getMonitorData': [None, processes],
+                                    'restartProcessId': [None, {'pm_id': 0}],
+                                    'stopProcessId': [{'message': 'process not found'}]})
+        checker = PM2Client(socket_path=path, timeout=2)
+        assert checker.list_processes() == processes, checker.list_processes()
+        assert checker.resolve_ids('web') == [0] and checker.resolve_ids('all') == [0, 1]
+        checker.restart('web')
+        try:
+            checker.stop('web')
+            raise AssertionError('daemon error was not raised')
+        except PM2RPCSentError:
+            pass
+        checker.close()
+        server.close()
+    print('Reply framing check passed')
+
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    client = PM2Client()
+
+    def measure(label, fn):
+        timings = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            fn()
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        print(f'{label:<28} median {timings[len(timings) // 2]:8.2f} ms   '
+              f'p95 {timings[int(len(timings) * 0.95) - 1]:8.2f} ms   max {timings[-1]:8.2f} ms')
+
+    print(f'PM2 process list latency ({iterations} iterations)')
+    print('=' * 70)
+
+    if client.is_available():
+        client.list_processes()  # Warm up the pooled connection
+        measure('RPC getMonitorData', client.list_processes)
+    else:
+        print(f'RPC socket not found at {RPC_SOCKET} - skipping RPC benchmark')
+
+    try:
+        measure('subprocess `pm2 jlist`',
+                lambda: json.loads(subprocess.run(['pm2', 'jlist'], capture_output=True, text=True, timeout=10).stdout))
+    except FileNotFoundError:
+        print('pm2 CLI not found - skipping subprocess benchmark')
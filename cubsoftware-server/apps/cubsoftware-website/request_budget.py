@@ -0,0 +1,50 @@
+"""
+Long Request Budget - one site-wide cap on responses that hold a request thread
+
+SSE streams (PM2 dashboard, social media progress), live file streams and
+blocking yt-dlp probes each tie up one of the server's REQUEST_THREADS for
+seconds to minutes. Each feature keeps its own small cap, but they all also
+draw from this shared budget, which stays below the thread count so ordinary
+page and API requests always have a thread left.
+
+Usage:
+    import request_budget
+
+    if not request_budget.acquire(MY_SLOTS):
+        return busy_response()
+    try:
+        ...
+    finally:
+        request_budget.release(MY_SLOTS)
+"""
+
+import os
+import threading
+
+# Used by waitress (main.py) and gunicorn (gunicorn_config.py) alike
+REQUEST_THREADS = int(os.environ.get('REQUEST_THREADS', 4))
+LONG_REQUEST_SLOTS = max(1, min(int(os.environ.get('LONG_REQUEST_SLOTS', REQUEST_THREADS - 1)),
+                                REQUEST_THREADS - 1))
+
+long_request_slots = threading.BoundedSemaphore(LONG_REQUEST_SLOTS)
+
+
+def acquire(feature_slots=None):
+    """Take a slot from feature_slots (a semaphore, optional) and from the shared budget
+
+    Never blocks. Returns False - holding neither - when either is used up.
+    """
+    if feature_slots is not None and not feature_slots.acquire(blocking=False):
+        return False
+    if not long_request_slots.acquire(blocking=False):
+        if feature_slots is not None:
+            feature_slots.release()
+        return False
+    return True
+
+
+def release(feature_slots=None):
+    """Give back what acquire() took"""
+    long_request_slots.release()
+    if feature_slots is not None:
+        feature_slots.release()
@@ -5,6 +5,13 @@
     // State
     let processes = [];
     let refreshInterval = null;
+    let processStream = null;
+    let streamConnected = false;
+    let logStream = null;
+    let logStreamConnected = false;
+    let logOffset = null;
+    let history = {};
+    let historyInterval = null;
     let refreshRate = 5000;
     let selectedProcess = null;
     let logsBuffer = [];
@@ -32,8 +39,10 @@
     // Initialize
     function init() {
         loadProcesses();
+        loadHistory();
         setupEventListeners();
         startAutoRefresh();
+        historyInterval = setInterval(loadHistory, 60000);
     }
 
     // Event Listeners
@@ -68,6 +77,8 @@
             selectedProcess = processSelect.value;
             logsBuffer = [];
             lastLogTimestamp = null;
+            logOffset = null;
+            disconnectLogStream();
             if (selectedProcess) {
                 loadLogs();
             } else {
@@ -78,6 +89,8 @@
         logType.addEventListener('change', () => {
             logsBuffer = [];
             lastLogTimestamp = null;
+            logOffset = null;
+            disconnectLogStream();
             if (selectedProcess) {
                 loadLogs();
             }
@@ -99,12 +112,19 @@
     // Auto Refresh
     function startAutoRefresh() {
         stopAutoRefresh();
+        connectProcessStream();
         refreshInterval = setInterval(() => {
-            loadProcesses();
-            if (selectedProcess) {
+            // Processes are pushed over SSE; only poll when the stream is unavailable
+            if (!streamConnected) {
+                loadProcesses();
+            }
+            if (selectedProcess && !logStreamConnected) {
                 loadLogs(true);
             }
         }, refreshRate);
+        if (selectedProcess && logOffset !== null) {
+            connectLogStream();
+        }
     }
 
     function stopAutoRefresh() {
@@ -112,6 +132,48 @@
             clearInterval(refreshInterval);
             refreshInterval = null;
         }
+        disconnectProcessStream();
+        disconnectLogStream();
+    }
+
+    // Live process updates (Server-Sent Events)
+    function connectProcessStream() {
+        if (!window.EventSource || processStream) return;
+
+        processStream = new EventSource('/api/pm2/stream');
+
+        processStream.onopen = () => {
+            streamConnected = true;
+        };
+
+        processStream.onmessage = (event) => {
+            try {
+                applyProcessData(JSON.parse(event.data));
+            } catch (error) {
+                console.error('Error parsing process stream:', error);
+            }
+        };
+
+        processStream.addEventListener('error', (event) => {
+            if (event.data) {
+                // Server-side PM2 error pushed as an event
+                setDisconnected();
+                return;
+            }
+            streamConnected = false;
+            if (processStream && processStream.readyState === EventSource.CLOSED) {
+                // Stream refused (e.g. too many viewers) - keep polling instead
+                processStream = null;
+            }
+        });
+    }
+
+    function disconnectProcessStream() {
+        if (processStream) {
+            processStream.close();
+            processStream = null;
+        }
+        streamConnected = false;
     }
 
     // Load Processes
@@ -121,23 +183,31 @@
             if (!response.ok) throw new Error('Failed to fetch processes');
 
             const data = await response.json();
-            processes = data.processes || [];
-            isConnected = true;
-            statusDot.classList.remove('disconnected');
-
-            renderProcesses();
-            updateProcessSelect();
-            updateLastUpdate();
-            renderSystemStats(data.system || {});
+            applyProcessData(data);
 
         } catch (error) {
             console.error('Error loading processes:', error);
-            isConnected = false;
-            statusDot.classList.add('disconnected');
-            showToast('Connection error - retrying...', 'error');
+            setDisconnected();
         }
     }
 
+    function applyProcessData(data) {
+        processes = data.processes || [];
+        isConnected = true;
+        statusDot.classList.remove('disconnected');
+
+        renderProcesses();
+        updateProcessSelect();
+        updateLastUpdate();
+        renderSystemStats(data.system || {});
+    }
+
+    function setDisconnected() {
+        isConnected = false;
+        statusDot.classList.add('disconnected');
+        showToast('Connection error - retrying...', 'error');
+    }
+
     // Render System Stats
     function renderSystemStats(system) {
         let statsHtml = document.querySelector('.system-stats');
@@ -274,6 +344,7 @@
                         <div class="metric-bar">
                             <div class="metric-bar-fill cpu" style="width: ${Math.min(proc.cpu || 0, 100)}%"></div>
                         </div>
+                        ${renderSparkline(history[proc.name], 1, 'cpu')}
                     </div>
                     <div class="metric">
                         <div class="metric-label">Memory</div>
@@ -281,6 +352,7 @@
                         <div class="metric-bar">
                             <div class="metric-bar-fill memory" style="width: ${Math.min((proc.memory || 0) / 1024 / 1024 / 5, 100)}%"></div>
                         </div>
+                        ${renderSparkline(history[proc.name], 2, 'memory')}
                     </div>
                 </div>
                 <div class="process-details">
@@ -353,6 +425,39 @@
     }
 
     // Update Process Select
+    // Load History (1 minute buckets for the last hour, drawn as sparklines)
+    async function loadHistory() {
+        try {
+            const response = await fetch('/api/pm2/history?resolution=1m&points=60');
+            if (!response.ok) throw new Error('Failed to fetch history');
+
+            const data = await response.json();
+            history = data.processes || {};
+            renderProcesses();
+        } catch (error) {
+            console.error('Error loading history:', error);
+        }
+    }
+
+    // Columns: [timestamp, cpu, memory, memory_max, restarts]
+    function renderSparkline(rows, column, type) {
+        if (!rows || rows.length < 2) return '';
+
+        const values = rows.map(row => row[column]);
+        const max = Math.max(...values);
+        const min = Math.min(...values);
+        const range = max - min || 1;
+        const points = values.map((value, i) => {
+            const x = (i / (values.length - 1)) * 100;
+            const y = 20 - ((value - min) / range) * 18 - 1;
+            return `${x.toFixed(1)},${y.toFixed(1)}`;
+        }).join(' ');
+
+        return `<svg class="metric-sparkline ${type}" viewBox="0 0 100 20" preserveAspectRatio="none">
+            <polyline points="${points}"></polyline>
+        </svg>`;
+    }
+
     function updateProcessSelect() {
         const currentValue = processSelect.value;
         processSelect.innerHTML = '<option value="">Select a process...</option>' +
@@ -369,36 +474,85 @@
                 lines: 200,
                 type: type
             });
+            if (append && logOffset !== null) {
+                // Only fetch what was written since the last read
+                params.set('offset', logOffset);
+            }
 
             const response = await fetch(`/api/pm2/logs/${selectedProcess}?${params}`);
             if (!response.ok) throw new Error('Failed to fetch logs');
 
             const data = await response.json();
+            logOffset = data.offset;
 
-            if (append && logsBuffer.length > 0) {
-                // Check for new logs
-                const newLogs = data.logs.filter(log => {
-                    const logKey = log.timestamp + log.content;
-                    return !logsBuffer.some(existing => existing.timestamp + existing.content === logKey);
-                });
-
-                if (newLogs.length > 0) {
-                    logsBuffer.push(...newLogs);
-                    if (logsBuffer.length > 1000) {
-                        logsBuffer = logsBuffer.slice(-1000);
-                    }
-                }
+            if (append) {
+                appendLogs(data.logs || []);
             } else {
                 logsBuffer = data.logs || [];
+                renderLogs();
+                if (autoRefreshCheckbox.checked) {
+                    connectLogStream();
+                }
             }
 
-            renderLogs();
-
         } catch (error) {
             console.error('Error loading logs:', error);
         }
     }
 
+    function appendLogs(newLogs) {
+        if (newLogs.length === 0) return;
+
+        logsBuffer.push(...newLogs);
+        if (logsBuffer.length > 1000) {
+            logsBuffer = logsBuffer.slice(-1000);
+        }
+        renderLogs();
+    }
+
+    // Live log tail (Server-Sent Events, resumes from the last byte offset)
+    function connectLogStream() {
+        disconnectLogStream();
+        if (!window.EventSource || !selectedProcess || logOffset === null) return;
+
+        const params = new URLSearchParams({
+            type: logType.value,
+            offset: logOffset
+        });
+        const stream = new EventSource(`/api/pm2/logs/${selectedProcess}/stream?${params}`);
+        logStream = stream;
+
+        stream.onopen = () => {
+            logStreamConnected = true;
+        };
+
+        stream.onmessage = (event) => {
+            try {
+                const data = JSON.parse(event.data);
+                logOffset = data.offset;
+                appendLogs(data.logs || []);
+            } catch (error) {
+                console.error('Error parsing log stream:', error);
+            }
+        };
+
+        stream.onerror = () => {
+            logStreamConnected = false;
+            if (stream.readyState === EventSource.CLOSED && logStream === stream) {
+                // Stream refused - fall back to offset polling
+                logStream = null;
+            }
+        };
+    }
+
+    function disconnectLogStream() {
+        if (logStream) {
+            logStream.close();
+            logStream = null;
+        }
+        logStreamConnected = false;
+    }
+
     // Render Logs
     function renderLogs() {
         if (logsBuffer.length === 0) {
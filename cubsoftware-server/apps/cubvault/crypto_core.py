@@ -5,14 +5,109 @@ Strong encryption using AES-256-GCM and Argon2
 
 import os
 import base64
+import bisect
+import hashlib
+import hmac
+import itertools
 import json
-from typing import Optional, Tuple
+import mmap
+import re
+import string
+import struct
+from typing import Dict, Iterable, List, Optional, Tuple
+from cryptography.exceptions import InvalidTag
 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 from cryptography.hazmat.primitives import hashes
 from argon2 import PasswordHasher
 from argon2.exceptions import VerifyMismatchError
 
+KDF_ITERATIONS = 600000  # OWASP recommendation for PBKDF2-SHA256
+KEY_SIZE = 32  # 256 bits for AES-256
+NONCE_SIZE = 12  # GCM standard nonce size
+TAG_SIZE = 16  # GCM authentication tag
+
+# encrypt_stream() layout: header (version, chunk size, HKDF salt, nonce prefix),
+# then one sealed chunk per chunk_size bytes of plaintext. Chunk i uses the
+# nonce prefix + i + a final-chunk flag, and every chunk authenticates the
+# header, so chunks can't be reordered, dropped or cut off at a boundary.
+STREAM_VERSION = 1
+STREAM_HEADER = struct.Struct('>BI16s7s')
+STREAM_CHUNK_SIZE = 1 << 16  # plaintext bytes per chunk
+STREAM_MAX_CHUNK_SIZE = 1 << 24  # decrypt_stream() refuses headers asking to buffer more
+STREAM_KEY_PURPOSE = b'cubvault-stream'
+
+SYMBOLS = '!@#$%^&*()_+-=[]{}|;:,.<>?'
+STRENGTH_SYMBOLS = SYMBOLS + '~`'  # also counted as symbols when scoring
+AMBIGUOUS = 'il1Lo0O'
+
+# generate_random_password() arguments, as taken by generate_many()
+DEFAULT_POLICY = {
+    'length': 16,
+    'use_uppercase': True,
+    'use_lowercase': True,
+    'use_digits': True,
+    'use_symbols': True,
+    'exclude_ambiguous': True
+}
+
+# score_many() lookup tables: ASCII character -> class letter (others dropped,
+# the batch separator kept), points per length, and the runs that lose points
+BATCH_SEPARATOR = '\x00'
+CHARACTER_CLASSES = str.maketrans(
+    {**{c: 'l' for c in string.ascii_lowercase}, **{c: 'u' for c in string.ascii_uppercase},
+     **{c: 'd' for c in string.digits}, **{c: 's' for c in STRENGTH_SYMBOLS},
+     **{chr(c): None for c in range(1, 128) if not chr(c).isalnum() and chr(c) not in STRENGTH_SYMBOLS}})
+LENGTH_POINTS = [length * 2 for length in range(8)] + [20] * 4 + [30] * 4 + [40]
+REPEATED_RUN = re.compile(r'(.)\1\1', re.DOTALL)
+# Byte -> the letter after it ('a' -> 'b' ... 'y' -> 'z'); anything else -> 0xFF, which no ASCII byte equals
+NEXT_LETTER = bytes(b + 1 if ord('a') <= b < ord('z') else 0xFF for b in range(256))
+
+
+def strength_rating(score: int) -> str:
+    if score >= 80:
+        return "Excellent"
+    elif score >= 60:
+        return "Good"
+    elif score >= 40:
+        return "Fair"
+    elif score >= 20:
+        return "Weak"
+    return "Very Weak"
+
+
+RATINGS = [strength_rating(score) for score in range(101)]
+
+
+def _reader(source):
+    """read(n) over a file object (mmap included), or over bytes-like data without copying"""
+    if hasattr(source, 'read'):
+        def read(size):
+            data = source.read(size)
+            while data and len(data) < size:  # pipes and sockets return short reads
+                more = source.read(size - len(data))
+                if not more:
+                    break
+                data += more
+            return data
+        return read
+
+    view = memoryview(source)
+    position = 0
+
+    def read(size):
+        nonlocal position
+        data = view[position:position + size]
+        position += len(data)
+        return data
+    return read
+
+
+def _stream_nonce(prefix: bytes, counter: int, final: bool) -> bytes:
+    return prefix + counter.to_bytes(4, 'big') + (b'\x01' if final else b'\x00')
+
+
 class CryptoEngine:
     """Handles all encryption/decryption operations"""
 
@@ -37,16 +132,148 @@ class CryptoEngine:
         except VerifyMismatchError:
             return False
 
-    def derive_key(self, password: str, salt: bytes) -> bytes:
+    def derive_key(self, password: str, salt: bytes, iterations: int = KDF_ITERATIONS) -> bytes:
         """Derive encryption key from password using PBKDF2"""
         kdf = PBKDF2HMAC(
             algorithm=hashes.SHA256(),
-            length=32,  # 256 bits for AES-256
+            length=KEY_SIZE,
             salt=salt,
-            iterations=600000,  # OWASP recommendation
+            iterations=iterations,
         )
         return kdf.derive(password.encode())
 
+    def generate_data_key(self) -> bytes:
+        """Random key for encrypting vault data (never derived from the password)"""
+        return AESGCM.generate_key(bit_length=KEY_SIZE * 8)
+
+    def derive_subkey(self, key: bytes, purpose: bytes) -> bytes:
+        """Independent key for another use of the same secret (HKDF-SHA256)"""
+        return HKDF(algorithm=hashes.SHA256(), length=KEY_SIZE, salt=None, info=purpose).derive(key)
+
+    def fingerprint(self, key: bytes, value: str) -> bytes:
+        """Keyed fingerprint of a secret - equal values match, but it can't be brute forced without key"""
+        return hmac.new(key, value.encode('utf-8'), hashlib.sha256).digest()[:16]
+
+    def encrypt_with_key(self, plaintext: bytes, key: bytes, associated_data: bytes = None) -> bytes:
+        """Encrypt bytes with an already derived key
+
+        Returns: nonce + ciphertext (ciphertext includes auth tag)
+        """
+        nonce = os.urandom(NONCE_SIZE)
+        return nonce + AESGCM(key).encrypt(nonce, plaintext, associated_data)
+
+    def decrypt_with_key(self, data: bytes, key: bytes, associated_data: bytes = None) -> Optional[bytes]:
+        """Decrypt data from encrypt_with_key()
+
+        Returns: Plaintext bytes or None if the key is wrong or data was tampered with
+        """
+        try:
+            return AESGCM(key).decrypt(data[:NONCE_SIZE], data[NONCE_SIZE:], associated_data)
+        except Exception:
+            return None
+
+    def wrap_key(self, data_key: bytes, key_encryption_key: bytes) -> bytes:
+        """Encrypt a data key with a password-derived key"""
+        return self.encrypt_with_key(data_key, key_encryption_key, b'cubvault-data-key')
+
+    def unwrap_key(self, wrapped: bytes, key_encryption_key: bytes) -> Optional[bytes]:
+        """Decrypt a data key from wrap_key(); None means the password was wrong"""
+        return self.decrypt_with_key(wrapped, key_encryption_key, b'cubvault-data-key')
+
+    def encrypt_stream(self, source, destination, key: bytes, associated_data: bytes = b'',
+                       chunk_size: int = STREAM_CHUNK_SIZE) -> int:
+        """Encrypt a file object, mmap or bytes-like source into destination, chunk by chunk
+
+        Memory use is constant (two chunks): each chunk is sealed and written
+        as soon as the next one has been read, under a key derived for this
+        stream alone.
+        Returns: number of plaintext bytes encrypted
+        """
+        if not 0 < chunk_size <= STREAM_MAX_CHUNK_SIZE:
+            raise ValueError(f"Invalid chunk size: {chunk_size}")
+        salt, prefix = os.urandom(16), os.urandom(7)
+        header = STREAM_HEADER.pack(STREAM_VERSION, chunk_size, salt, prefix)
+        aesgcm = AESGCM(self._stream_key(key, salt))
+        associated_data = header + associated_data
+        read = _reader(source)
+
+        destination.write(header)
+        total, counter = 0, 0
+        chunk = read(chunk_size)
+        while True:
+            # A chunk is final if nothing follows it - an empty input is one empty final chunk
+            following = read(chunk_size) if len(chunk) == chunk_size else b''
+            final = not following
+            destination.write(aesgcm.encrypt(_stream_nonce(prefix, counter, final), chunk, associated_data))
+            total += len(chunk)
+            if final:
+                return total
+            chunk, counter = following, counter + 1
+
+    def decrypt_stream(self, source, destination, key: bytes, associated_data: bytes = b'') -> Optional[int]:
+        """Decrypt an encrypt_stream() stream into destination, chunk by chunk
+
+        Only authenticated chunks are written, but a tampered or truncated
+        stream is only noticed at the bad chunk - after a None, discard
+        whatever reached destination (decrypt_file() does).
+        Returns: number of plaintext bytes, or None if the key is wrong or data was tampered with
+        """
+        read = _reader(source)
+        header = bytes(read(STREAM_HEADER.size))
+        if len(header) < STREAM_HEADER.size:
+            return None
+        version, chunk_size, salt, prefix = STREAM_HEADER.unpack(header)
+        if version != STREAM_VERSION or not 0 < chunk_size <= STREAM_MAX_CHUNK_SIZE:
+            return None
+        aesgcm = AESGCM(self._stream_key(key, salt))
+        associated_data = header + associated_data
+
+        segment_size = chunk_size + TAG_SIZE
+        total, counter = 0, 0
+        segment = read(segment_size)
+        try:
+            while True:
+                following = read(segment_size) if len(segment) == segment_size else b''
+                final = not following
+                chunk = aesgcm.decrypt(_stream_nonce(prefix, counter, final), segment, associated_data)
+                destination.write(chunk)
+                total += len(chunk)
+                if final:
+                    return total
+                segment, counter = following, counter + 1
+        except InvalidTag:
+            return None
+
+    def encrypt_file(self, source_path: str, destination_path: str, key: bytes,
+                     associated_data: bytes = b'') -> int:
+        """encrypt_stream() from one file to another, reading the source through mmap"""
+        with open(source_path, 'rb') as source, open(destination_path, 'wb') as destination:
+            if os.fstat(source.fileno()).st_size == 0:
+                return self.encrypt_stream(source, destination, key, associated_data)  # can't mmap 0 bytes
+            with mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return self.encrypt_stream(mapped, destination, key, associated_data)
+
+    def decrypt_file(self, source_path: str, destination_path: str, key: bytes,
+                     associated_data: bytes = b'') -> Optional[int]:
+        """decrypt_stream() from one file to another; destination is only created if all of it checks out"""
+        temp_path = destination_path + '.tmp'
+        try:
+            with open(source_path, 'rb') as source, open(temp_path, 'wb') as destination:
+                if os.fstat(source.fileno()).st_size == 0:
+                    return None
+                with mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    total = self.decrypt_stream(mapped, destination, key, associated_data)
+            if total is not None:
+                os.replace(temp_path, destination_path)
+            return total
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def _stream_key(self, key: bytes, salt: bytes) -> bytes:
+        # A fresh key per stream, so random nonce prefixes can never collide under one key
+        return HKDF(algorithm=hashes.SHA256(), length=KEY_SIZE, salt=salt, info=STREAM_KEY_PURPOSE).derive(key)
+
     def encrypt(self, plaintext: str, password: str) -> str:
         """Encrypt data using AES-256-GCM
 
@@ -185,19 +412,107 @@ class CryptoEngine:
         # Cap at 100
         score = min(100, int(score))
 
-        # Rating
-        if score >= 80:
-            rating = "Excellent"
-        elif score >= 60:
-            rating = "Good"
-        elif score >= 40:
-            rating = "Fair"
-        elif score >= 20:
-            rating = "Weak"
-        else:
-            rating = "Very Weak"
+        return (score, strength_rating(score))
+
+    def generate_many(self, count: int, policy: Dict = None) -> List[str]:
+        """Generate count passwords at once
 
-        return (score, rating)
+        policy takes the generate_random_password() arguments. Characters come
+        from one os.urandom() buffer mapped through a byte table; bytes that
+        would bias the alphabet are dropped (rejection sampling), and passwords
+        missing an enabled character class are discarded whole rather than
+        patched, so every valid password is equally likely.
+        A length of 0 gives empty strings, like generate_random_password(0).
+        """
+        policy = dict(DEFAULT_POLICY, **(policy or {}))
+        length = policy['length']
+        if count < 0:
+            raise ValueError(f"Invalid password count: {count}")
+        if length < 0:
+            raise ValueError(f"Invalid password length: {length}")
+        if length == 0:
+            return [''] * count
+
+        classes = []
+        for enabled, chars in ((policy['use_lowercase'], string.ascii_lowercase),
+                               (policy['use_uppercase'], string.ascii_uppercase),
+                               (policy['use_digits'], string.digits),
+                               (policy['use_symbols'], SYMBOLS)):
+            if enabled:
+                if policy['exclude_ambiguous']:
+                    chars = ''.join(c for c in chars if c not in AMBIGUOUS)
+                classes.append(chars.encode('ascii'))
+        alphabet = b''.join(classes) or (string.ascii_letters + string.digits).encode('ascii')
+        # Can't fit one of each class into a very short password
+        required = classes if length >= len(classes) else []
+
+        # Byte b maps to alphabet[b % size]; bytes past the last full multiple of size are dropped
+        usable = 256 - 256 % len(alphabet)
+        table = bytes(alphabet[b % len(alphabet)] if b < usable else 0 for b in range(256))
+        rejected = bytes(range(usable, 256))
+
+        passwords = []
+        while len(passwords) < count:
+            wanted = (count - len(passwords)) * length
+            chars = os.urandom(int(wanted * 256 / usable * 1.1) + 64).translate(table, rejected)
+            for start in range(0, len(chars) - length + 1, length):
+                candidate = chars[start:start + length]
+                if all(len(candidate.translate(None, chars_of_class)) < length for chars_of_class in required):
+                    passwords.append(candidate.decode('ascii'))
+                    if len(passwords) == count:
+                        break
+        return passwords
+
+    def score_many(self, passwords: Iterable[str]) -> List[Tuple[int, str]]:
+        """calculate_password_strength() for many passwords, with identical results
+
+        The batch is joined into one string, so the character-class lookup
+        table and the repeated/sequential run regexes each make a single
+        C-level pass over all passwords instead of several Python-level passes
+        per password.
+        """
+        passwords = list(passwords)
+        results: List[Optional[Tuple[int, str]]] = [None] * len(passwords)
+
+        batch = []
+        for i, password in enumerate(passwords):
+            if not password or not password.isascii() or BATCH_SEPARATOR in password:
+                # Unicode case rules and oddities - leave those to the reference implementation
+                results[i] = self.calculate_password_strength(password)
+            else:
+                batch.append(i)
+        if not batch:
+            return results
+
+        texts = [passwords[i] for i in batch]
+        joined = BATCH_SEPARATOR.join(texts)
+        lengths = list(map(len, texts))
+        starts = list(itertools.accumulate([0] + lengths[:-1], lambda offset, length: offset + length + 1))
+
+        def clean(pattern, text):
+            """Which passwords have no match for pattern"""
+            flagged = {bisect.bisect_right(starts, match.start()) - 1 for match in pattern.finditer(text)}
+            return [0 if position in flagged else 5 for position in range(len(texts))]
+
+        no_repeats = clean(REPEATED_RUN, joined)
+
+        # Alphabet runs ("abc"): XOR each byte's successor letter with the byte
+        # that actually follows it - two zero bytes in a row mark a run
+        lowered = joined.lower().encode('ascii')
+        expected = lowered.translate(NEXT_LETTER)[:-1]
+        follows = (int.from_bytes(expected, 'big') ^ int.from_bytes(lowered[1:], 'big')).to_bytes(len(expected), 'big')
+        no_sequences = clean(re.compile(b'\x00\x00'), follows)
+        variety = map(len, map(set, joined.translate(CHARACTER_CLASSES).split(BATCH_SEPARATOR)))
+        unique = map(len, map(set, texts))
+
+        # Same additions in the same order as calculate_password_strength(), so the floats match
+        scores = [min(100, int(LENGTH_POINTS[length if length < 16 else 16] + classes * 7.5 + distinct / length * 20 +
+                               repeat_points + sequence_points))
+                  for length, classes, distinct, repeat_points, sequence_points
+                  in zip(lengths, variety, unique, no_repeats, no_sequences)]
+        for i, score in zip(batch, scores):
+            results[i] = (score, RATINGS[score])
+        return results
 
 
 # Test function
@@ -216,9 +531,125 @@ if __name__ == "__main__":
     print(f"Decrypted: {decrypted}")
     print(f"Match: {data == decrypted}")
 
+    # Test key wrapping
+    print("\nTesting key wrapping...")
+    salt = os.urandom(16)
+    kek = crypto.derive_key(password, salt)
+    data_key = crypto.generate_data_key()
+    wrapped = crypto.wrap_key(data_key, kek)
+    print(f"Unwrap with right password: {crypto.unwrap_key(wrapped, kek) == data_key}")
+    print(f"Unwrap with wrong password: {crypto.unwrap_key(wrapped, crypto.derive_key('wrong', salt)) is None}")
+    sealed = crypto.encrypt_with_key(data.encode(), data_key)
+    print(f"Round trip with data key: {crypto.decrypt_with_key(sealed, data_key).decode() == data}")
+
     # Test password generation
     print("\nTesting password generation...")
     for _ in range(3):
         pwd = crypto.generate_random_password(16)
         score, rating = crypto.calculate_password_strength(pwd)
         print(f"Password: {pwd} | Strength: {score}/100 ({rating})")
+    print(f"generate_many(0): {crypto.generate_many(0) == []}")
+    print(f"Length 0 gives empty strings: {crypto.generate_many(3, {'length': 0}) == ['', '', '']}")
+    short = crypto.generate_many(50, {'length': 1})
+    print(f"Length 1 (shorter than the class count): {len(short) == 50 and all(len(p) == 1 for p in short)}")
+    for args in ((-1, None), (1, {'length': -1})):
+        try:
+            crypto.generate_many(*args)
+            print(f"Rejects {args}: False")
+        except ValueError as e:
+            print(f"Rejects {args}: True ({e})")
+
+    # Benchmark: batch APIs against one call per password
+    import time
+
+    count = 20000
+    print(f"\nBatch benchmark ({count} passwords)")
+    print("=" * 60)
+
+    start = time.perf_counter()
+    single = [crypto.generate_random_password(16) for _ in range(count)]
+    single_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    batch = crypto.generate_many(count)
+    batch_ms = (time.perf_counter() - start) * 1000
+    print(f"{'generate_random_password() x N':<34} {single_ms:9.1f} ms")
+    print(f"{'generate_many(N)':<34} {batch_ms:9.1f} ms  ({single_ms / batch_ms:.0f}x)")
+
+    samples = single + batch + ["", "aaa", "abc", "Password1", "zyx!!!AAA", "pässwörd123", "  spaced  out  "]
+    start = time.perf_counter()
+    expected = [crypto.calculate_password_strength(pwd) for pwd in samples]
+    single_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    scored = crypto.score_many(samples)
+    batch_ms = (time.perf_counter() - start) * 1000
+    print(f"{'calculate_password_strength() x N':<34} {single_ms:9.1f} ms")
+    print(f"{'score_many(N)':<34} {batch_ms:9.1f} ms  ({single_ms / batch_ms:.0f}x)")
+    print(f"Scores identical: {scored == expected}")
+
+    # Test chunked streams: round trips at chunk boundaries, then tampering
+    import io
+    import tempfile
+    import tracemalloc
+
+    print("\nTesting chunked streams...")
+    key = crypto.generate_data_key()
+    chunk = 1024
+    round_trips = True
+    for size in (0, 1, chunk - 1, chunk, chunk + 1, 3 * chunk, 3 * chunk + 7):
+        plaintext = os.urandom(size)
+        sealed = io.BytesIO()
+        crypto.encrypt_stream(plaintext, sealed, key, b'attachment', chunk_size=chunk)
+        opened = io.BytesIO()
+        total = crypto.decrypt_stream(io.BytesIO(sealed.getvalue()), opened, key, b'attachment')
+        round_trips &= total == size and opened.getvalue() == plaintext
+    print(f"Round trips (0 to {3 * chunk + 7} bytes): {round_trips}")
+
+    sealed = io.BytesIO()
+    crypto.encrypt_stream(os.urandom(3 * chunk), sealed, key, chunk_size=chunk)
+    stream = sealed.getvalue()
+    header, segment = STREAM_HEADER.size, chunk + TAG_SIZE
+    segments = [stream[header + i * segment:header + (i + 1) * segment] for i in range(3)]
+    tampered = {
+        'flipped bit': stream[:-1] + bytes([stream[-1] ^ 1]),
+        'last chunk dropped': stream[:header + 2 * segment],
+        'chunks swapped': stream[:header] + segments[1] + segments[0] + segments[2],
+        'header changed': stream[:header - 1] + bytes([stream[header - 1] ^ 1]) + stream[header:],
+        'cut mid-chunk': stream[:-100]
+    }
+    for name, data in tampered.items():
+        print(f"Rejects {name}: {crypto.decrypt_stream(data, io.BytesIO(), key) is None}")
+    print(f"Rejects wrong key: {crypto.decrypt_stream(stream, io.BytesIO(), crypto.generate_data_key()) is None}")
+    print(f"Rejects wrong associated data: {crypto.decrypt_stream(stream, io.BytesIO(), key, b'other') is None}")
+
+    # Benchmark: a 64 MB file through encrypt_file/decrypt_file, against one encrypt_with_key() call
+    with tempfile.TemporaryDirectory() as folder:
+        size = 64 * 1024 * 1024
+        paths = [os.path.join(folder, name) for name in ('plain', 'sealed', 'opened')]
+        with open(paths[0], 'wb') as f:
+            for _ in range(size // (1 << 20)):
+                f.write(os.urandom(1 << 20))
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        crypto.encrypt_file(paths[0], paths[1], key)
+        encrypt_ms = (time.perf_counter() - start) * 1000
+        encrypt_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.reset_peak()
+        start = time.perf_counter()
+        total = crypto.decrypt_file(paths[1], paths[2], key)
+        decrypt_ms = (time.perf_counter() - start) * 1000
+        decrypt_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.reset_peak()
+        with open(paths[0], 'rb') as f:
+            crypto.encrypt_with_key(f.read(), key)
+        whole_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        with open(paths[0], 'rb') as a, open(paths[2], 'rb') as b:
+            identical = total == size and a.read() == b.read()
+
+        print(f"\nStreaming a {size >> 20} MB file ({STREAM_CHUNK_SIZE >> 10} KiB chunks)")
+        print("=" * 60)
+        print(f"{'encrypt_file()':<34} {encrypt_ms:9.1f} ms  (peak {encrypt_peak / 1e6:.1f} MB)")
+        print(f"{'decrypt_file()':<34} {decrypt_ms:9.1f} ms  (peak {decrypt_peak / 1e6:.1f} MB)")
+        print(f"{'encrypt_with_key() on all of it':<34} {'':>12} (peak {whole_peak / 1e6:.1f} MB)")
+        print(f"Decrypted file identical: {identical}")
@@ -3,11 +3,22 @@ KeyForge - Database Manager
 Handles encrypted storage of passwords and vault data
 """
 
+import base64
 import json
 import os
-from typing import List, Dict, Optional
+import shutil
+from typing import Iterable, List, Dict, Optional, Tuple
 from datetime import datetime
-from crypto_core import CryptoEngine
+from crypto_core import CryptoEngine, KDF_ITERATIONS
+from reuse_index import ReuseIndex
+from search_index import SearchIndex
+from vault_log import LOG_VERSION, VaultLog, read_key_header
+
+VAULT_FORMAT = 'cubvault'
+VAULT_VERSION = '4.0'
+V2_PAYLOAD_AAD = b'cubvault-vault-v2'
+WEAK_PASSWORD_SCORE = 60  # strength scores below this count as weak
+BULK_BATCH_SIZE = 500  # entries scored per score_many() call in add_entries()
 
 
 class PasswordEntry:
@@ -29,6 +40,16 @@ class PasswordEntry:
         self.modified_at = modified_at or datetime.now().isoformat()
         self.password_history = []  # Track password changes
 
+    @property
+    def password(self) -> str:
+        return self._password
+
+    @password.setter
+    def password(self, value: str):
+        self._password = value
+        # Cached (score, rating) from calculate_password_strength(), memory only
+        self.strength: Optional[Tuple[int, str]] = None
+
     def to_dict(self) -> Dict:
         """Convert to dictionary for JSON storage"""
         return {
@@ -70,107 +91,230 @@ class VaultDatabase:
     def __init__(self, vault_path: str = "vault.enc"):
         self.vault_path = vault_path
         self.crypto = CryptoEngine()
-        self.entries: List[PasswordEntry] = []
+        self.entries: List[PasswordEntry] = []  # vault order
+        # Indexes over self.entries, kept in step by every mutation
+        self.entries_by_id: Dict[str, PasswordEntry] = {}
+        self.category_ids: Dict[str, Dict[str, None]] = {}  # category -> ordered set of entry ids
+        # Category each id was indexed under - entries may have been edited in place since
+        self.indexed_category: Dict[str, str] = {}
+        self.search_index = SearchIndex()
+        # Running health aggregates, so get_vault_stats() doesn't rescore the vault
+        self.strength_total = 0
+        self.weak_ids: Dict[str, None] = {}  # ordered set of entry ids
+        self.indexed_score: Dict[str, int] = {}  # entry id -> score counted in strength_total
+        # Reuse groups by keyed fingerprint (needs the data key, so rebuilt at unlock)
+        self.reuse_index = ReuseIndex(self.crypto)
         self.master_password_hash = None
-        self.master_password = None  # Stored in memory only when unlocked
+        self.created_at = None
+        # Session keys, held in memory only while unlocked. The password-derived
+        # key only wraps data_key, so saving never has to run PBKDF2 again.
+        self.data_key = None
+        self.wrapped_key = None
+        self.key_salt = None
+        self.kdf_iterations = KDF_ITERATIONS
+        self.log: Optional[VaultLog] = None  # open record log while unlocked
 
     def is_initialized(self) -> bool:
         """Check if vault file exists"""
         return os.path.exists(self.vault_path)
 
+    def is_unlocked(self) -> bool:
+        return self.data_key is not None
+
     def initialize_vault(self, master_password: str) -> bool:
         """Create new vault with master password"""
         try:
             # Hash master password
             self.master_password_hash = self.crypto.hash_master_password(master_password)
-            self.master_password = master_password
+            self.created_at = datetime.now().isoformat()
 
-            # Create initial vault structure
-            vault_data = {
-                'version': '1.0',
-                'master_password_hash': self.master_password_hash,
-                'created_at': datetime.now().isoformat(),
-                'entries': []
-            }
-
-            # Save vault
-            self._save_vault(vault_data, master_password)
+            self._set_master_password(master_password, self.crypto.generate_data_key())
+            self._load_entries([])
+            self._save_current_vault()
             return True
         except Exception as e:
             print(f"Failed to initialize vault: {e}")
             return False
 
     def unlock_vault(self, master_password: str) -> bool:
-        """Unlock vault with master password"""
+        """Unlock vault with master password
+
+        Vaults in an older format (v1 single blob, v2 single blob with a
+        wrapped key, v3 log of JSON records) are converted to the current
+        record log on the first unlock; the old file is kept next to it as
+        <vault>.v1.bak / .v2.bak / .v3.bak.
+        """
         try:
             if not self.is_initialized():
                 return False
 
-            # Read encrypted vault
-            with open(self.vault_path, 'r') as f:
-                encrypted_data = f.read()
-
-            # Try to decrypt
-            decrypted_json = self.crypto.decrypt(encrypted_data, master_password)
+            key_header = read_key_header(self.vault_path)
+            if key_header is None:
+                return self._unlock_legacy_vault(master_password)
 
-            if decrypted_json is None:
+            # One PBKDF2 run unwraps the data key, which decrypts every record
+            key_encryption_key = self.crypto.derive_key(master_password, key_header['salt'],
+                                                        key_header['iterations'])
+            data_key = self.crypto.unwrap_key(key_header['wrapped_key'], key_encryption_key)
+            if data_key is None:
                 return False
 
-            vault_data = json.loads(decrypted_json)
+            log = VaultLog(self.vault_path, self.crypto, data_key, key_header)
+            header, entries = log.open()
 
             # Verify master password
-            if not self.crypto.verify_master_password(master_password, vault_data['master_password_hash']):
+            if not self.crypto.verify_master_password(master_password, header['master_password_hash']):
+                log.close()
                 return False
 
             # Load entries
-            self.master_password = master_password
-            self.master_password_hash = vault_data['master_password_hash']
-            self.entries = [PasswordEntry.from_dict(e) for e in vault_data.get('entries', [])]
+            self.master_password_hash = header['master_password_hash']
+            self.created_at = header.get('created_at') or datetime.now().isoformat()
+            self.data_key = data_key
+            self.wrapped_key = key_header['wrapped_key']
+            self.key_salt = key_header['salt']
+            self.kdf_iterations = key_header['iterations']
+            self.log = log
+            self._load_entries(entries)
+
+            if key_header['version'] != LOG_VERSION:
+                shutil.copy2(self.vault_path, f"{self.vault_path}.v{key_header['version']}.bak")
+                self._save_current_vault()
 
             return True
         except Exception as e:
             print(f"Failed to unlock vault: {e}")
             return False
 
+    def _unlock_legacy_vault(self, master_password: str) -> bool:
+        """Unlock a v1/v2 vault and convert it to the record log"""
+        with open(self.vault_path, 'r') as f:
+            encrypted_data = f.read()
+
+        envelope = self._parse_envelope(encrypted_data)
+        if envelope:
+            # v2: one PBKDF2 run unwraps the data key, which decrypts the vault
+            salt = base64.b64decode(envelope['kdf']['salt'])
+            data_key = self.crypto.unwrap_key(base64.b64decode(envelope['key']),
+                                              self.crypto.derive_key(master_password, salt,
+                                                                     envelope['kdf']['iterations']))
+            if data_key is None:
+                return False
+            decrypted_json = self.crypto.decrypt_with_key(base64.b64decode(envelope['vault']), data_key,
+                                                          V2_PAYLOAD_AAD)
+            version = 'v2'
+        else:
+            # v1: the whole file is encrypt(json, master_password)
+            decrypted_json = self.crypto.decrypt(encrypted_data, master_password)
+            version = 'v1'
+        if decrypted_json is None:
+            return False
+
+        vault_data = json.loads(decrypted_json)
+
+        # Verify master password
+        if not self.crypto.verify_master_password(master_password, vault_data['master_password_hash']):
+            return False
+
+        self.master_password_hash = vault_data['master_password_hash']
+        self.created_at = vault_data.get('created_at') or datetime.now().isoformat()
+        self._set_master_password(master_password, self.crypto.generate_data_key())
+        self._load_entries(vault_data.get('entries', []))
+
+        shutil.copy2(self.vault_path, f'{self.vault_path}.{version}.bak')
+        self._save_current_vault()
+        return True
+
     def lock_vault(self):
         """Lock vault and clear sensitive data from memory"""
-        self.master_password = None
-        self.entries = []
+        if self.log:
+            self.log.close()
+            self.log = None
+        self.data_key = None
+        self._load_entries([])
 
     def add_entry(self, entry: PasswordEntry) -> bool:
         """Add new password entry"""
         try:
-            if not self.master_password:
+            if not self.is_unlocked() or entry.id in self.entries_by_id:
                 return False
 
             self.entries.append(entry)
-            self._save_current_vault()
+            self._index_entry(entry)
+            self.log.put_entry(entry.to_dict())
             return True
         except Exception as e:
             print(f"Failed to add entry: {e}")
             return False
 
+    def add_entries(self, entries: Iterable[PasswordEntry]) -> int:
+        """Add many entries with one log write and one fsync (all or nothing)
+
+        entries may be a generator - they're scored and indexed a batch at a
+        time as they arrive, so an import never has to materialize its rows.
+        Entries whose id is already in the vault are skipped. If anything
+        fails (including the generator raising), nothing is added and the
+        exception propagates.
+        Returns: number of entries added
+        """
+        if not self.is_unlocked():
+            return 0
+
+        first = len(self.entries)
+
+        def accepted():
+            batch = []
+            for entry in entries:
+                batch.append(entry)
+                if len(batch) == BULK_BATCH_SIZE:
+                    yield from self._add_batch(batch)
+                    batch = []
+            yield from self._add_batch(batch)
+
+        try:
+            return self.log.put_entries(accepted())
+        except BaseException:
+            # Nothing reached the file, so drop the entries indexed so far
+            for entry in self.entries[first:]:
+                self._unindex_entry(entry.id)
+            del self.entries[first:]
+            raise
+
+    def _add_batch(self, batch: List[PasswordEntry]):
+        for entry, strength in zip(batch, self.crypto.score_many(e.password for e in batch)):
+            if entry.id in self.entries_by_id:
+                continue
+            entry.strength = strength
+            self.entries.append(entry)
+            self._index_entry(entry)
+            yield entry.to_dict()
+
     def update_entry(self, entry_id: str, updated_entry: PasswordEntry) -> bool:
         """Update existing entry"""
         try:
-            if not self.master_password:
+            if not self.is_unlocked():
                 return False
 
-            for i, entry in enumerate(self.entries):
-                if entry.id == entry_id:
-                    # Save old password to history
-                    if entry.password != updated_entry.password:
-                        updated_entry.password_history.append({
-                            'password': entry.password,
-                            'changed_at': datetime.now().isoformat()
-                        })
-
-                    updated_entry.modified_at = datetime.now().isoformat()
-                    self.entries[i] = updated_entry
-                    self._save_current_vault()
-                    return True
+            entry = self.entries_by_id.get(entry_id)
+            if entry is None:
+                return False
 
-            return False
+            # Save old password to history - taken from the log, since updated_entry
+            # may be the stored object itself, already edited in place
+            old_password = self.log.stored_entry(entry_id)['password']
+            if old_password != updated_entry.password:
+                updated_entry.password_history.append({
+                    'password': old_password,
+                    'changed_at': datetime.now().isoformat()
+                })
+
+            updated_entry.id = entry_id
+            updated_entry.modified_at = datetime.now().isoformat()
+            self.entries[self._position(entry)] = updated_entry
+            self._unindex_entry(entry_id, search=False)  # search_index.add() replaces it in place
+            self._index_entry(updated_entry)
+            self.log.put_entry(updated_entry.to_dict())
+            return True
         except Exception as e:
             print(f"Failed to update entry: {e}")
             return False
@@ -178,11 +322,14 @@ class VaultDatabase:
     def delete_entry(self, entry_id: str) -> bool:
         """Delete entry"""
         try:
-            if not self.master_password:
+            if not self.is_unlocked():
                 return False
 
-            self.entries = [e for e in self.entries if e.id != entry_id]
-            self._save_current_vault()
+            entry = self.entries_by_id.get(entry_id)
+            if entry is not None:
+                del self.entries[self._position(entry)]
+                self._unindex_entry(entry_id)
+                self.log.delete_entry(entry_id)
             return True
         except Exception as e:
             print(f"Failed to delete entry: {e}")
@@ -190,102 +337,181 @@ class VaultDatabase:
 
     def get_entry(self, entry_id: str) -> Optional[PasswordEntry]:
         """Get entry by ID"""
-        for entry in self.entries:
-            if entry.id == entry_id:
-                return entry
-        return None
-
-    def search_entries(self, query: str) -> List[PasswordEntry]:
-        """Search entries by title, username, url, or tags"""
-        query_lower = query.lower()
-        results = []
+        return self.entries_by_id.get(entry_id)
 
-        for entry in self.entries:
-            if (query_lower in entry.title.lower() or
-                query_lower in entry.username.lower() or
-                query_lower in entry.url.lower() or
-                any(query_lower in tag.lower() for tag in entry.tags) or
-                query_lower in entry.category.lower()):
-                results.append(entry)
+    def search_entries(self, query: str, limit: Optional[int] = None) -> List[PasswordEntry]:
+        """Search entries by title, username, url, tags or category, best match first
 
-        return results
+        Falls back to typo-tolerant matching when nothing matches exactly.
+        Pass limit for type-ahead - only the top results are ranked.
+        """
+        if not query.strip():
+            return self.entries[:limit]
+        return [self.entries_by_id[entry_id] for entry_id in self.search_index.search(query, limit)]
 
     def get_entries_by_category(self, category: str) -> List[PasswordEntry]:
         """Get all entries in a category"""
-        return [e for e in self.entries if e.category == category]
+        return [self.entries_by_id[entry_id] for entry_id in self.category_ids.get(category, ())]
 
     def get_all_categories(self) -> List[str]:
         """Get list of all categories"""
-        categories = set(e.category for e in self.entries)
-        return sorted(list(categories))
+        return sorted(self.category_ids)
+
+    # ---------- indexes ----------
+
+    def _load_entries(self, entry_dicts: List[Dict]):
+        """Replace all entries (unlock/lock) and rebuild the indexes"""
+        self.entries = [PasswordEntry.from_dict(e) for e in entry_dicts]
+        self.entries_by_id = {}
+        self.category_ids = {}
+        self.indexed_category = {}
+        self.strength_total = 0
+        self.weak_ids = {}
+        self.indexed_score = {}
+        self.reuse_index = ReuseIndex(self.crypto, self.data_key)
+        for entry, strength in zip(self.entries, self.crypto.score_many(e.password for e in self.entries)):
+            entry.strength = strength
+        for entry in self.entries:
+            self._index_entry(entry, search=False)
+        self.search_index.rebuild(self.entries)
+
+    def _index_entry(self, entry: PasswordEntry, search: bool = True):
+        self.entries_by_id[entry.id] = entry
+        self.category_ids.setdefault(entry.category, {})[entry.id] = None
+        self.indexed_category[entry.id] = entry.category
+        if search:
+            self.search_index.add(entry)
+
+        # Scored once per password - the cache is dropped when the password is replaced
+        if entry.strength is None:
+            entry.strength = self.crypto.calculate_password_strength(entry.password)
+        self.indexed_score[entry.id] = entry.strength[0]
+        self.strength_total += entry.strength[0]
+        if entry.strength[0] < WEAK_PASSWORD_SCORE:
+            self.weak_ids[entry.id] = None
+        self.reuse_index.add(entry)
+
+    def _unindex_entry(self, entry_id: str, search: bool = True):
+        # Everything is looked up by id - the entry object may already hold its new values
+        del self.entries_by_id[entry_id]
+        if search:
+            self.search_index.remove(entry_id)
+        category = self.indexed_category.pop(entry_id)
+        ids = self.category_ids[category]
+        del ids[entry_id]
+        if not ids:
+            del self.category_ids[category]
+
+        self.strength_total -= self.indexed_score.pop(entry_id)
+        self.weak_ids.pop(entry_id, None)
+        self.reuse_index.remove(entry_id)
+
+    def _position(self, entry: PasswordEntry) -> int:
+        # PasswordEntry has no __eq__, so list.index() is an identity scan in C
+        return self.entries.index(entry)
 
     def get_weak_passwords(self) -> List[PasswordEntry]:
         """Find entries with weak passwords"""
-        weak_entries = []
-        for entry in self.entries:
-            score, _ = self.crypto.calculate_password_strength(entry.password)
-            if score < 60:
-                weak_entries.append(entry)
-        return weak_entries
+        return [self.entries_by_id[entry_id] for entry_id in self.weak_ids]
 
-    def get_reused_passwords(self) -> Dict[str, List[PasswordEntry]]:
-        """Find passwords that are reused across multiple entries"""
-        password_map = {}
+    def get_reused_passwords(self) -> List[List[PasswordEntry]]:
+        """Find passwords that are reused across multiple entries
 
-        for entry in self.entries:
-            if entry.password in password_map:
-                password_map[entry.password].append(entry)
-            else:
-                password_map[entry.password] = [entry]
+        Returns: one list of entries per shared password (grouped by keyed
+        fingerprint - the passwords themselves are never used as keys)
+        """
+        return [[self.entries_by_id[entry_id] for entry_id in ids] for ids in self.reuse_index.reused_groups()]
+
+    def get_similar_passwords(self) -> List[List[PasswordEntry]]:
+        """Find groups of different passwords built on the same base ("Summer2023!" / "summer24")"""
+        return [[self.entries_by_id[entry_id] for entry_id in ids] for ids in self.reuse_index.similar_groups()]
+
+    def get_recycled_passwords(self) -> List[PasswordEntry]:
+        """Find entries whose current password is in their own or another entry's password history"""
+        return [self.entries_by_id[entry_id] for entry_id in self.reuse_index.recycled()]
 
-        # Return only passwords used more than once
-        return {pwd: entries for pwd, entries in password_map.items() if len(entries) > 1}
+    def check_password(self, password: str, entry_id: str = None) -> Dict[str, List[PasswordEntry]]:
+        """Entries a candidate password would be reused with, similar to or recycled from
+
+        entry_id is the entry being edited, left out of the reused/similar lists.
+        """
+        matches = self.reuse_index.matches(password, exclude=entry_id)
+        return {kind: [self.entries_by_id[i] for i in ids if i in self.entries_by_id]
+                for kind, ids in matches.items()}
 
     def change_master_password(self, old_password: str, new_password: str) -> bool:
-        """Change vault master password"""
+        """Change vault master password
+
+        Entries are re-encrypted under a fresh data key, so the old password
+        (or an old copy of the file) can't unwrap the key protecting them.
+        The reuse index is rebuilt since its fingerprints are keyed from it.
+        """
         try:
-            if old_password != self.master_password:
+            if not self.is_unlocked():
+                return False
+            if not self.crypto.verify_master_password(old_password, self.master_password_hash):
                 return False
 
             # Hash new password
             new_hash = self.crypto.hash_master_password(new_password)
 
-            # Update and save with new password
-            self.master_password = new_password
+            # Update and save with new password and data key
             self.master_password_hash = new_hash
+            self._set_master_password(new_password, self.crypto.generate_data_key())
             self._save_current_vault()
 
+            self.reuse_index = ReuseIndex(self.crypto, self.data_key)
+            for entry in self.entries:
+                self.reuse_index.add(entry)
+
             return True
         except Exception as e:
             print(f"Failed to change master password: {e}")
             return False
 
+    def _set_master_password(self, master_password: str, data_key: bytes):
+        """Wrap data_key under a key derived from master_password (the only PBKDF2 run per session)"""
+        self.key_salt = os.urandom(16)
+        self.kdf_iterations = KDF_ITERATIONS
+        key_encryption_key = self.crypto.derive_key(master_password, self.key_salt, self.kdf_iterations)
+        self.wrapped_key = self.crypto.wrap_key(data_key, key_encryption_key)
+        self.data_key = data_key
+
+    @staticmethod
+    def _parse_envelope(file_data: str) -> Optional[Dict]:
+        """The v2 outer JSON envelope, or None for a v1 vault (bare base64)"""
+        if not file_data.lstrip().startswith('{'):
+            return None
+        envelope = json.loads(file_data)
+        if envelope.get('format') != VAULT_FORMAT:
+            raise ValueError(f"Not a CubVault file: {envelope.get('format')}")
+        return envelope
+
     def _save_current_vault(self):
-        """Save current vault state"""
-        vault_data = {
-            'version': '1.0',
+        """Rewrite the whole vault as a fresh record log
+
+        Only needed when the file prefix changes (new vault, migration, new
+        master password) - entry edits append to the open log instead.
+        """
+        if self.log:
+            self.log.close()
+        header = {
+            'version': VAULT_VERSION,
             'master_password_hash': self.master_password_hash,
-            'created_at': datetime.now().isoformat(),
-            'entries': [e.to_dict() for e in self.entries]
+            'created_at': self.created_at
         }
-        self._save_vault(vault_data, self.master_password)
-
-    def _save_vault(self, vault_data: Dict, master_password: str):
-        """Encrypt and save vault to disk"""
-        # Convert to JSON
-        json_data = json.dumps(vault_data, indent=2)
-
-        # Encrypt
-        encrypted_data = self.crypto.encrypt(json_data, master_password)
-
-        # Save to file
-        with open(self.vault_path, 'w') as f:
-            f.write(encrypted_data)
+        key_header = {
+            'iterations': self.kdf_iterations,
+            'salt': self.key_salt,
+            'wrapped_key': self.wrapped_key
+        }
+        self.log = VaultLog.create(self.vault_path, self.crypto, self.data_key, key_header,
+                                   header, [e.to_dict() for e in self.entries])
 
     def export_vault(self, export_path: str, include_passwords: bool = True) -> bool:
         """Export vault to JSON file (unencrypted - use carefully!)"""
         try:
-            if not self.master_password:
+            if not self.is_unlocked():
                 return False
 
             export_data = {
@@ -315,20 +541,126 @@ class VaultDatabase:
                 'categories': 0,
                 'weak_passwords': 0,
                 'reused_passwords': 0,
+                'similar_passwords': 0,
                 'average_strength': 0
             }
 
-        weak_count = len(self.get_weak_passwords())
-        reused_count = sum(len(entries) for entries in self.get_reused_passwords().values())
-
-        total_strength = sum(self.crypto.calculate_password_strength(e.password)[0]
-                           for e in self.entries)
-        avg_strength = total_strength / len(self.entries) if self.entries else 0
-
         return {
             'total_entries': len(self.entries),
-            'categories': len(self.get_all_categories()),
-            'weak_passwords': weak_count,
-            'reused_passwords': reused_count,
-            'average_strength': int(avg_strength)
+            'categories': len(self.category_ids),
+            'weak_passwords': len(self.weak_ids),
+            'reused_passwords': self.reuse_index.reused_count,
+            'similar_passwords': self.reuse_index.similar_count,
+            'average_strength': int(self.strength_total / len(self.entries))
         }
+
+
+def migrate_vault(vault_path: str, master_password: str) -> bool:
+    """Upgrade a v1/v2/v3 vault file to the current record log in place (no-op for current vaults)"""
+    vault = VaultDatabase(vault_path)
+    migrated = vault.unlock_vault(master_password)
+    vault.lock_vault()
+    return migrated
+
+
+# Benchmark: latency of one edit with v1 saves (PBKDF2 + full rewrite), v2 saves (cached key + full
+# rewrite) and record log appends
+if __name__ == "__main__":
+    import sys
+    import tempfile
+    import time
+    import uuid
+
+    if len(sys.argv) == 3:
+        # python database.py <vault.enc> <master password>  -> migrate an old vault
+        print("Migrated" if migrate_vault(sys.argv[1], sys.argv[2]) else "Migration failed")
+        sys.exit(0)
+
+    entry_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    edits = 5
+    password = "benchmark master password"
+
+    def make_entry(i):
+        return PasswordEntry(str(uuid.uuid4()), f"Site {i}", f"user{i}@example.com",
+                             f"pw-{i}-{uuid.uuid4().hex[:8]}", url=f"https://site{i}.example.com")
+
+    # Indexes must follow an entry edited in place (the object get_entry() returned)
+    with tempfile.TemporaryDirectory() as folder:
+        vault_path = os.path.join(folder, "check.enc")
+        vault = VaultDatabase(vault_path)
+        vault.initialize_vault(password)
+        vault.add_entries(make_entry(i) for i in range(10))
+        entry = vault.get_entry(vault.entries[0].id)
+        old_password = entry.password
+        entry.category = "Work"
+        entry.password = "correct horse battery staple 42!"
+        assert vault.update_entry(entry.id, entry)
+        assert [old['password'] for old in entry.password_history] == [old_password]
+
+        fresh = VaultDatabase(vault_path)
+        assert fresh.unlock_vault(password)
+        for checked in (vault, fresh):
+            categories = {}
+            for e in checked.entries:
+                categories.setdefault(e.category, {})[e.id] = None
+            assert checked.category_ids == categories, checked.category_ids
+            assert [e.id for e in checked.get_entries_by_category("Work")] == [entry.id]
+        assert vault.strength_total == fresh.strength_total
+        assert vault.weak_ids == fresh.weak_ids and entry.id not in vault.weak_ids
+        assert fresh.get_entry(entry.id).password_history == entry.password_history
+        fresh.lock_vault()
+        vault.lock_vault()
+    print("Index check passed")
+
+    with tempfile.TemporaryDirectory() as folder:
+        # Build a v1 file the way the old _save_vault() did
+        vault_path = os.path.join(folder, "vault.enc")
+        crypto = CryptoEngine()
+        v1_data = {
+            'version': '1.0',
+            'master_password_hash': crypto.hash_master_password(password),
+            'created_at': datetime.now().isoformat(),
+            'entries': [make_entry(i).to_dict() for i in range(entry_count)]
+        }
+
+        start = time.perf_counter()
+        for _ in range(edits):
+            with open(vault_path, 'w') as f:
+                f.write(crypto.encrypt(json.dumps(v1_data, indent=2), password))
+        v1_ms = (time.perf_counter() - start) * 1000 / edits
+
+        data_key = crypto.generate_data_key()
+        start = time.perf_counter()
+        for _ in range(edits):
+            payload = crypto.encrypt_with_key(json.dumps(v1_data, indent=2).encode(), data_key, V2_PAYLOAD_AAD)
+            with open(vault_path + '.v2', 'w') as f:
+                f.write(base64.b64encode(payload).decode('utf-8'))
+                f.flush()
+                os.fsync(f.fileno())
+        v2_ms = (time.perf_counter() - start) * 1000 / edits
+
+        start = time.perf_counter()
+        assert migrate_vault(vault_path, password), "migration failed"
+        migrate_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        vault = VaultDatabase(vault_path)
+        assert vault.unlock_vault(password) and len(vault.entries) == entry_count
+        unlock_ms = (time.perf_counter() - start) * 1000
+
+        size_before = os.path.getsize(vault_path)
+        start = time.perf_counter()
+        for i in range(edits):
+            entry = vault.entries[i]
+            vault.update_entry(entry.id, PasswordEntry(entry.id, entry.title, entry.username, f"new-{i}"))
+        v3_ms = (time.perf_counter() - start) * 1000 / edits
+        appended = (os.path.getsize(vault_path) - size_before) / edits
+        vault.lock_vault()
+
+        print(f"Edit latency, {entry_count} entries ({edits} edits each)")
+        print("=" * 60)
+        print(f"{'v1 save (PBKDF2 + rewrite)':<34} {v1_ms:10.1f} ms/edit")
+        print(f"{'v2 save (cached key + rewrite)':<34} {v2_ms:10.1f} ms/edit")
+        print(f"{'record log append':<34} {v3_ms:10.1f} ms/edit  ({appended:.0f} bytes)")
+        print(f"{'v1 -> record log migration':<34} {migrate_ms:10.1f} ms")
+        print(f"{'unlock':<34} {unlock_ms:10.1f} ms")
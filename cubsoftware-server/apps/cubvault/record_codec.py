@@ -0,0 +1,223 @@
+"""
+CubVault - Record Codec
+Compact binary encoding of vault entries for the record log
+
+An entry is packed as
+
+    [form, tag count, history count, text size] [UTF-8 text]
+
+where the text is every string field, tag and password history item
+joined by a unit separator (\x1f). No field names, quotes or escapes are
+stored, and decoding takes one struct unpack, one UTF-8 decode and one
+split per entry. Entries that don't fit the schema (extra keys,
+non-string values, a string containing \x1f) are stored as compact JSON
+behind the same header instead, so any entry round-trips exactly.
+
+A block is a run of packed entries behind a one-byte compression flag.
+Blocks are zstd compressed when the zstandard package (or Python 3.14's
+compression.zstd) is installed and it makes them smaller; reading a
+compressed block without it raises ValueError.
+"""
+
+import json
+import struct
+from typing import Dict, List, Tuple
+
+try:
+    from compression import zstd  # Python 3.14+
+except ImportError:
+    try:
+        import zstandard as zstd
+    except ImportError:
+        zstd = None
+
+STRING_FIELDS = ('id', 'title', 'username', 'password', 'url', 'notes', 'category', 'created_at', 'modified_at')
+ENTRY_KEYS = frozenset(STRING_FIELDS + ('tags', 'password_history'))
+HISTORY_KEYS = frozenset(('password', 'changed_at'))
+
+# Entry forms
+PACKED = 0
+JSON_FORM = 1
+
+# Block flags
+RAW_BLOCK = 0
+ZSTD_BLOCK = 1
+
+COMPRESS_MIN_SIZE = 256  # zstd frame overhead outweighs the gain below this
+ZSTD_LEVEL = 3
+
+SEPARATOR = '\x1f'
+ENTRY_HEADER = struct.Struct('<BHHI')  # form, tag count, history count, text size
+
+
+def encode_entry(entry: Dict) -> bytes:
+    """One entry dict (as PasswordEntry.to_dict() makes them) in packed form"""
+    strings = _strings(entry)
+    if strings is None:
+        data = json.dumps(entry, separators=(',', ':')).encode('utf-8')
+        return ENTRY_HEADER.pack(JSON_FORM, 0, 0, len(data)) + data
+
+    text = SEPARATOR.join(strings).encode('utf-8', 'surrogatepass')
+    return ENTRY_HEADER.pack(PACKED, len(entry['tags']), len(entry['password_history']), len(text)) + text
+
+
+def decode_entries(data: bytes) -> List[Tuple[Dict, bytes]]:
+    """(entry, its packed bytes) for each entry packed back to back in data"""
+    entries = []
+    field_count = len(STRING_FIELDS)
+    header = ENTRY_HEADER
+    position, end = 0, len(data)
+    while position < end:
+        start = position
+        form, tag_count, history_count, text_size = header.unpack_from(data, position)
+        position += header.size + text_size
+        if position > end:
+            raise ValueError("Corrupt entry encoding")
+        if form == JSON_FORM:
+            entries.append((json.loads(data[start + header.size:position]), data[start:position]))
+            continue
+        if form != PACKED:
+            raise ValueError(f"Unknown entry encoding: {form}")
+
+        strings = str(data[start + header.size:position], 'utf-8', 'surrogatepass').split(SEPARATOR)
+        tags_end = field_count + tag_count
+        if len(strings) != tags_end + 2 * history_count:
+            raise ValueError("Corrupt entry encoding")
+        entry = dict(zip(STRING_FIELDS, strings))
+        entry['tags'] = strings[field_count:tags_end]
+        entry['password_history'] = [{'password': strings[i], 'changed_at': strings[i + 1]}
+                                     for i in range(tags_end, len(strings), 2)] if history_count else []
+        entries.append((entry, data[start:position]))
+    return entries
+
+
+def encode_block(packed_entries: List[bytes]) -> bytes:
+    """Packed entries joined into one record payload, compressed if that helps"""
+    body = b''.join(packed_entries)
+    if zstd is not None and len(body) >= COMPRESS_MIN_SIZE:
+        compressed = zstd.compress(body, ZSTD_LEVEL)
+        if len(compressed) < len(body):
+            return bytes((ZSTD_BLOCK,)) + compressed
+    return bytes((RAW_BLOCK,)) + body
+
+
+def decode_block(payload: bytes) -> List[Tuple[Dict, bytes]]:
+    """(entry, its packed bytes) for each entry in a block"""
+    if not payload:
+        raise ValueError("Empty entry block")
+    flag, body = payload[0], payload[1:]
+    if flag == ZSTD_BLOCK:
+        if zstd is None:
+            raise ValueError("Vault is zstd compressed - install the zstandard package to open it")
+        body = zstd.decompress(body)
+    elif flag != RAW_BLOCK:
+        raise ValueError(f"Unknown block encoding: {flag}")
+    return decode_entries(body)
+
+
+def _strings(entry: Dict):
+    """Every string of a schema-conforming entry in packing order, or None"""
+    if entry.keys() != ENTRY_KEYS:
+        return None
+    tags, history = entry['tags'], entry['password_history']
+    if type(tags) is not list or type(history) is not list or len(tags) > 0xFFFF or len(history) > 0xFFFF:
+        return None
+    strings = [entry[field] for field in STRING_FIELDS]
+    strings += tags
+    for item in history:
+        if type(item) is not dict or item.keys() != HISTORY_KEYS:
+            return None
+        strings.append(item['password'])
+        strings.append(item['changed_at'])
+    for value in strings:
+        if type(value) is not str or SEPARATOR in value:
+            return None
+    return strings
+
+
+# Round-trip fuzz test, then size and decode speed against compact JSON records
+if __name__ == "__main__":
+    import random
+    import sys
+    import time
+    import uuid
+    from datetime import datetime
+
+    random.seed(int(sys.argv[1]) if len(sys.argv) > 1 else 0)
+    alphabet = 'abcXYZ019 _-@./:"\\\n\t' + 'é漢字ßΩ' + '\U0001F510\U0001F600' + '𐏿\x00\ud800'  # a lone surrogate too
+
+    def random_text(longest=40):
+        if random.random() < 0.002:
+            longest = 70000
+        return ''.join(random.choice(alphabet) for _ in range(random.randint(0, longest)))
+
+    def random_value(depth=0):
+        kind = random.randrange(7 if depth < 2 else 5)
+        if kind == 5:
+            return [random_value(depth + 1) for _ in range(random.randint(0, 3))]
+        if kind == 6:
+            return {random_text(5): random_value(depth + 1) for _ in range(random.randint(0, 3))}
+        return [None, random.random() < 0.5, random.randint(-2 ** 40, 2 ** 40), random.random(), random_text()][kind]
+
+    def random_entry():
+        entry = {field: random_text() for field in STRING_FIELDS}
+        entry['tags'] = [random_text(10) for _ in range(random.randint(0, 4))]
+        entry['password_history'] = [{'password': random_text(), 'changed_at': random_text(26)}
+                                     for _ in range(random.randint(0, 3))]
+        mutation = random.randrange(12)
+        if mutation == 0:
+            entry[random.choice(list(entry))] = random_value()  # wrong type somewhere
+        elif mutation == 1:
+            entry[random_text(8)] = random_value()  # unknown key
+        elif mutation == 2:
+            del entry[random.choice(list(entry))]  # missing key
+        elif mutation == 3 and entry['password_history']:
+            entry['password_history'][0]['extra'] = random_value()
+        elif mutation == 4:
+            entry[random.choice(STRING_FIELDS)] += SEPARATOR
+        return entry
+
+    forms = {PACKED: 0, JSON_FORM: 0}
+    for _ in range(20000):
+        entries = [random_entry() for _ in range(random.randint(1, 5))]
+        packed = [encode_entry(entry) for entry in entries]
+        for data in packed:
+            forms[data[0]] += 1
+        decoded = decode_block(encode_block(packed))
+        assert [entry for entry, _ in decoded] == entries, (entries, decoded)
+        assert [data for _, data in decoded] == packed
+    print(f"Fuzz: 20000 blocks round-tripped ({forms[PACKED]} packed entries, {forms[JSON_FORM]} JSON)")
+
+    def make_entry(i):
+        now = datetime.now().isoformat()
+        return {'id': str(uuid.uuid4()), 'title': f"Site {i}", 'username': f"user{i}@example.com",
+                'password': f"pw-{i}-{uuid.uuid4().hex[:8]}", 'url': f"https://site{i}.example.com/login",
+                'notes': "", 'category': random.choice(['General', 'Work', 'Social']), 'tags': ['imported'],
+                'created_at': now, 'modified_at': now, 'password_history': []}
+
+    count = 10000
+    entries = [make_entry(i) for i in range(count)]
+    records = [json.dumps(entry, separators=(',', ':')).encode('utf-8') for entry in entries]
+    packed = [encode_entry(entry) for entry in entries]
+    blocks, block = [], []
+    for data in packed:
+        block.append(data)
+        if sum(map(len, block)) >= 1 << 16:
+            blocks.append(encode_block(block))
+            block = []
+    blocks.append(encode_block(block))
+
+    start = time.perf_counter()
+    for record in records:
+        json.loads(record)
+    json_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    for block in blocks:
+        decode_block(block)
+    packed_ms = (time.perf_counter() - start) * 1000
+
+    print(f"{count} entries{'' if zstd else ' (zstd not installed)'}")
+    print("=" * 60)
+    print(f"{'JSON record per entry':<28} {sum(map(len, records)):>9} bytes  {json_ms:7.1f} ms to decode")
+    print(f"{'packed entries':<28} {sum(map(len, packed)):>9} bytes")
+    print(f"{'packed blocks':<28} {sum(map(len, blocks)):>9} bytes  {packed_ms:7.1f} ms to decode")
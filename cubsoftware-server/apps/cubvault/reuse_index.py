@@ -0,0 +1,141 @@
+"""
+CubVault - Password Reuse Index
+Tracks reused, near-duplicate and recycled passwords by keyed fingerprint
+
+Passwords are never used as dictionary keys. Each one is reduced to an
+HMAC under a key derived from the vault's data key, so the index (and
+anything it returns) holds nothing that could be matched against a
+wordlist without unlocking the vault. Two fingerprints per password:
+
+    exact  HMAC of the password itself
+    base   HMAC of its normalized core - lowercased, leetspeak undone and
+           leading/trailing digits and symbols stripped, so "Summer2023!"
+           and "summer24" share one
+
+Entries are added and removed one at a time, and the reuse counts are
+adjusted in O(1) per change.
+"""
+
+import re
+from typing import Dict, List, Optional, Set
+
+FINGERPRINT_PURPOSE = b'cubvault-password-fingerprint'
+
+LEET = str.maketrans('0134579$@!|', 'oieastgsaii')
+EDGE_NOISE = re.compile(r'^[\W\d_]+|[\W\d_]+$')
+MIN_BASE_LENGTH = 4  # shorter cores ("abc" from "abc123") would group unrelated passwords
+
+
+def password_base(password: str) -> Optional[str]:
+    """Normalized core of a password, or None if too little is left to compare"""
+    base = EDGE_NOISE.sub('', password).lower().translate(LEET)
+    return base if len(base) >= MIN_BASE_LENGTH else None
+
+
+class ReuseIndex:
+    """Fingerprint groups for one unlocked vault"""
+
+    def __init__(self, crypto, data_key: Optional[bytes] = None):
+        self.crypto = crypto
+        self.key = crypto.derive_subkey(data_key, FINGERPRINT_PURPOSE) if data_key else None
+        self.exact: Dict[bytes, Dict[str, None]] = {}  # fingerprint -> ordered set of entry ids
+        self.similar: Dict[bytes, Dict[str, bytes]] = {}  # base fingerprint -> {entry id: exact fingerprint}
+        self.similar_variants: Dict[bytes, Dict[bytes, int]] = {}  # base fingerprint -> {exact fingerprint: count}
+        self.history: Dict[bytes, Set[str]] = {}  # fingerprint of an old password -> ids of entries that had it
+        self.fingerprints: Dict[str, tuple] = {}  # entry id -> (exact, base, history fingerprints)
+        self.reused_count = 0  # entries sharing their exact password with another entry
+        self.similar_count = 0  # entries in a base group that holds more than one distinct password
+
+    def add(self, entry):
+        fingerprint = self.crypto.fingerprint(self.key, entry.password)
+        base = password_base(entry.password)
+        base_fingerprint = self.crypto.fingerprint(self.key, base) if base else None
+        history = {self.crypto.fingerprint(self.key, old['password']) for old in entry.password_history
+                   if old.get('password')}
+        self.fingerprints[entry.id] = (fingerprint, base_fingerprint, history)
+
+        sharing = self.exact.setdefault(fingerprint, {})
+        sharing[entry.id] = None
+        if len(sharing) == 2:
+            self.reused_count += 2  # the first holder becomes reused too
+        elif len(sharing) > 2:
+            self.reused_count += 1
+
+        if base_fingerprint:
+            before = self._similar_size(base_fingerprint)
+            self.similar.setdefault(base_fingerprint, {})[entry.id] = fingerprint
+            variants = self.similar_variants.setdefault(base_fingerprint, {})
+            variants[fingerprint] = variants.get(fingerprint, 0) + 1
+            self.similar_count += self._similar_size(base_fingerprint) - before
+
+        for old in history:
+            self.history.setdefault(old, set()).add(entry.id)
+
+    def remove(self, entry_id: str):
+        fingerprints = self.fingerprints.pop(entry_id, None)
+        if fingerprints is None:
+            return
+        fingerprint, base_fingerprint, history = fingerprints
+
+        sharing = self.exact[fingerprint]
+        if len(sharing) == 2:
+            self.reused_count -= 2
+        elif len(sharing) > 2:
+            self.reused_count -= 1
+        del sharing[entry_id]
+        if not sharing:
+            del self.exact[fingerprint]
+
+        if base_fingerprint:
+            before = self._similar_size(base_fingerprint)
+            group = self.similar[base_fingerprint]
+            del group[entry_id]
+            variants = self.similar_variants[base_fingerprint]
+            variants[fingerprint] -= 1
+            if not variants[fingerprint]:
+                del variants[fingerprint]
+            self.similar_count += self._similar_size(base_fingerprint) - before
+            if not group:
+                del self.similar[base_fingerprint]
+                del self.similar_variants[base_fingerprint]
+
+        for old in history:
+            holders = self.history[old]
+            holders.discard(entry_id)
+            if not holders:
+                del self.history[old]
+
+    def reused_groups(self) -> List[List[str]]:
+        """Ids of entries sharing the exact same password, one list per password"""
+        return [list(ids) for ids in self.exact.values() if len(ids) > 1]
+
+    def similar_groups(self) -> List[List[str]]:
+        """Ids of entries whose passwords differ only in case, leetspeak or a prefix/suffix"""
+        return [list(group) for base, group in self.similar.items() if len(self.similar_variants[base]) > 1]
+
+    def recycled(self) -> Dict[str, List[str]]:
+        """Entry id -> ids of entries (itself included) that used its current password before"""
+        result = {}
+        for entry_id, (fingerprint, _, _) in self.fingerprints.items():
+            holders = self.history.get(fingerprint)
+            if holders:
+                result[entry_id] = sorted(holders)
+        return result
+
+    def matches(self, password: str, exclude: str = None) -> Dict[str, List[str]]:
+        """Which entries a candidate password would collide with, before saving it"""
+        fingerprint = self.crypto.fingerprint(self.key, password)
+        base = password_base(password)
+        base_fingerprint = self.crypto.fingerprint(self.key, base) if base else None
+        return {
+            'reused': [i for i in self.exact.get(fingerprint, ()) if i != exclude],
+            'similar': [i for i, f in self.similar.get(base_fingerprint, {}).items()
+                        if i != exclude and f != fingerprint],
+            'previously_used': sorted(self.history.get(fingerprint, ()))  # the entry's own history counts
+        }
+
+    def _similar_size(self, base_fingerprint: bytes) -> int:
+        # A base group only counts once it holds two different passwords
+        if len(self.similar_variants.get(base_fingerprint, ())) < 2:
+            return 0
+        return len(self.similar[base_fingerprint])
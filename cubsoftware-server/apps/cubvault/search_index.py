@@ -0,0 +1,387 @@
+"""
+CubVault - Search Index
+In-memory index over entry titles, usernames, URLs, tags and categories
+
+    grams        every 1-, 2- and 3-character substring of a field -> {entry id: score},
+                 scored higher where it starts a word
+    typos        every word with one character deleted -> words
+
+One- to three-character queries are answered straight from a posting,
+whose ranking is cached until an entry containing that gram changes.
+Longer queries intersect the postings of their trigrams (smallest first)
+and only check those candidates. If nothing matches, the typo table finds
+words one edit or swap away from each query word, SymSpell style.
+"""
+
+import heapq
+import re
+from typing import Dict, List, Optional, Set, Tuple
+
+# Ranking weight per field - a title hit beats a username hit beats a URL hit
+FIELD_WEIGHTS = {
+    'title': 50,
+    'username': 30,
+    'tags': 30,
+    'category': 20,
+    'url': 10
+}
+
+# Score multipliers: the query is the whole field / starts a word / is inside a word
+WHOLE_FIELD = 3
+WORD_START = 2
+INSIDE_WORD = 1
+
+FUZZY_MIN_LENGTH = 4  # shorter words have too many one-typo neighbours to be useful
+
+WORD_SPLIT = re.compile(r'\W+')
+WORD_START_RE = re.compile(r'\b\w')
+
+
+class _Later:
+    """Tie-break key compared in reverse, so a min-heap's top is the weakest of equal scores"""
+    __slots__ = ('key',)
+
+    def __init__(self, key):
+        self.key = key
+
+    def __lt__(self, other):
+        return self.key > other.key
+
+
+def typo_variants(word: str) -> Set[str]:
+    """word itself plus every way of deleting one character"""
+    return {word} | {word[:i] + word[i + 1:] for i in range(len(word))}
+
+
+def within_one_typo(a: str, b: str) -> bool:
+    """One insertion, deletion, substitution or adjacent swap apart (or equal)"""
+    if a == b:
+        return True
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) > len(b):
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    if len(a) < len(b):
+        return a[i:] == b[i + 1:]
+    if a[i + 1:] == b[i + 1:]:
+        return True
+    return i + 1 < len(a) and a[i] == b[i + 1] and a[i + 1] == b[i] and a[i + 2:] == b[i + 2:]
+
+
+class SearchIndex:
+    """Searchable view of vault entries, updated per add/remove"""
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.ranked: Dict[str, List[str]] = {}  # gram -> ids by score, built on demand
+        self.word_entries: Dict[str, Dict[str, int]] = {}  # word -> {entry id: field weight}
+        self.typos: Dict[str, Set[str]] = {}  # typo variant -> words
+        # entry id -> (lowercase title for tie-breaks, [(weight, lowercase text)], grams, words)
+        self.documents: Dict[str, Tuple[str, List[Tuple[int, str]], List[str], List[str]]] = {}
+        # entry id -> when it was first added, the last tie-break (vault order)
+        self.order: Dict[str, int] = {}
+        self.next_order = 0
+
+    def rebuild(self, entries):
+        self.clear()
+        for entry in entries:
+            self.add(entry)
+
+    def add(self, entry):
+        """Index an entry (replacing an older version with the same id, which keeps its place)"""
+        order = self.order.get(entry.id)
+        self.remove(entry.id)
+        if order is None:
+            order = self.next_order
+            self.next_order += 1
+        self.order[entry.id] = order
+        fields = [
+            (FIELD_WEIGHTS['title'], entry.title),
+            (FIELD_WEIGHTS['username'], entry.username),
+            (FIELD_WEIGHTS['url'], entry.url),
+            (FIELD_WEIGHTS['category'], entry.category)
+        ] + [(FIELD_WEIGHTS['tags'], tag) for tag in entry.tags]
+
+        texts = []
+        grams: Dict[str, int] = {}
+        words: Dict[str, int] = {}
+        for weight, value in fields:
+            text = (value or '').lower()
+            if not text:
+                continue
+            texts.append((weight, text))
+            # Every substring of up to 3 characters, so short queries match anywhere like longer ones
+            field_grams = dict.fromkeys({text[i:i + size] for size in (1, 2, 3) for i in range(len(text) - size + 1)},
+                                        weight * INSIDE_WORD)
+            for match in WORD_START_RE.finditer(text):
+                i = match.start()
+                field_grams[text[i]] = field_grams[text[i:i + 2]] = field_grams[text[i:i + 3]] = weight * WORD_START
+            if len(text) <= 3:
+                field_grams[text] = weight * WHOLE_FIELD
+            for gram, score in field_grams.items():
+                if grams.get(gram, 0) < score:
+                    grams[gram] = score
+            for word in WORD_SPLIT.split(text):
+                if len(word) >= FUZZY_MIN_LENGTH and words.get(word, 0) < weight:
+                    words[word] = weight
+
+        texts.sort(key=lambda field: -field[0])  # lets scoring stop at the first field that can't win
+        postings, ranked = self.postings, self.ranked
+        for gram, score in grams.items():
+            postings.setdefault(gram, {})[entry.id] = score
+        if ranked:
+            for gram in grams:
+                ranked.pop(gram, None)
+        for word, weight in words.items():
+            holders = self.word_entries.setdefault(word, {})
+            if not holders:
+                for variant in typo_variants(word):
+                    self.typos.setdefault(variant, set()).add(word)
+            holders[entry.id] = weight
+        self.documents[entry.id] = ((entry.title or '').lower(), texts, list(grams), list(words))
+
+    def remove(self, entry_id: str):
+        document = self.documents.pop(entry_id, None)
+        if document is None:
+            return
+        del self.order[entry_id]
+        for gram in document[2]:
+            posting = self.postings[gram]
+            del posting[entry_id]
+            if not posting:
+                del self.postings[gram]
+            self.ranked.pop(gram, None)
+        for word in document[3]:
+            holders = self.word_entries[word]
+            del holders[entry_id]
+            if not holders:
+                del self.word_entries[word]
+                for variant in typo_variants(word):
+                    words = self.typos[variant]
+                    words.discard(word)
+                    if not words:
+                        del self.typos[variant]
+
+    def search(self, query: str, limit: Optional[int] = None, fuzzy: bool = True) -> List[str]:
+        """Ids of matching entries, best match first
+
+        Queries match anywhere in a field, ranked higher at the start of a
+        word. Fuzzy matches are only tried when nothing matches exactly.
+        """
+        query = query.lower().strip()
+        if not query:
+            return list(self.documents)[:limit]
+
+        if len(query) <= 3:
+            ids = self._ranked(query)
+            if ids or not fuzzy:
+                return ids[:limit]
+            return self._rank(self._fuzzy(query), limit)
+
+        hits = self._exact(query, limit)
+        if not hits and fuzzy:
+            hits = self._fuzzy(query)
+        return self._rank(hits, limit)
+
+    # ---------- internals ----------
+
+    def _rank(self, hits: Dict[str, int], limit: Optional[int]) -> List[str]:
+        documents, order = self.documents, self.order
+        ordered = sorted(hits, key=lambda entry_id: (-hits[entry_id], documents[entry_id][0], order[entry_id]))
+        return ordered[:limit]
+
+    def _ranked(self, gram: str) -> List[str]:
+        ids = self.ranked.get(gram)
+        if ids is None:
+            ids = self._rank(self.postings.get(gram, {}), None)
+            self.ranked[gram] = ids
+        return ids
+
+    def _exact(self, query: str, limit: Optional[int]) -> Dict[str, int]:
+        postings = []
+        for i in range(len(query) - 2):
+            posting = self.postings.get(query[i:i + 3])
+            if not posting:
+                return {}
+            postings.append(posting)
+        first = postings[0]
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates.intersection_update(posting)
+            if not candidates:
+                return {}
+
+        hits = {}
+        if limit is None or len(candidates) <= limit:
+            for entry_id in candidates:
+                score = self._score(entry_id, query)
+                if score:
+                    hits[entry_id] = score
+            return hits
+
+        # Wherever the query matches, its first trigram matches at the same
+        # spot, so that trigram's score bounds the query's (the whole-field
+        # bonus aside). Walk its cached ranking and stop once nothing left
+        # can reach the current top `limit`. The ranking shares _rank()'s
+        # tie-breaks, so an entry that could only tie the weakest of the top
+        # stops the walk too once it sorts after it.
+        documents, order = self.documents, self.order
+        top = []  # (score, _Later(tie-break key)) - top[0] is the weakest kept
+        for entry_id in self._ranked(query[:3]):
+            key = (documents[entry_id][0], order[entry_id])
+            if len(top) == limit:
+                bound = first[entry_id] * WHOLE_FIELD // WORD_START
+                if bound < top[0][0] or (bound == top[0][0] and key > top[0][1].key):
+                    break
+            if entry_id not in candidates:
+                continue
+            score = self._score(entry_id, query)
+            if score:
+                hits[entry_id] = score
+                item = (score, _Later(key))
+                if len(top) < limit:
+                    heapq.heappush(top, item)
+                elif item > top[0]:
+                    heapq.heapreplace(top, item)
+        return hits
+
+    def _score(self, entry_id: str, query: str) -> int:
+        """Best field score for query in an entry (0 if its trigrams matched but not contiguously)"""
+        best = 0
+        for weight, text in self.documents[entry_id][1]:
+            if weight * WHOLE_FIELD <= best:
+                break
+            position = text.find(query)
+            if position < 0:
+                continue
+            if text == query:
+                score = weight * WHOLE_FIELD
+            else:
+                score = weight * INSIDE_WORD
+                while position >= 0:
+                    if WORD_START_RE.match(text, position):
+                        score = weight * WORD_START
+                        break
+                    position = text.find(query, position + 1)
+            if score > best:
+                best = score
+        return best
+
+    def _fuzzy(self, query: str) -> Dict[str, int]:
+        """Entries containing, for every query word, a word at most one typo away"""
+        hits = None
+        for token in WORD_SPLIT.split(query):
+            if not token:
+                continue
+            if len(token) < FUZZY_MIN_LENGTH:
+                return {}
+            matches: Dict[str, int] = {}
+            words = set()
+            for variant in typo_variants(token):
+                words |= self.typos.get(variant, set())
+            for word in words:
+                if within_one_typo(token, word):
+                    for entry_id, weight in self.word_entries[word].items():
+                        if matches.get(entry_id, 0) < weight:
+                            matches[entry_id] = weight
+            if hits is None:
+                hits = matches
+            else:
+                # The weakest word decides how good a multi-word match is
+                hits = {entry_id: min(score, matches[entry_id]) for entry_id, score in hits.items()
+                        if entry_id in matches}
+            if not hits:
+                return {}
+        return hits or {}
+
+
+# Benchmark: type-ahead latency on a large synthetic vault, index vs the old linear scan
+if __name__ == "__main__":
+    import random
+    import sys
+    import time
+
+    random.seed(1)
+    syllables = ['ka', 'lo', 'mi', 'net', 'fli', 'x', 'zo', 'ra', 'pe', 'tu', 'ban', 'cor', 'dex', 'ly', 'sto']
+    sites = ['github', 'google', 'amazon', 'netflix', 'spotify', 'discord', 'steam', 'paypal', 'reddit'] + [
+        ''.join(random.choice(syllables) for _ in range(random.randint(2, 4))) for _ in range(3000)]
+
+    class Entry:
+        def __init__(self, i):
+            site = random.choice(sites)
+            self.id = str(i)
+            self.title = f"{site.title()} {random.choice(['personal', 'work', 'old', 'main'])} {i}"
+            self.username = f"user{i}@example.com"
+            self.url = f"https://www.{site}.com/login"
+            self.category = random.choice(['General', 'Work', 'Social', 'Finance', 'Gaming'])
+            self.tags = random.sample(['personal', 'shared', '2fa', 'old', 'family'], 2)
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    entries = [Entry(i) for i in range(count)]
+
+    start = time.perf_counter()
+    index = SearchIndex()
+    for entry in entries:
+        index.add(entry)
+    print(f"Indexed {count} entries in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    def linear_search(query):
+        query_lower = query.lower()
+        return [e for e in entries if (query_lower in e.title.lower() or query_lower in e.username.lower() or
+                                       query_lower in e.url.lower() or
+                                       any(query_lower in tag.lower() for tag in e.tags) or
+                                       query_lower in e.category.lower())]
+
+    # A limited search must return the start of the unlimited one, ties included
+    tied = SearchIndex()
+    tied.rebuild(entries[:2000])
+    for i in range(300):
+        twin = Entry(count + i)  # identical apart from the id
+        twin.title, twin.url, twin.category, twin.tags = "Netflix shared", "https://netflix.com", "Social", ["shared"]
+        tied.add(twin)
+    tied.add(entries[0])  # re-adding keeps an entry's place
+    # Both score 90 for 'zebrafish' (whole username), but only the first ranks high
+    # on its first trigram - the second may only be skipped once it can't even tie
+    for i, title in enumerate(("Zeb zzz", "Aaa")):
+        twin = Entry(count + 300 + i)
+        twin.title, twin.username, twin.url, twin.category, twin.tags = title, "zebrafish", "", "General", []
+        tied.add(twin)
+    for query in ('netf', 'netflix', 'shared', 'flix', 'work', 'user12', 'social', 'zebrafish', 'gaming',
+                  'personal', 'example', 'login'):
+        full = tied.search(query)
+        for limit in (1, 5, 50, 200):
+            assert tied.search(query, limit=limit) == full[:limit], (query, limit)
+    print("Limit check passed")
+
+    # Typing more can only narrow the results, and short queries match anywhere like the old scan
+    for query in ('netflix', 'user123', 'kalonet', 'work 12', '@example', 'gaming', 'x.com'):
+        longer = set(tied.search(query, fuzzy=False))
+        for size in range(1, len(query)):
+            shorter = set(tied.search(query[:size], fuzzy=False))
+            assert shorter >= longer, (query[:size], query)
+    for query in ('n', 'e', 'et', 'x', 'lo', '@e', '.c', '2f'):
+        assert set(index.search(query)) == {e.id for e in linear_search(query)}, query
+    print("Prefix check passed")
+
+    print(f"{'query':<16} {'hits':>6}  {'index (top 50)':>14}  {'linear scan':>12}")
+    print("=" * 60)
+    for query in ('n', 'ne', 'net', 'netf', 'netflix', 'netflix work', 'kalo', 'user123', 'user1234@',
+                  'netlfix', 'githb', 'gogle personl', 'gaming', 'nothing here'):
+        index.search(query)  # first call for a short query builds its cached ranking
+        runs = 50
+        start = time.perf_counter()
+        for _ in range(runs):
+            hits = index.search(query, limit=50)
+        indexed_ms = (time.perf_counter() - start) * 1000 / runs
+        start = time.perf_counter()
+        for _ in range(5):
+            linear_search(query)
+        linear_ms = (time.perf_counter() - start) * 1000 / 5
+        print(f"{query!r:<16} {len(index.search(query)):6}  {indexed_ms:11.3f} ms  {linear_ms:9.3f} ms")
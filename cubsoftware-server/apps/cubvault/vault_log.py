@@ -0,0 +1,354 @@
+"""
+CubVault - Record Log Storage
+Vault file made of independently encrypted records, appended one per change
+
+Layout:
+    prefix   magic, format version, KDF parameters, vault id, wrapped data key (plaintext)
+    records  [length][type][sequence][nonce + AES-GCM ciphertext] ...
+
+The first record is the encrypted vault header (master password hash etc.).
+Entry records hold a block of packed entries (see record_codec) - a
+snapshot packs up to BLOCK_SIZE bytes of entries into each record, an
+add/update appends a block with just that entry, a delete appends a
+tombstone, and replaying the file in order gives the current vault. The
+record type and sequence number are authenticated, so records can't be
+reordered, dropped from the middle or spliced in from another vault -
+or from an earlier rewrite of this one, since every rewrite picks a new
+vault id.
+Superseded records are garbage collected by rewriting the file in a
+background thread once they outnumber the live ones.
+
+Version 3 logs (one JSON entry per record) can still be read, but not
+appended to - they're rewritten with create() on unlock.
+"""
+
+import json
+import os
+import struct
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from record_codec import decode_block, decode_entries, encode_block, encode_entry
+
+MAGIC = b'\x89CUB'  # can't start a v1 (base64) or v2 (JSON) vault file
+LOG_VERSION = 4
+READABLE_VERSIONS = (3, 4)
+
+# magic, format version, PBKDF2 iterations, KDF salt, vault id, wrapped data key length
+PREFIX = struct.Struct('>4sBI16s16sH')
+# record body length, record type, sequence number
+FRAME = struct.Struct('>IcQ')
+
+HEADER_RECORD = b'H'
+ENTRY_RECORD = b'E'
+DELETE_RECORD = b'D'
+
+COMPACT_MIN_DEAD = 64  # don't rewrite the file for a handful of stale records
+BLOCK_SIZE = 1 << 16  # packed entry bytes per record in snapshots and bulk appends
+
+
+def read_key_header(path: str) -> Optional[Dict]:
+    """Plaintext prefix of a record log vault, or None if the file is an older format"""
+    with open(path, 'rb') as f:
+        prefix = f.read(PREFIX.size)
+        if len(prefix) < PREFIX.size or prefix[:len(MAGIC)] != MAGIC:
+            return None
+        _, version, iterations, salt, vault_id, key_length = PREFIX.unpack(prefix)
+        if version not in READABLE_VERSIONS:
+            raise ValueError(f"Unsupported vault version: {version}")
+        wrapped_key = f.read(key_length)
+    return {
+        'version': version,
+        'iterations': iterations,
+        'salt': salt,
+        'vault_id': vault_id,
+        'wrapped_key': wrapped_key
+    }
+
+
+def encode_record(data) -> bytes:
+    return json.dumps(data, separators=(',', ':')).encode('utf-8')
+
+
+def _blocks(packed_entries: Iterable[Tuple[str, bytes]]) -> Iterator[List[Tuple[str, bytes]]]:
+    """Group (id, packed entry) pairs into runs of about BLOCK_SIZE bytes"""
+    block, size = [], 0
+    for item in packed_entries:
+        block.append(item)
+        size += len(item[1])
+        if size >= BLOCK_SIZE:
+            yield block
+            block, size = [], 0
+    if block:
+        yield block
+
+
+class VaultLog:
+    """Append-only encrypted record file for one unlocked vault"""
+
+    def __init__(self, path: str, crypto, data_key: bytes, key_header: Dict):
+        self.path = path
+        self.crypto = crypto
+        self.data_key = data_key
+        self.key_header = key_header
+        self.lock = threading.Lock()
+        self.file = None
+        self.next_seq = 0
+        # Latest plaintext header record and packed form of every live entry, in
+        # vault order - enough to rewrite the file without asking the caller
+        self.header = b''
+        self.live: Dict[str, bytes] = {}
+        self.stored = 0  # header, entry and tombstone records in the file (entries counted singly)
+        self.backlog = None  # records appended while a compaction is running
+        self.compactor = None
+
+    @classmethod
+    def create(cls, path: str, crypto, data_key: bytes, key_header: Dict,
+               header: Dict, entries: List[Dict]) -> 'VaultLog':
+        """Write a fresh log holding exactly header + entries (atomically replaces path)"""
+        log = cls(path, crypto, data_key, dict(key_header, vault_id=os.urandom(16)))
+        log.header = encode_record(header)
+        log.live = {entry['id']: encode_entry(entry) for entry in entries}
+        temp_path, seq = log._write_snapshot(log.key_header, log.header, list(log.live.items()))
+        log._swap(temp_path, seq)
+        log.stored = 1 + len(log.live)
+        return log
+
+    def open(self) -> Tuple[Dict, List[Dict]]:
+        """Replay the file and open it for appending
+
+        Only a record running past the end of the file is treated as a torn
+        write and cut off; any complete record that fails authentication is
+        tampering or corruption, and raises ValueError.
+        Returns: (header, entries)
+        """
+        with open(self.path, 'rb') as f:
+            data = f.read()
+
+        version = self.key_header.get('version', LOG_VERSION)
+        offset = PREFIX.size + len(self.key_header['wrapped_key'])
+        entries = {}
+        while offset + FRAME.size <= len(data):
+            length, kind, seq = FRAME.unpack_from(data, offset)
+            end = offset + FRAME.size + length
+            if end > len(data):
+                break  # torn write - the last record only partly reached the disk
+            if seq != self.next_seq:
+                raise ValueError("Vault records are out of order")
+            payload = self.crypto.decrypt_with_key(data[offset + FRAME.size:end], self.data_key,
+                                                   self._associated_data(kind, seq))
+            if payload is None:
+                # A complete record never fails from a crash, even the last one
+                raise ValueError("Vault record failed authentication")
+
+            if kind == HEADER_RECORD:
+                self.header = payload
+                self.stored += 1
+            elif kind == ENTRY_RECORD:
+                if version == LOG_VERSION:
+                    block = decode_block(payload)
+                else:
+                    entry = json.loads(payload)
+                    block = [(entry, encode_entry(entry))]
+                for entry, packed in block:
+                    entries[entry['id']] = entry
+                    self.live[entry['id']] = packed
+                self.stored += len(block)
+            elif kind == DELETE_RECORD:
+                entry_id = payload.decode('utf-8')
+                entries.pop(entry_id, None)
+                self.live.pop(entry_id, None)
+                self.stored += 1
+            else:
+                raise ValueError(f"Unknown vault record type: {kind!r}")
+            self.next_seq += 1
+            offset = end
+
+        if not self.header:
+            raise ValueError("Vault header record is missing")
+        if version != LOG_VERSION:
+            return json.loads(self.header), list(entries.values())  # read only
+
+        # Drop a torn tail so new records follow the last good one
+        self.file = open(self.path, 'r+b')
+        self.file.truncate(offset)
+        self.file.seek(offset)
+        return json.loads(self.header), list(entries.values())
+
+    def put_header(self, header: Dict):
+        self._append(HEADER_RECORD, encode_record(header), [])
+
+    def put_entry(self, entry: Dict):
+        """Append an added or updated entry"""
+        packed = encode_entry(entry)
+        self._append(ENTRY_RECORD, encode_block([packed]), [(entry['id'], packed)])
+
+    def put_entries(self, entries: Iterable[Dict]) -> int:
+        """Append many entries with a single fsync - all or nothing
+
+        entries may be a generator; if it raises, whatever was written is cut
+        off again and the exception propagates.
+        Returns: number of entries appended
+        """
+        with self.lock:
+            start, seq = self.file.tell(), self.next_seq
+            records = []
+            try:
+                for changes in _blocks((entry['id'], encode_entry(entry)) for entry in entries):
+                    payload = encode_block([packed for _, packed in changes])
+                    self.file.write(self._frame(ENTRY_RECORD, seq, payload))
+                    records.append((ENTRY_RECORD, payload, changes))
+                    seq += 1
+                self.file.flush()
+                os.fsync(self.file.fileno())
+            except BaseException:
+                self.file.seek(start)
+                self.file.truncate()
+                raise
+            self._appended(records)
+            return sum(len(changes) for _, _, changes in records)
+
+    def delete_entry(self, entry_id: str):
+        """Append a tombstone for entry_id"""
+        self._append(DELETE_RECORD, entry_id.encode('utf-8'), [(entry_id, None)])
+
+    def stored_entry(self, entry_id: str) -> Optional[Dict]:
+        """An entry as last written to the log, or None"""
+        packed = self.live.get(entry_id)
+        return decode_entries(packed)[0][0] if packed else None
+
+    def dead_records(self) -> int:
+        # Everything except the current header and each entry's latest version
+        return self.stored - 1 - len(self.live)
+
+    def close(self):
+        """Wait for a running compaction and close the file"""
+        compactor = self.compactor
+        if compactor:
+            compactor.join()
+        with self.lock:
+            if self.file:
+                self.file.close()
+                self.file = None
+
+    # ---------- internals ----------
+
+    def _associated_data(self, kind: bytes, seq: int, vault_id: bytes = None) -> bytes:
+        return (vault_id or self.key_header['vault_id']) + struct.pack('>cQ', kind, seq)
+
+    def _frame(self, kind: bytes, seq: int, payload: bytes, vault_id: bytes = None) -> bytes:
+        body = self.crypto.encrypt_with_key(payload, self.data_key, self._associated_data(kind, seq, vault_id))
+        return FRAME.pack(len(body), kind, seq) + body
+
+    def _apply(self, kind: bytes, payload: bytes, changes: List[Tuple[str, Optional[bytes]]]):
+        """Track a record in header/live - changes are (entry id, packed entry or None if deleted)"""
+        if kind == HEADER_RECORD:
+            self.header = payload
+            self.stored += 1
+            return
+        for entry_id, packed in changes:
+            if packed is None:
+                self.live.pop(entry_id, None)
+            else:
+                self.live[entry_id] = packed
+        self.stored += len(changes)
+
+    def _append(self, kind: bytes, payload: bytes, changes: List[Tuple[str, Optional[bytes]]]):
+        with self.lock:
+            self.file.write(self._frame(kind, self.next_seq, payload))
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self._appended([(kind, payload, changes)])
+
+    def _appended(self, records: List[Tuple[bytes, bytes, List]]):
+        """Bookkeeping for records now durably on disk (lock held)"""
+        for record in records:
+            self.next_seq += 1
+            self._apply(*record)
+            if self.backlog is not None:
+                self.backlog.append(record)
+
+        dead = self.dead_records()
+        if self.compactor is None and dead >= COMPACT_MIN_DEAD and dead > len(self.live):
+            self.compactor = threading.Thread(target=self._compact, name='vault-compaction', daemon=True)
+            self.compactor.start()
+
+    def _write_snapshot(self, key_header: Dict, header: bytes,
+                        entries: List[Tuple[str, bytes]]) -> Tuple[str, int]:
+        """Write prefix + header + entries to a temp file; returns (temp path, next sequence number)
+
+        Every rewrite gets its own vault id in key_header, so records of an
+        earlier file (which restarted at the same sequence numbers) can't be
+        spliced into it.
+        """
+        wrapped_key, vault_id = key_header['wrapped_key'], key_header['vault_id']
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(PREFIX.pack(MAGIC, LOG_VERSION, key_header['iterations'], key_header['salt'],
+                                vault_id, len(wrapped_key)))
+            f.write(wrapped_key)
+            f.write(self._frame(HEADER_RECORD, 0, header, vault_id))
+            seq = 1
+            for block in _blocks(entries):
+                payload = encode_block([packed for _, packed in block])
+                f.write(self._frame(ENTRY_RECORD, seq, payload, vault_id))
+                seq += 1
+            f.flush()
+            os.fsync(f.fileno())
+        return temp_path, seq
+
+    def _swap(self, temp_path: str, next_seq: int):
+        """Replace the vault with temp_path and reopen it for appending"""
+        if self.file:
+            self.file.close()  # Windows can't replace an open file
+        os.replace(temp_path, self.path)
+        try:
+            # Make the rename itself durable (not possible on Windows)
+            folder = os.open(os.path.dirname(os.path.abspath(self.path)), os.O_RDONLY)
+            try:
+                os.fsync(folder)
+            finally:
+                os.close(folder)
+        except OSError:
+            pass
+        self.file = open(self.path, 'r+b')
+        self.file.seek(0, os.SEEK_END)
+        self.next_seq = next_seq
+
+    def _compact(self):
+        """Rewrite the file with only live records
+
+        The bulk of the work runs without the lock; edits made meanwhile are
+        collected in backlog and re-appended to the new file before the swap.
+        """
+        temp_path = None
+        try:
+            with self.lock:
+                header, entries = self.header, list(self.live.items())
+                key_header = dict(self.key_header, vault_id=os.urandom(16))
+                self.backlog = []
+            temp_path, seq = self._write_snapshot(key_header, header, entries)
+
+            with self.lock:
+                stored = 1 + len(entries)
+                if self.backlog:
+                    with open(temp_path, 'ab') as f:
+                        for kind, payload, changes in self.backlog:
+                            f.write(self._frame(kind, seq, payload, key_header['vault_id']))
+                            seq += 1
+                            stored += 1 if kind == HEADER_RECORD else len(changes)
+                        f.flush()
+                        os.fsync(f.fileno())
+                if self.file:
+                    self.key_header = key_header
+                    self._swap(temp_path, seq)
+                    self.stored = stored
+                    temp_path = None
+        except Exception as e:
+            print(f"Vault compaction failed: {e}")
+        finally:
+            with self.lock:
+                self.backlog = None
+                self.compactor = None
+            if temp_path and os.path.exists(temp_path):
+                os.remove(temp_path)